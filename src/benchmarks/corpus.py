@@ -0,0 +1,232 @@
+import argparse
+import json
+import os
+import random
+from typing import Final, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from src.puzzles_with_skyscrapers.batch_solver import PUZZLE_VARIANTS
+from src.puzzles_with_skyscrapers.generator import generate_puzzle
+
+# The corpus files are never changed once committed, so results measured on the same version are comparable.
+# Changing how the corpus is built means writing it under a new version.
+CORPUS_VERSION: Final = 2
+CORPUS_DIRECTORY: Final = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+CORPUS_SEED: Final = 2024
+
+SIZES: Final = tuple(range(4, 10))
+# easy: all the hints of the solution. propagation: a minimal set of hints that the rules solve without guessing.
+# guessing: a minimal set of hints that the solver can only finish by guessing.
+# hard: minimal sets of both givens and hints that the solver can only finish by guessing, on the larger grids only.
+# (Version 1 has no hard puzzles.)
+BUCKETS: Final = ("easy", "propagation", "guessing", "hard")
+HARD_SIZES: Final = (8,)
+
+DEFAULT_PUZZLES_PER_BUCKET: Final = 4
+DEFAULT_MAX_ATTEMPTS: Final = 16
+# Checks for a single solution on large grids can take minutes, so the corpus only keeps checks that finish quickly.
+DEFAULT_CHECK_TIMEOUT: Final = 0.5
+# Removing the givens too leaves much sparser grids, whose checks need a longer timeout to ever succeed.
+DEFAULT_HARD_PUZZLES_PER_BUCKET: Final = 2
+DEFAULT_MAX_HARD_ATTEMPTS: Final = 4
+DEFAULT_HARD_CHECK_TIMEOUT: Final = 5.0
+
+
+class SkyscrapersCorpusEntry(NamedTuple):
+    variant: str
+    size: int
+    bucket: str
+    puzzle: Tuple[Tuple[Optional[int], ...], ...]
+    hints: Tuple[Optional[int], ...]
+    solution: Tuple[Tuple[int, ...], ...]
+
+
+class PachamamaCorpusEntry(NamedTuple):
+    name: str
+    size: int
+    # Cells in the representation of pachamama_factory, such as "3T" or "0X".
+    grid: Tuple[Tuple[str, ...], ...]
+    is_legal: bool
+    # The single solution of a grid that is a puzzle to solve rather than a grid to check.
+    solution: Optional[Tuple[Tuple[str, ...], ...]] = None
+
+    def get_bucket(self) -> str:
+        if self.solution is not None:
+            return "solving"
+        return "legal" if self.is_legal else "illegal"
+
+
+def get_corpus_path(name: str, version: int = CORPUS_VERSION) -> str:
+    return os.path.join(CORPUS_DIRECTORY, f"{name}_v{version}.jsonl")
+
+
+def load_skyscrapers_corpus(version: int = CORPUS_VERSION) -> List[SkyscrapersCorpusEntry]:
+    with open(get_corpus_path("skyscrapers", version)) as corpus_file:
+        return [_skyscrapers_entry_from_json(line) for line in corpus_file if line.strip()]
+
+
+def load_pachamama_corpus(version: int = CORPUS_VERSION) -> List[PachamamaCorpusEntry]:
+    with open(get_corpus_path("pachamama", version)) as corpus_file:
+        return [_pachamama_entry_from_json(line) for line in corpus_file if line.strip()]
+
+
+def build_skyscrapers_corpus(seed: int = CORPUS_SEED, variants: Iterable[str] = tuple(PUZZLE_VARIANTS),
+                             sizes: Iterable[int] = SIZES,
+                             puzzles_per_bucket: int = DEFAULT_PUZZLES_PER_BUCKET,
+                             max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                             check_timeout: Optional[float] = DEFAULT_CHECK_TIMEOUT,
+                             hard_sizes: Iterable[int] = HARD_SIZES,
+                             hard_check_timeout: Optional[float] = DEFAULT_HARD_CHECK_TIMEOUT
+                             ) -> Iterator[SkyscrapersCorpusEntry]:
+    """
+    Generate puzzles for every variant and size until every bucket has puzzles_per_bucket puzzles, or until
+    max_attempts puzzles were generated (some variants rarely or never need guessing, so their buckets stay short).
+    The hard bucket of the sizes in hard_sizes gets up to DEFAULT_HARD_PUZZLES_PER_BUCKET puzzles, out of
+    DEFAULT_MAX_HARD_ATTEMPTS puzzles generated without their givens.
+    """
+    for variant in variants:
+        for size in sizes:
+            rng = random.Random(f"{seed}:{variant}:{size}")
+            buckets = {bucket: [] for bucket in BUCKETS}
+            for _ in range(max_attempts):
+                if all(len(entries) >= puzzles_per_bucket for entries in buckets.values()):
+                    break
+                generated = generate_puzzle(variant, size, rng, check_timeout=check_timeout)
+                bucket = "propagation" if generated.num_of_guesses == 0 else "guessing"
+                # The generated hints are kept, since some variants (like Haido) have several possible hints per line.
+                all_hints = PUZZLE_VARIANTS[variant](generated.solution, generated.hints).get_hints_of_solution(rng)
+                all_hints = tuple(hint if hint is not None else all_hints[i] for i, hint in enumerate(generated.hints))
+                candidates = [("easy", all_hints), (bucket, generated.hints)]
+                for candidate_bucket, hints in candidates:
+                    if len(buckets[candidate_bucket]) < puzzles_per_bucket:
+                        buckets[candidate_bucket].append(SkyscrapersCorpusEntry(
+                            variant, size, candidate_bucket, generated.puzzle, hints, generated.solution))
+            if size in hard_sizes:
+                for _ in range(DEFAULT_MAX_HARD_ATTEMPTS):
+                    if len(buckets["hard"]) >= DEFAULT_HARD_PUZZLES_PER_BUCKET:
+                        break
+                    generated = generate_puzzle(variant, size, rng, strip_givens=True,
+                                                check_timeout=hard_check_timeout)
+                    if generated.num_of_guesses > 0:
+                        buckets["hard"].append(SkyscrapersCorpusEntry(
+                            variant, size, "hard", generated.puzzle, generated.hints, generated.solution))
+            for bucket in BUCKETS:
+                yield from buckets[bucket]
+
+
+def build_pachamama_corpus() -> List[PachamamaCorpusEntry]:
+    """
+    Every symmetry of a known legal solution, and a copy of each with one number changed, which breaks the rules.
+    Then a few sparse puzzles to solve, with their single solutions.
+    """
+    entries = []
+    for name, grid in _get_symmetries(_PACHAMAMA_SOLUTION):
+        entries.append(PachamamaCorpusEntry(name, len(grid), grid, True))
+        broken = [list(row) for row in grid]
+        broken[0][0] = str(int(broken[0][0][0]) % 5 + 1) + broken[0][0][1]
+        entries.append(PachamamaCorpusEntry(f"{name}_broken", len(grid), tuple(tuple(row) for row in broken), False))
+    for name, (puzzle, solution) in _PACHAMAMA_PUZZLES.items():
+        entries.append(PachamamaCorpusEntry(name, len(puzzle), puzzle, False, solution))
+    return entries
+
+
+def main(args: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Write the benchmark corpus files of a new version.")
+    parser.add_argument("--version", type=int, default=CORPUS_VERSION)
+    parser.add_argument("--seed", type=int, default=CORPUS_SEED)
+    parser.add_argument("--force", action="store_true", help="overwrite existing corpus files")
+    parsed = parser.parse_args(args)
+
+    paths = [get_corpus_path(name, parsed.version) for name in ("skyscrapers", "pachamama")]
+    if not parsed.force and any(os.path.exists(path) for path in paths):
+        parser.error(f"Corpus version {parsed.version} already exists. Committed versions must not change.")
+    os.makedirs(CORPUS_DIRECTORY, exist_ok=True)
+    with open(paths[0], "w") as corpus_file:
+        for entry in build_skyscrapers_corpus(parsed.seed):
+            corpus_file.write(json.dumps(entry._asdict()) + "\n")
+            corpus_file.flush()
+    with open(paths[1], "w") as corpus_file:
+        for entry in build_pachamama_corpus():
+            corpus_file.write(json.dumps(entry._asdict()) + "\n")
+
+
+def _skyscrapers_entry_from_json(line: str) -> SkyscrapersCorpusEntry:
+    record = json.loads(line)
+    return SkyscrapersCorpusEntry(record["variant"], record["size"], record["bucket"],
+                                  tuple(tuple(row) for row in record["puzzle"]), tuple(record["hints"]),
+                                  tuple(tuple(row) for row in record["solution"]))
+
+
+def _pachamama_entry_from_json(line: str) -> PachamamaCorpusEntry:
+    record = json.loads(line)
+    solution = record.get("solution")
+    return PachamamaCorpusEntry(record["name"], record["size"], tuple(tuple(row) for row in record["grid"]),
+                                record["is_legal"], tuple(tuple(row) for row in solution) if solution else None)
+
+
+def _get_symmetries(grid: Tuple[Tuple[str, ...], ...]) -> Iterator[Tuple[str, Tuple[Tuple[str, ...], ...]]]:
+    for reflection in range(2):
+        for rotation in range(4):
+            yield f"rotated_{rotation * 90}" + ("_reflected" if reflection else ""), grid
+            grid = tuple(zip(*grid[::-1]))
+        grid = tuple(row[::-1] for row in grid)
+
+
+_PACHAMAMA_SOLUTION: Final = (
+    ("1T", "5T", "1C", "4C", "3C", "2C"),
+    ("4T", "2T", "3T", "2S", "5C", "1S"),
+    ("3S", "1S", "5S", "4S", "3T", "2S"),
+    ("2C", "4C", "2T", "1T", "5T", "1C"),
+    ("3T", "5C", "3C", "4T", "2S", "3S"),
+    ("1T", "2T", "1C", "5S", "1S", "4S"),
+)
+
+# Sparse 10x10 puzzles, with about half of the numbers and shapes given, that the solver can only finish by guessing
+# a few hundred times.
+_PACHAMAMA_PUZZLES: Final = {
+    "sparse_10x10_a": (
+        (("0X", "0X", "1X", "0X", "0C", "2X", "0X", "0S", "0X", "4X"),
+         ("0X", "0T", "0X", "0X", "3X", "0X", "0X", "5C", "2T", "0X"),
+         ("0C", "1T", "0X", "0X", "0S", "0X", "0C", "4X", "0C", "5X"),
+         ("0X", "0X", "0X", "0X", "2X", "3X", "0X", "0X", "0X", "0X"),
+         ("2X", "0X", "0X", "0X", "0X", "0X", "0X", "0T", "0S", "0X"),
+         ("0X", "0X", "0X", "0S", "2X", "0X", "2S", "0X", "0S", "0X"),
+         ("0X", "0T", "0X", "0X", "0X", "5X", "0X", "0T", "0S", "1X"),
+         ("5X", "2X", "0X", "0S", "0X", "0X", "0T", "0X", "0X", "0C"),
+         ("0X", "0X", "4X", "0X", "2C", "1X", "4X", "1S", "3X", "0S"),
+         ("0X", "1X", "0X", "0X", "0X", "0X", "0X", "0X", "0X", "0C")),
+        (("1C", "2T", "1C", "2C", "5C", "2S", "1S", "4S", "1T", "4T"),
+         ("3C", "4T", "3S", "4C", "3C", "4T", "3S", "5C", "2T", "3T"),
+         ("2C", "1T", "2S", "1S", "5S", "1T", "2C", "4C", "1C", "5T"),
+         ("4C", "5T", "4S", "3C", "2T", "3T", "5S", "3C", "2S", "3S"),
+         ("2S", "3T", "2C", "5C", "1C", "4C", "1S", "4T", "1S", "4C"),
+         ("4S", "5S", "1S", "3S", "2T", "3S", "2S", "3T", "5S", "3C"),
+         ("1C", "3T", "4T", "5T", "1T", "5C", "4S", "1T", "4S", "1C"),
+         ("5C", "2S", "1S", "3S", "4S", "3C", "2T", "5T", "2C", "5C"),
+         ("4C", "3C", "4T", "5S", "2C", "1C", "4C", "1S", "3S", "4S"),
+         ("2C", "1S", "2T", "1T", "3T", "5T", "2S", "5S", "2C", "1C"))),
+    "sparse_10x10_b": (
+        (("0X", "0X", "0X", "0X", "0S", "0X", "0X", "4X", "0S", "1X"),
+         ("5S", "2X", "1X", "0X", "0X", "3T", "0X", "5X", "0X", "4X"),
+         ("0X", "0X", "4X", "0X", "0X", "0X", "0X", "0X", "3S", "0X"),
+         ("4C", "0X", "0X", "0X", "0X", "0X", "0X", "5X", "0X", "2X"),
+         ("0X", "3X", "0X", "0X", "0X", "0X", "0T", "0T", "0X", "0X"),
+         ("0C", "0X", "0X", "0S", "4T", "0S", "0X", "0X", "0X", "0C"),
+         ("0X", "0S", "0X", "0S", "0C", "0X", "0X", "0X", "4C", "0X"),
+         ("0C", "0X", "1X", "0X", "0T", "0X", "0X", "0X", "0X", "0S"),
+         ("5S", "0X", "0X", "5X", "0X", "0S", "0X", "5X", "3S", "2X"),
+         ("0X", "0S", "0X", "0X", "0X", "1T", "3X", "0T", "0X", "0T")),
+        (("1S", "3S", "4S", "2T", "1S", "5S", "2S", "4S", "3S", "1C"),
+         ("5S", "2S", "1T", "3T", "4C", "3T", "1T", "5T", "2T", "4T"),
+         ("1C", "3C", "4T", "2S", "1C", "5C", "2S", "4S", "3S", "5S"),
+         ("4C", "2C", "1S", "3S", "4S", "3C", "1S", "5T", "1T", "2T"),
+         ("1S", "3T", "5T", "2T", "1T", "2C", "4T", "3T", "4S", "3C"),
+         ("4C", "2C", "1S", "3S", "4T", "3S", "1S", "2S", "5S", "1C"),
+         ("3C", "5S", "4S", "2S", "1C", "2C", "4T", "3T", "4C", "2C"),
+         ("1C", "2T", "1T", "3T", "4T", "3C", "1S", "2T", "1S", "5S"),
+         ("5S", "3S", "4S", "5T", "2S", "5S", "4S", "5T", "3S", "2S"),
+         ("2S", "1S", "2C", "1C", "3C", "1T", "3S", "1T", "4S", "1T"))),
+}
+
+
+if __name__ == '__main__':
+    main()
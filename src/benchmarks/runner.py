@@ -0,0 +1,248 @@
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, Final, Iterable, List, Optional, TextIO, Tuple
+
+from src.benchmarks.corpus import CORPUS_VERSION, PachamamaCorpusEntry, SkyscrapersCorpusEntry, \
+    load_pachamama_corpus, load_skyscrapers_corpus
+from src.pachamama_puzzle.pachamama_factory import create_pachamama_puzzle
+from src.pachamama_puzzle.pachamama_solver import PachamamaSolver
+from src.puzzles_with_skyscrapers.batch_solver import PuzzleSpec, solve_puzzle_spec_with_result
+from src.puzzles_with_skyscrapers.components.abstract_puzzle_with_skyscrapers import DEFAULT_SEARCH_ENGINE, \
+    SEARCH_ENGINES
+from src.puzzles_with_skyscrapers.components.solve_memo import clear_solve_memo
+
+PERCENTILES: Final = (50, 95, 99)
+DEFAULT_REGRESSION_THRESHOLD: Final = 0.2
+# The metric compared against a baseline. The median is much less noisy than the tail percentiles.
+REGRESSION_METRIC: Final = "p50_seconds"
+
+
+def run_skyscrapers_benchmark(entries: Iterable[SkyscrapersCorpusEntry], repeat: int = 1,
+                              measure_memory: bool = True, search_engine: str = DEFAULT_SEARCH_ENGINE) -> List[dict]:
+    """
+    Solve every puzzle repeat times, and summarize the times of every variant, size and bucket.
+    A puzzle fails if it is not solved to its single solution from the corpus.
+    Every solve starts with an empty memo, so repeated solves of a puzzle are all timed.
+    """
+    groups = _group_by(entries, lambda entry: (entry.variant, entry.size, entry.bucket))
+    records = []
+    for (variant, size, bucket), group_entries in groups.items():
+        specs = [PuzzleSpec(entry.variant, entry.puzzle, entry.hints) for entry in group_entries]
+        times = []
+        num_of_guesses = 0
+        num_of_failures = 0
+        for _ in range(repeat):
+            for entry, spec in zip(group_entries, specs):
+                clear_solve_memo()
+                result = solve_puzzle_spec_with_result(spec, search_engine=search_engine)
+                times.append(result.seconds)
+                num_of_guesses += result.num_of_guesses
+                if result.status != "single" or result.solutions[0] != [list(row) for row in entry.solution]:
+                    num_of_failures += 1
+        record = {"variant": variant, "size": size, "bucket": bucket, "count": len(group_entries)}
+        record.update(summarize_times(times))
+        record["mean_num_of_guesses"] = num_of_guesses / len(times)
+        record["num_of_failures"] = num_of_failures
+        if measure_memory:
+            clear_solve_memo()
+            record["peak_memory_bytes"] = measure_peak_memory(
+                lambda: [solve_puzzle_spec_with_result(spec, search_engine=search_engine) for spec in specs])
+        records.append(record)
+    return records
+
+
+def run_pachamama_benchmark(entries: Iterable[PachamamaCorpusEntry], repeat: int = 1,
+                            measure_memory: bool = True) -> List[dict]:
+    """
+    Check every grid for legality (or solve it, if it is a puzzle) repeat times, and summarize the times of every size
+    and bucket. A grid fails if it is judged differently than in the corpus, and a puzzle fails if it is not solved to
+    its single solution from the corpus.
+    """
+    groups = _group_by(entries, lambda entry: (entry.size, entry.get_bucket()))
+    records = []
+    for (size, bucket), group_entries in groups.items():
+        times = []
+        num_of_guesses = 0
+        num_of_failures = 0
+        for _ in range(repeat):
+            for entry in group_entries:
+                start = time.perf_counter()
+                is_correct, entry_num_of_guesses = _run_pachamama_entry(entry)
+                times.append(time.perf_counter() - start)
+                num_of_guesses += entry_num_of_guesses
+                if not is_correct:
+                    num_of_failures += 1
+        record = {"variant": "pachamama", "size": size, "bucket": bucket, "count": len(group_entries)}
+        record.update(summarize_times(times))
+        if bucket == "solving":
+            record["mean_num_of_guesses"] = num_of_guesses / len(times)
+        record["num_of_failures"] = num_of_failures
+        if measure_memory:
+            record["peak_memory_bytes"] = measure_peak_memory(
+                lambda: [_run_pachamama_entry(entry) for entry in group_entries])
+        records.append(record)
+    return records
+
+
+def summarize_times(times: List[float]) -> Dict[str, float]:
+    sorted_times = sorted(times)
+    wall_seconds = sum(sorted_times)
+    summary = {"wall_seconds": wall_seconds, "mean_seconds": wall_seconds / len(sorted_times)}
+    for percentile in PERCENTILES:
+        summary[f"p{percentile}_seconds"] = get_percentile(sorted_times, percentile)
+    summary["max_seconds"] = sorted_times[-1]
+    summary["puzzles_per_second"] = len(sorted_times) / wall_seconds if wall_seconds > 0 else math.inf
+    return summary
+
+
+def get_percentile(sorted_values: List[float], percentile: float) -> float:
+    """
+    The nearest-rank percentile: the smallest value that is at least as large as percentile percent of the values.
+    """
+    if len(sorted_values) == 0:
+        raise ValueError("Cannot get a percentile of no values.")
+    rank = max(math.ceil(percentile / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def measure_peak_memory(func: Callable) -> int:
+    """
+    The largest number of bytes allocated at once while running func, beyond what was allocated before.
+    It runs separately from the timed runs, since tracing allocations slows everything down.
+    """
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+    return peak - before
+
+
+def compare_reports(baseline: dict, current: dict, threshold: float = DEFAULT_REGRESSION_THRESHOLD) -> List[str]:
+    """
+    Get a description of every group that got slower than in the baseline by more than threshold (as a fraction of
+    the baseline), that guesses more, or that fails when it did not fail before. Groups missing from either report are
+    skipped.
+    """
+    if baseline["corpus_version"] != current["corpus_version"]:
+        raise ValueError("Reports on different versions of the corpus cannot be compared.")
+    baseline_groups = {_get_group_key(record): record for record in baseline["groups"]}
+    regressions = []
+    for record in current["groups"]:
+        baseline_record = baseline_groups.get(_get_group_key(record))
+        if baseline_record is None:
+            continue
+        name = "{} {}x{} {}".format(record["variant"], record["size"], record["size"], record["bucket"])
+        if record["num_of_failures"] > baseline_record["num_of_failures"]:
+            regressions.append(f"{name}: {record['num_of_failures']} failures instead of "
+                               f"{baseline_record['num_of_failures']}")
+        # The solver is deterministic, so more guesses on the same puzzles always mean weaker propagation.
+        if record.get("mean_num_of_guesses", 0) > baseline_record.get("mean_num_of_guesses", 0):
+            regressions.append(f"{name}: mean_num_of_guesses went from {baseline_record['mean_num_of_guesses']} to "
+                               f"{record['mean_num_of_guesses']}")
+        if record[REGRESSION_METRIC] > baseline_record[REGRESSION_METRIC] * (1 + threshold):
+            regressions.append(f"{name}: {REGRESSION_METRIC} went from {baseline_record[REGRESSION_METRIC]:.6f} to "
+                               f"{record[REGRESSION_METRIC]:.6f}")
+    return regressions
+
+
+def run_benchmarks(variants: Optional[List[str]] = None, sizes: Optional[List[int]] = None,
+                   buckets: Optional[List[str]] = None, repeat: int = 1, measure_memory: bool = True,
+                   corpus_version: int = CORPUS_VERSION, search_engine: str = DEFAULT_SEARCH_ENGINE) -> dict:
+    if repeat < 1:
+        raise ValueError("The benchmark must run at least once.")
+
+    def is_selected(variant: str, size: int, bucket: str) -> bool:
+        return (variants is None or variant in variants) and (sizes is None or size in sizes) \
+            and (buckets is None or bucket in buckets)
+
+    start = time.perf_counter()
+    skyscrapers_entries = [entry for entry in load_skyscrapers_corpus(corpus_version)
+                           if is_selected(entry.variant, entry.size, entry.bucket)]
+    pachamama_entries = [entry for entry in load_pachamama_corpus(corpus_version)
+                         if is_selected("pachamama", entry.size, entry.get_bucket())]
+    groups = run_skyscrapers_benchmark(skyscrapers_entries, repeat, measure_memory, search_engine) \
+        + run_pachamama_benchmark(pachamama_entries, repeat, measure_memory)
+    return {
+        "corpus_version": corpus_version,
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "repeat": repeat,
+        "search_engine": search_engine,
+        "wall_seconds": time.perf_counter() - start,
+        "groups": groups,
+    }
+
+
+def main(args: Optional[List[str]] = None, stdout: TextIO = sys.stdout) -> int:
+    parser = argparse.ArgumentParser(description="Time the solvers on the benchmark corpus and write a JSON report.")
+    parser.add_argument("--variant", action="append", default=None,
+                        help="a variant to run (or pachamama), can be given several times (default: all)")
+    parser.add_argument("--size", type=int, action="append", default=None)
+    parser.add_argument("--bucket", action="append", default=None,
+                        help="easy, propagation, guessing or hard for skyscrapers, legal, illegal or solving for "
+                             "pachamama")
+    parser.add_argument("--repeat", type=int, default=1, help="number of times to time every puzzle")
+    parser.add_argument("--engine", choices=SEARCH_ENGINES, default=DEFAULT_SEARCH_ENGINE,
+                        help="the search engine of the skyscraper puzzles")
+    parser.add_argument("--no-memory", action="store_true", help="skip measuring the peak memory")
+    parser.add_argument("--output", default="-", help="the report file, or - (the default) for stdout")
+    parser.add_argument("--baseline", default=None,
+                        help="a previous report to compare to, failing if any group regressed")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                        help="the fraction by which a group may get slower before it counts as a regression")
+    parsed = parser.parse_args(args)
+
+    report = run_benchmarks(parsed.variant, parsed.size, parsed.bucket, parsed.repeat, not parsed.no_memory,
+                            search_engine=parsed.engine)
+    if parsed.output == "-":
+        stdout.write(json.dumps(report, indent=2) + "\n")
+    else:
+        with open(parsed.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+
+    if parsed.baseline is not None:
+        with open(parsed.baseline) as baseline_file:
+            regressions = compare_reports(json.load(baseline_file), report, parsed.threshold)
+        for regression in regressions:
+            print(regression, file=sys.stderr)
+        if len(regressions) > 0:
+            return 1
+    return 0
+
+
+def _run_pachamama_entry(entry: PachamamaCorpusEntry) -> Tuple[bool, int]:
+    """
+    Whether the grid is judged as in the corpus (or the puzzle is solved to its solution), and the number of guesses.
+    """
+    if entry.solution is None:
+        return create_pachamama_puzzle(entry.grid).is_legal() == entry.is_legal, 0
+    solver = PachamamaSolver(create_pachamama_puzzle(entry.grid))
+    return solver.solve() == create_pachamama_puzzle(entry.solution), solver.num_of_guesses
+
+
+def _group_by(entries: Iterable, get_key: Callable) -> Dict[tuple, list]:
+    groups = {}
+    for entry in entries:
+        groups.setdefault(get_key(entry), []).append(entry)
+    return groups
+
+
+def _get_group_key(record: dict) -> Tuple[str, int, str]:
+    return record["variant"], record["size"], record["bucket"]
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,55 @@
+from typing import Dict, Final, Hashable, Iterable, List, Set, Tuple
+
+
+class ExactCover:
+    """
+    The state of Algorithm X: options that each cover some items, where every primary item must be covered by exactly
+    one chosen option, and every secondary item by at most one.
+    Choosing an option removes its items, and every other option covering any of them, until the choice is undone.
+    Instead of the linked lists of Dancing Links, every item keeps the set of options still covering it, which does
+    the same job faster in Python: choosing and undoing only touch the options that clash with the chosen one.
+    """
+
+    def __init__(self, options: Dict[Hashable, Iterable[Hashable]], secondary_items: Iterable[Hashable] = ()):
+        self._option_items: Final[Dict[Hashable, Tuple[Hashable, ...]]] = {
+            option: tuple(items) for option, items in options.items()}
+        self._secondary_items: Final[Set[Hashable]] = set(secondary_items)
+        self._item_options: Final[Dict[Hashable, Set[Hashable]]] = {}
+        for option, items in self._option_items.items():
+            for item in items:
+                self._item_options.setdefault(item, set()).add(option)
+        self._num_of_uncovered_primary_items = sum(item not in self._secondary_items for item in self._item_options)
+
+    def is_covered(self) -> bool:
+        return self._num_of_uncovered_primary_items == 0
+
+    def get_uncovered_primary_items(self) -> List[Hashable]:
+        return [item for item in self._item_options if item not in self._secondary_items]
+
+    def get_options_of_item(self, item: Hashable) -> Set[Hashable]:
+        return self._item_options[item]
+
+    def choose(self, option: Hashable) -> List[Set[Hashable]]:
+        """
+        Returns what choosing removed, to be passed to unchoose (choices must be undone in reverse order).
+        """
+        removed = []
+        for item in self._option_items[option]:
+            for clashing_option in self._item_options[item]:
+                for other_item in self._option_items[clashing_option]:
+                    if other_item != item:
+                        self._item_options[other_item].discard(clashing_option)
+            removed.append(self._item_options.pop(item))
+            if item not in self._secondary_items:
+                self._num_of_uncovered_primary_items -= 1
+        return removed
+
+    def unchoose(self, option: Hashable, removed: List[Set[Hashable]]):
+        for item in reversed(self._option_items[option]):
+            self._item_options[item] = removed.pop()
+            if item not in self._secondary_items:
+                self._num_of_uncovered_primary_items += 1
+            for clashing_option in self._item_options[item]:
+                for other_item in self._option_items[clashing_option]:
+                    if other_item != item:
+                        self._item_options[other_item].add(clashing_option)
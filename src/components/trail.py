@@ -0,0 +1,31 @@
+from typing import Any, Iterator, List, Tuple
+
+
+class Trail:
+    """
+    An undo log for backtracking searches.
+    Objects record their state on the trail right before changing it, and rolling back to a checkpoint restores
+    (in reverse order) every state recorded since, by calling restore_state on the object that recorded it.
+    """
+
+    def __init__(self):
+        self._entries: List[Tuple[Any, Any]] = []
+
+    def record(self, restorable: Any, state: Any):
+        self._entries.append((restorable, state))
+
+    def get_checkpoint(self) -> int:
+        return len(self._entries)
+
+    def get_recorded_since(self, checkpoint: int) -> Iterator[Any]:
+        return (restorable for restorable, _ in self._entries[checkpoint:])
+
+    def get_entries_since(self, checkpoint: int) -> Iterator[Tuple[Any, Any]]:
+        return iter(self._entries[checkpoint:])
+
+    def rollback(self, checkpoint: int):
+        if not 0 <= checkpoint <= len(self._entries):
+            raise ValueError("Cannot roll back to a checkpoint that is not on the trail.")
+        while len(self._entries) > checkpoint:
+            restorable, state = self._entries.pop()
+            restorable.restore_state(state)
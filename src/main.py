@@ -1,32 +1,23 @@
-from src.puzzles_with_skyscrapers.skyscrapers_extra_building_puzzle import SkyscrapersExtraBuildingPuzzle
-from src.puzzles_with_skyscrapers.skyscrapers_gaps_puzzle import SkyscrapersGapsPuzzle
-from src.puzzles_with_skyscrapers.skyscrapers_puzzle import SkyscrapersPuzzle
+import sys
+from typing import List, Optional
+
+from src.benchmarks import runner
+from src.puzzles_with_skyscrapers import batch_solver, generator
+
+COMMANDS = {
+    "solve": batch_solver.main,
+    "generate": generator.main,
+    "benchmark": runner.main,
+}
 
-if __name__ == '__main__':
-    # p = SkyscrapersPuzzle(tuple([tuple([None] * 5)] * 5),
-    #                       (None, 4, None, None, None,
-    #                        None, None, None, None, None,
-    #                        None, None, 4, 3, None,
-    #                        3, None, 2, 3, 2))
-    # # p = SkyscrapersExtraBuildingPuzzle(tuple([tuple([None] * 5)] * 5),
-    # #                                    (None, None, None, None, None,
-    # #                                     5, 5, 3, 3, None,
-    # #                                     4, None, 3, 1, None,
-    # #                                     None, None, None, 3, None))
-    # # p = SkyscrapersGapsPuzzle(tuple([tuple([None] * 6)] * 6),
-    # #                           (3, None, 1, 4, 1, 5,
-    # #                            None, 3, None, None, None, None,
-    # #                            None, None, None, None, None, None,
-    # #                            None, 3, None, 1, 4, None))
-    #
-    # # sol = p.get_minimal_puzzle()
-    #
-    # sol = p.solve_and_print()
 
-    p = SkyscrapersPuzzle(tuple([tuple([None] * 6)] * 6),
-                          (None, 2, 2, 2, 2, 2,
-                           None, None, None, 5, None, None,
-                           None, None, None, None, None, None,
-                           None, None, None, None, None, None))
+def main(args: Optional[List[str]] = None) -> int:
+    args = sys.argv[1:] if args is None else args
+    if len(args) == 0 or args[0] not in COMMANDS:
+        print(f"usage: python -m src.main {{{','.join(COMMANDS)}}} [-h] ...", file=sys.stderr)
+        return 2
+    return COMMANDS[args[0]](args[1:]) or 0
 
-    sol = p.solve_and_print()
+
+if __name__ == '__main__':
+    sys.exit(main())
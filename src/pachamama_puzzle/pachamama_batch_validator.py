@@ -0,0 +1,127 @@
+from typing import Final, Optional, Sequence, Tuple
+
+from src.pachamama_puzzle import pachamama_factory
+from src.pachamama_puzzle.pachamama_cell import PachamamaCell
+from src.pachamama_puzzle.pachamama_shape import PachamamaShape
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+NUMPY_AVAILABLE: Final = np is not None
+
+# The shape planes hold the index of the letter of every shape, so 0 ('X') is a cell without a shape.
+SHAPE_LETTERS: Final = tuple(pachamama_factory.LETTER_TO_SHAPE)
+_SHAPE_CODES: Final = {shape: code for code, shape in enumerate(pachamama_factory.LETTER_TO_SHAPE.values())}
+
+
+def encode_grids(simple_representations: Sequence[Tuple[Tuple[str, ...], ...]]) -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    The number and shape planes of grids of the same size in the format of create_pachamama_puzzle, as integer
+    arrays shaped (B, N, M). A cell without a number has 0 in the number plane.
+    """
+    _check_numpy()
+    if len(simple_representations) == 0 or len(set(_get_size(grid) for grid in simple_representations)) != 1:
+        raise ValueError("There must be at least one grid, and all the grids must have the same size.")
+    cells = [[[pachamama_factory.create_pachamama_cell(cell) for cell in row] for row in grid]
+             for grid in simple_representations]
+    numbers = np.array([[[cell.number or 0 for cell in row] for row in grid] for grid in cells], dtype=np.int64)
+    shapes = np.array([[[_SHAPE_CODES[cell.shape] for cell in row] for row in grid] for grid in cells], dtype=np.int64)
+    return numbers, shapes
+
+
+def validate_grids(numbers: "np.ndarray", shapes: "np.ndarray", puzzle_numbers: Optional["np.ndarray"] = None,
+                   puzzle_shapes: Optional["np.ndarray"] = None) -> "np.ndarray":
+    """
+    Whether each of the grids in the (B, N, M) planes is a legal solution, as a boolean array shaped (B,).
+    If the planes of a puzzle are given (shaped (N, M) or (1, N, M) for all the grids, or (B, N, M) for one puzzle per
+    grid), a grid must also keep the givens of its puzzle, as in PachamamaPuzzle.is_sol_legal, so no grid is legal
+    for a puzzle of another size.
+    """
+    _check_numpy()
+    numbers = np.asarray(numbers, dtype=np.int64)
+    shapes = np.asarray(shapes, dtype=np.int64)
+    if numbers.ndim != 3 or numbers.shape != shapes.shape:
+        raise ValueError("The number and shape planes must have the same shape (B, N, M).")
+
+    # Only the codes of actual numbers and shapes make a filled cell.
+    is_legal = np.all((numbers > 0) & (numbers <= PachamamaCell.MAX_REGION_SIZE) & (shapes > 0)
+                      & (shapes <= len(PachamamaShape)), axis=(1, 2))
+    for puzzle_plane, plane in ((puzzle_numbers, numbers), (puzzle_shapes, shapes)):
+        if puzzle_plane is None:
+            continue
+        puzzle_plane = np.asarray(puzzle_plane)
+        if puzzle_plane.ndim not in (2, 3) or puzzle_plane.ndim == 3 and puzzle_plane.shape[0] not in (1, len(plane)):
+            raise ValueError("The planes of the puzzle must be shaped (N, M) or (B, N, M).")
+        if puzzle_plane.shape[-2:] != plane.shape[1:]:
+            return np.zeros(plane.shape[0], dtype=bool)
+        is_legal &= np.all((puzzle_plane == 0) | (puzzle_plane == plane), axis=(1, 2))
+
+    # Every cell against the cells to its right, below it, and below it on both diagonals.
+    for first, second in _get_neighbor_slices(numbers.shape[2]):
+        is_legal &= ~np.any(numbers[first] == numbers[second], axis=(1, 2))
+
+    labels = _label_regions(shapes)
+    # Adjacent cells of the same shape are always in the same region, so only the diagonal ones can be in another
+    # region of that shape.
+    for first, second in _get_neighbor_slices(numbers.shape[2])[2:]:
+        is_legal &= ~np.any((shapes[first] == shapes[second]) & (labels[first] != labels[second]), axis=(1, 2))
+
+    # With the labels made unique across the stack, a region of n cells must have each of the numbers 1 to n once.
+    num_of_grids, num_of_cells = numbers.shape[0], numbers.shape[1] * numbers.shape[2]
+    global_labels = (labels.reshape(num_of_grids, num_of_cells)
+                     + np.arange(num_of_grids)[:, None] * num_of_cells).ravel()
+    sizes = np.bincount(global_labels, minlength=num_of_grids * num_of_cells)[global_labels]
+    flat_numbers = np.clip(numbers.ravel(), 0, PachamamaCell.MAX_REGION_SIZE)
+    number_counts = np.bincount(global_labels * (PachamamaCell.MAX_REGION_SIZE + 1) + flat_numbers,
+                                minlength=num_of_grids * num_of_cells * (PachamamaCell.MAX_REGION_SIZE + 1))
+    is_cell_legal = (sizes <= PachamamaCell.MAX_REGION_SIZE) & (numbers.ravel() <= sizes) \
+        & (number_counts[global_labels * (PachamamaCell.MAX_REGION_SIZE + 1) + flat_numbers] == 1)
+    is_legal &= np.all(is_cell_legal.reshape(num_of_grids, num_of_cells), axis=1)
+    return is_legal
+
+
+def _label_regions(shapes: "np.ndarray") -> "np.ndarray":
+    """
+    The region of every cell, as the lowest index (row * M + col) of a cell in it, shaped like the shape planes.
+    Every label takes the lowest label of its neighbors of the same shape and then the label of its label, until no
+    label changes in the whole stack.
+    """
+    num_of_grids, num_of_rows, num_of_cols = shapes.shape
+    labels = np.broadcast_to(np.arange(num_of_rows * num_of_cols).reshape(num_of_rows, num_of_cols),
+                             shapes.shape).copy()
+    while True:
+        new_labels = labels.copy()
+        for first, second in _get_neighbor_slices(num_of_cols)[:2]:
+            is_same_shape = shapes[first] == shapes[second]
+            np.minimum(new_labels[first], np.where(is_same_shape, labels[second], new_labels[first]),
+                       out=new_labels[first])
+            np.minimum(new_labels[second], np.where(is_same_shape, labels[first], new_labels[second]),
+                       out=new_labels[second])
+        flat_labels = new_labels.reshape(num_of_grids, -1)
+        new_labels = np.take_along_axis(flat_labels, flat_labels, axis=1).reshape(shapes.shape)
+        if np.array_equal(new_labels, labels):
+            return labels
+        labels = new_labels
+
+
+def _get_neighbor_slices(num_of_cols: int) -> Tuple[Tuple[tuple, tuple], ...]:
+    # Pairs of views of the (B, N, M) planes, where the cells in the second view are to the right of, below, below
+    # and to the right of, and below and to the left of the cells in the first view.
+    everything = slice(None)
+    return (
+        ((everything, everything, slice(0, num_of_cols - 1)), (everything, everything, slice(1, None))),
+        ((everything, slice(0, -1), everything), (everything, slice(1, None), everything)),
+        ((everything, slice(0, -1), slice(0, num_of_cols - 1)), (everything, slice(1, None), slice(1, None))),
+        ((everything, slice(0, -1), slice(1, None)), (everything, slice(1, None), slice(0, num_of_cols - 1))),
+    )
+
+
+def _get_size(simple_representation: Tuple[Tuple[str, ...], ...]) -> Tuple[int, ...]:
+    return (len(simple_representation),) + tuple(len(row) for row in simple_representation)
+
+
+def _check_numpy():
+    if not NUMPY_AVAILABLE:
+        raise ImportError("The batch validator requires numpy.")
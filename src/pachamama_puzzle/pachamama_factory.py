@@ -11,13 +11,13 @@ LETTER_TO_SHAPE = {'X': None, 'C': PachamamaShape.CIRCLE, 'T': PachamamaShape.TR
 
 
 def create_pachamama_puzzle(simple_representation: Tuple[Tuple[str, ...], ...]) -> PachamamaPuzzle:
-    grid = tuple(tuple(_create_pachamama_cell(cell) for cell in row) for row in simple_representation)
+    grid = tuple(tuple(create_pachamama_cell(cell) for cell in row) for row in simple_representation)
     if all((isinstance(cell, PachamamaFilledCell) for row in grid for cell in row)):
         return PachamamaSolvedPuzzle(grid)
     return PachamamaPuzzle(grid)
 
 
-def _create_pachamama_cell(string_representation: str) -> PachamamaCell:
+def create_pachamama_cell(string_representation: str) -> PachamamaCell:
     if len(string_representation) != 2:
         raise ValueError(_get_representation_explanation() + f"The problematic cell: {string_representation}")
     cell_num = _get_cell_num(string_representation[0])
@@ -0,0 +1,145 @@
+import functools
+from typing import Dict, Final, List, NamedTuple, Tuple
+
+from src.pachamama_puzzle.pachamama_cell import PachamamaCell
+from src.pachamama_puzzle.pachamama_puzzle import PachamamaPuzzle
+
+Polyomino = Tuple[Tuple[int, int], ...]
+
+
+class PachamamaPlacement(NamedTuple):
+    """
+    A region that fits in the grid: its cells, and the cells outside it that are adjacent to one of them.
+    The masks have the bit row * num_of_cols + col set for every cell (row, col) in the matching tuple.
+    """
+    cells: Tuple[Tuple[int, int], ...]
+    cells_mask: int
+    border: Tuple[Tuple[int, int], ...]
+    border_mask: int
+
+
+class PachamamaPlacementTable:
+    """
+    Every placement of a polyomino of up to PachamamaCell.MAX_REGION_SIZE cells (in all its orientations) in a grid of
+    a given size, and for every cell, the placements that cover it.
+    The placements are filtered with a few integer operations each, so a whole region can be chosen at once.
+    """
+
+    def __init__(self, num_of_rows: int, num_of_cols: int):
+        if num_of_rows <= 0 or num_of_cols <= 0:
+            raise ValueError("A grid must have at least one row and one column.")
+        self.num_of_rows: Final = num_of_rows
+        self.num_of_cols: Final = num_of_cols
+        self.placements: Final = tuple(
+            self._get_placement(polyomino, row, col) for polyomino in _get_polyominoes(PachamamaCell.MAX_REGION_SIZE)
+            for row in range(num_of_rows - max(cell_row for cell_row, _ in polyomino))
+            for col in range(num_of_cols - max(cell_col for _, cell_col in polyomino)))
+        placements_of_cell = [[] for _ in range(num_of_rows * num_of_cols)]
+        for placement in self.placements:
+            for row, col in placement.cells:
+                placements_of_cell[self._get_index(row, col)].append(placement)
+        self._placements_of_cell: Final = tuple(tuple(placements) for placements in placements_of_cell)
+
+    def get_cell_mask(self, row: int, col: int) -> int:
+        return 1 << self._get_index(row, col)
+
+    def get_placements_of_cell(self, row: int, col: int) -> Tuple[PachamamaPlacement, ...]:
+        return self._placements_of_cell[self._get_index(row, col)]
+
+    def get_consistent_placements(self, row: int, col: int, required_mask: int = 0, forbidden_mask: int = 0,
+                                  forbidden_border_mask: int = 0, min_size: int = 1,
+                                  max_size: int = PachamamaCell.MAX_REGION_SIZE) -> List[PachamamaPlacement]:
+        """
+        The placements that cover the given cell and all the cells in required_mask, with between min_size and
+        max_size cells, none of them in forbidden_mask, and none of the cells around them in forbidden_border_mask.
+        """
+        return [placement for placement in self.get_placements_of_cell(row, col)
+                if min_size <= len(placement.cells) <= max_size
+                and placement.cells_mask & required_mask == required_mask
+                and placement.cells_mask & forbidden_mask == 0
+                and placement.border_mask & forbidden_border_mask == 0]
+
+    def get_candidate_regions(self, puzzle: PachamamaPuzzle, row: int, col: int) -> List[PachamamaPlacement]:
+        """
+        The placements that may be the region of the given cell in a solution, judging by the givens alone: no two
+        cells in a region have the same number, and no number is larger than the region. If the shape of the cell is
+        given, the region has no cell of another given shape, and no cell of the same given shape is next to it.
+        """
+        if puzzle.num_of_rows != self.num_of_rows or puzzle.num_of_cols != self.num_of_cols:
+            raise ValueError("The puzzle must have the size of the table.")
+        shape_masks = self._get_masks(puzzle, lambda cell: cell.shape)
+        number_masks = self._get_masks(puzzle, lambda cell: cell.number)
+
+        forbidden_mask = 0
+        forbidden_border_mask = 0
+        shape = puzzle.puzzle[row][col].shape
+        if shape is not None:
+            forbidden_mask = sum(mask for other_shape, mask in shape_masks.items() if other_shape != shape)
+            forbidden_border_mask = shape_masks.get(shape, 0)
+        # The numbers larger than each size, so a placement of size n must avoid too_large_masks[n].
+        too_large_masks = [sum(mask for number, mask in number_masks.items() if number > size)
+                           for size in range(PachamamaCell.MAX_REGION_SIZE + 1)]
+
+        return [placement for placement in self.get_consistent_placements(
+                    row, col, forbidden_mask=forbidden_mask, forbidden_border_mask=forbidden_border_mask)
+                if placement.cells_mask & too_large_masks[len(placement.cells)] == 0
+                and all(_has_at_most_one_bit(placement.cells_mask & mask) for mask in number_masks.values())]
+
+    def _get_placement(self, polyomino: Polyomino, row: int, col: int) -> PachamamaPlacement:
+        cells = tuple((row + cell_row, col + cell_col) for cell_row, cell_col in polyomino)
+        border = tuple((row + border_row, col + border_col) for border_row, border_col in _get_border(polyomino)
+                       if 0 <= row + border_row < self.num_of_rows and 0 <= col + border_col < self.num_of_cols)
+        return PachamamaPlacement(cells, self._get_mask(cells), border, self._get_mask(border))
+
+    def _get_masks(self, puzzle: PachamamaPuzzle, get_value) -> Dict:
+        masks = {}
+        for row in range(self.num_of_rows):
+            for col in range(self.num_of_cols):
+                value = get_value(puzzle.puzzle[row][col])
+                if value is not None:
+                    masks[value] = masks.get(value, 0) | self.get_cell_mask(row, col)
+        return masks
+
+    def _get_mask(self, cells: Tuple[Tuple[int, int], ...]) -> int:
+        return sum(self.get_cell_mask(row, col) for row, col in cells)
+
+    def _get_index(self, row: int, col: int) -> int:
+        return row * self.num_of_cols + col
+
+
+@functools.lru_cache(maxsize=None)
+def get_placement_table(num_of_rows: int, num_of_cols: int) -> PachamamaPlacementTable:
+    return PachamamaPlacementTable(num_of_rows, num_of_cols)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_polyominoes(max_size: int) -> Tuple[Polyomino, ...]:
+    """
+    All the polyominoes of up to max_size cells, with rotations and reflections counted as different ones, each moved
+    so that its top row and its leftmost column are 0.
+    """
+    polyominoes_of_size = [{((0, 0),)}]
+    for _ in range(max_size - 1):
+        polyominoes_of_size.append(set(
+            _normalize(polyomino + (adjacent,))
+            for polyomino in polyominoes_of_size[-1] for cell in polyomino
+            for adjacent in PachamamaPuzzle._get_possible_adjacent_indices(*cell) if adjacent not in polyomino))
+    return tuple(polyomino for polyominoes in polyominoes_of_size for polyomino in sorted(polyominoes))
+
+
+@functools.lru_cache(maxsize=None)
+def _get_border(polyomino: Polyomino) -> Polyomino:
+    # Relative to the polyomino, so some of these cells may be outside the grid once it is placed.
+    return tuple(sorted(set(adjacent for cell in polyomino for adjacent in PachamamaPuzzle
+                            ._get_possible_adjacent_indices(*cell) if adjacent not in polyomino)))
+
+
+def _normalize(cells: Polyomino) -> Polyomino:
+    top_row = min(row for row, _ in cells)
+    left_col = min(col for _, col in cells)
+    return tuple(sorted((row - top_row, col - left_col) for row, col in cells))
+
+
+def _has_at_most_one_bit(mask: int) -> bool:
+    return mask & (mask - 1) == 0
+
@@ -0,0 +1,107 @@
+from typing import Final, Hashable, List, NamedTuple, Optional, Sequence, Tuple
+
+
+class PachamamaRegionLabels(NamedTuple):
+    """
+    The regions of a grid: labels[row * num_of_cols + col] is the region of the cell (row, col), and the regions are
+    numbered 0, 1, ... in the order of their first cells. For every region there is its size, its shape, and its
+    bounding box as (top row, leftmost column, bottom row, rightmost column).
+    """
+    num_of_cols: int
+    labels: List[int]
+    sizes: List[int]
+    shapes: List[Hashable]
+    bounding_boxes: List[Tuple[int, int, int, int]]
+
+    def get_label(self, row: int, col: int) -> int:
+        return self.labels[row * self.num_of_cols + col]
+
+    def get_num_of_regions(self) -> int:
+        return len(self.sizes)
+
+
+class PachamamaRegionUnionFind:
+    """
+    A union-find over flat cell indices, added in raster order. Every root is the first cell of its region, and keeps
+    the size of the region and the numbers in it (as a mask, with bit n for the number n).
+    """
+
+    def __init__(self):
+        self.parents: Final[List[int]] = []
+        self.sizes: Final[List[int]] = []
+        self.numbers_masks: Final[List[int]] = []
+        # Whether two cells of the region have the same number.
+        self.has_repeated_number: Final[List[bool]] = []
+
+    def add_cell(self, number: Optional[int] = None) -> int:
+        index = len(self.parents)
+        self.parents.append(index)
+        self.sizes.append(1)
+        self.numbers_masks.append(0 if number is None else 1 << number)
+        self.has_repeated_number.append(False)
+        return index
+
+    def find_root(self, index: int) -> int:
+        parents = self.parents
+        while parents[index] != index:
+            # Path halving keeps the trees shallow without a second walk.
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
+
+    def union(self, first: int, second: int) -> int:
+        """
+        Join the regions of the given cells, and return the root of the joined region.
+        """
+        first_root = self.find_root(first)
+        second_root = self.find_root(second)
+        if first_root == second_root:
+            return first_root
+        root, other_root = min(first_root, second_root), max(first_root, second_root)
+        self.parents[other_root] = root
+        self.sizes[root] += self.sizes[other_root]
+        self.has_repeated_number[root] = self.has_repeated_number[root] or self.has_repeated_number[other_root] \
+            or self.numbers_masks[root] & self.numbers_masks[other_root] != 0
+        self.numbers_masks[root] |= self.numbers_masks[other_root]
+        return root
+
+    def is_root(self, index: int) -> bool:
+        return self.parents[index] == index
+
+
+def label_regions(shapes: Sequence[Sequence[Hashable]]) -> PachamamaRegionLabels:
+    """
+    Group the cells of the grid into regions of adjacent cells with equal shapes. Each cell is joined to the cells
+    above it and to its left with a union-find over the cell indices, and the roots are then numbered densely.
+    """
+    num_of_rows: Final = len(shapes)
+    num_of_cols: Final = len(shapes[0])
+    union_find = PachamamaRegionUnionFind()
+    for row in range(num_of_rows):
+        shapes_row = shapes[row]
+        for col in range(num_of_cols):
+            index = union_find.add_cell()
+            if col > 0 and shapes_row[col - 1] == shapes_row[col]:
+                union_find.union(index - 1, index)
+            if row > 0 and shapes[row - 1][col] == shapes_row[col]:
+                union_find.union(index - num_of_cols, index)
+
+    labels = [-1] * len(union_find.parents)
+    label_of_root = {}
+    region_shapes = []
+    bounding_boxes = []
+    for row in range(num_of_rows):
+        for col in range(num_of_cols):
+            index = row * num_of_cols + col
+            root = union_find.find_root(index)
+            label = label_of_root.get(root)
+            if label is None:
+                label = label_of_root[root] = len(region_shapes)
+                region_shapes.append(shapes[row][col])
+                bounding_boxes.append((row, col, row, col))
+            labels[index] = label
+            top_row, left_col, bottom_row, right_col = bounding_boxes[label]
+            if col < left_col or col > right_col or row > bottom_row:
+                bounding_boxes[label] = (top_row, min(left_col, col), row, max(right_col, col))
+    sizes = [union_find.sizes[root] for root in label_of_root]
+    return PachamamaRegionLabels(num_of_cols, labels, sizes, region_shapes, bounding_boxes)
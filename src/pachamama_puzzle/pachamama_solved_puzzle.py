@@ -1,52 +1,66 @@
-from typing import Set
+from typing import Optional, Set
 
 from src.pachamama_puzzle.pachamama_cell import PachamamaCell
 from src.pachamama_puzzle.pachamama_filled_cell import PachamamaFilledCell
 from src.pachamama_puzzle.pachamama_puzzle import PachamamaPuzzle
 from src.pachamama_puzzle.pachamama_region import PachamamaRegion
+from src.pachamama_puzzle.pachamama_region_labels import PachamamaRegionLabels, PachamamaRegionUnionFind, \
+    label_regions
+from src.pachamama_puzzle.pachamama_violation import PachamamaRule, PachamamaViolation
 
 
 class PachamamaSolvedPuzzle(PachamamaPuzzle):
 
     def is_legal(self) -> bool:
-        for row in self.puzzle:
-            for cell in row:
-                if not isinstance(cell, PachamamaFilledCell):
-                    return False
-
-        for region in self._get_regions():
-            if len(region.cell_indices) > PachamamaCell.MAX_REGION_SIZE:
-                return False
-            for neighbor_x, neighbor_y in self._get_region_neighbor_indices(region):
-                if self.puzzle[neighbor_x][neighbor_y].shape == region.shape:
-                    return False
-            numbers_in_region = set(self.puzzle[x][y].number for x, y in region.cell_indices)
-            for i in range(1, len(region.cell_indices) + 1):
-                if i not in numbers_in_region:
-                    return False
+        return self.get_first_violation() is None
 
-        for i in range(self.num_of_rows):
-            for j in range(self.num_of_cols):
-                neighbor_numbers = set(self.puzzle[x][y].number for x, y in self._get_neighbor_indices(i, j))
-                if self.puzzle[i][j].number in neighbor_numbers:
-                    return False
+    def get_first_violation(self) -> Optional[PachamamaViolation]:
+        """
+        Check all the rules in a single pass over the grid, comparing every cell with the neighbors that were already
+        passed and joining it to their regions as it goes. Returns None if the solution is legal.
+        """
+        num_of_cols = self.num_of_cols
+        regions = PachamamaRegionUnionFind()
+        # Cells of the same shape that touch at a corner, which must end up in the same region.
+        touching_corners = []
+        for i, row in enumerate(self.puzzle):
+            for j, cell in enumerate(row):
+                if not isinstance(cell, PachamamaFilledCell):
+                    return PachamamaViolation(PachamamaRule.NOT_FILLED, i, j)
+                index = regions.add_cell(cell.number)
+                for x, y in ((i, j - 1), (i - 1, j - 1), (i - 1, j), (i - 1, j + 1)):
+                    if x < 0 or y < 0 or y >= num_of_cols:
+                        continue
+                    neighbor = self.puzzle[x][y]
+                    if neighbor.number == cell.number:
+                        return PachamamaViolation(PachamamaRule.NUMBERS_TOUCHING, i, j)
+                    if neighbor.shape != cell.shape:
+                        continue
+                    if x != i and y != j:
+                        touching_corners.append((x * num_of_cols + y, index))
+                        continue
+                    root = regions.union(x * num_of_cols + y, index)
+                    if regions.sizes[root] > PachamamaCell.MAX_REGION_SIZE:
+                        return PachamamaViolation(PachamamaRule.REGION_TOO_LARGE, i, j)
+                    if regions.has_repeated_number[root]:
+                        return PachamamaViolation(PachamamaRule.REGION_NUMBERS, i, j)
 
-        return True
+        for first, second in touching_corners:
+            if regions.find_root(first) != regions.find_root(second):
+                return PachamamaViolation(PachamamaRule.REGIONS_TOUCHING, *divmod(second, num_of_cols))
+        # A region of n cells has each of the numbers 1 to n once, and its root is its first cell.
+        for index in range(len(regions.parents)):
+            if regions.is_root(index) and regions.numbers_masks[index] != (1 << regions.sizes[index] + 1) - 2:
+                return PachamamaViolation(PachamamaRule.REGION_NUMBERS, *divmod(index, num_of_cols))
+        return None
 
     def _get_regions(self) -> Set[PachamamaRegion]:
-        cell_to_region = {(x, y): None for x in range(self.num_of_rows) for y in range(self.num_of_cols)}
+        labels = self._get_region_labels()
+        regions = [PachamamaRegion(shape) for shape in labels.shapes]
         for i in range(self.num_of_rows):
             for j in range(self.num_of_cols):
-                if cell_to_region.get((i, j)) is None:
-                    region_shape = self.puzzle[i][j].shape
-                    region = PachamamaRegion(region_shape)
-                    new_cells_in_region = {(i, j)}
-                    while len(new_cells_in_region) > 0:
-                        current_cell = new_cells_in_region.pop()
-                        cell_to_region[current_cell] = region
-                        region.add_cell(current_cell)
-                        for adjacent in self._get_adjacent_indices(current_cell[0], current_cell[1]):
-                            if cell_to_region[adjacent] is None \
-                                    and self.puzzle[adjacent[0]][adjacent[1]].shape == region_shape:
-                                new_cells_in_region.add(adjacent)
-        return set(cell_to_region.values())
+                regions[labels.get_label(i, j)].add_cell((i, j))
+        return set(regions)
+
+    def _get_region_labels(self) -> PachamamaRegionLabels:
+        return label_regions([[cell.shape for cell in row] for row in self.puzzle])
@@ -0,0 +1,690 @@
+import operator
+import time
+from typing import Dict, Final, List, NamedTuple, Optional, Tuple
+
+from src.components.trail import Trail
+from src.components.unsolvable_error import UnsolvableError
+from src.pachamama_puzzle.pachamama_cell import PachamamaCell
+from src.pachamama_puzzle.pachamama_filled_cell import PachamamaFilledCell
+from src.pachamama_puzzle.pachamama_placement_table import get_placement_table
+from src.pachamama_puzzle.pachamama_shape import PachamamaShape
+from src.pachamama_puzzle.pachamama_solved_puzzle import PachamamaSolvedPuzzle
+
+MAX_REGION_SIZE: Final = PachamamaCell.MAX_REGION_SIZE
+SHAPES: Final = tuple(PachamamaShape)
+NUMBERS: Final = tuple(range(1, MAX_REGION_SIZE + 1))
+MAX_NUM_OF_CACHED_REGIONS: Final = 1 << 12
+MAX_NUM_OF_REGION_CHECKS: Final = 1 << 14
+
+# The domain of a cell is a bitmask of the (number, shape) pairs it can still take. Shapes are referred to by their
+# index in SHAPES.
+_NUM_OF_PAIRS: Final = MAX_REGION_SIZE * len(SHAPES)
+_FULL_DOMAIN: Final = (1 << _NUM_OF_PAIRS) - 1
+
+
+def _get_pair_bit(number: int, shape_index: int) -> int:
+    return 1 << ((number - 1) * len(SHAPES) + shape_index)
+
+
+_NUMBER_MASKS: Final = (0,) + tuple(sum(_get_pair_bit(number, shape_index) for shape_index in range(len(SHAPES)))
+                                    for number in NUMBERS)
+_SHAPE_MASKS: Final = tuple(sum(_get_pair_bit(number, shape_index) for number in NUMBERS)
+                            for shape_index in range(len(SHAPES)))
+# The pairs with a number of at most n, by n.
+_NUMBERS_UP_TO_MASKS: Final = tuple(sum(_NUMBER_MASKS[1:n + 1]) for n in range(MAX_REGION_SIZE + 1))
+# The pairs with any of the numbers in a set of numbers, given as a mask with bit n for the number n.
+_NUMBER_SET_MASKS: Final = tuple(sum(_NUMBER_MASKS[number] for number in NUMBERS if number_set >> number & 1)
+                                 for number_set in range(1 << (MAX_REGION_SIZE + 1)))
+
+
+def _get_domain_table(get_entry) -> tuple:
+    return tuple(get_entry(domain) for domain in range(_FULL_DOMAIN + 1))
+
+
+# Facts about every possible domain: the number it fixes (or 0), the shape it fixes (or -1), its number of pairs and
+# the shapes it allows.
+_FIXED_NUMBERS: Final = _get_domain_table(lambda domain: next(
+    (number for number in NUMBERS if domain != 0 and domain & ~_NUMBER_MASKS[number] == 0), 0))
+_FIXED_SHAPES: Final = _get_domain_table(lambda domain: next(
+    (shape_index for shape_index, shape_mask in enumerate(_SHAPE_MASKS) if domain != 0 and domain & ~shape_mask == 0),
+    -1))
+_DOMAIN_SIZES: Final = _get_domain_table(lambda domain: bin(domain).count("1"))
+_DOMAIN_SHAPES: Final = _get_domain_table(lambda domain: tuple(
+    shape_index for shape_index, shape_mask in enumerate(_SHAPE_MASKS) if domain & shape_mask))
+# The numbers the domain allows, as a mask with bit n for the number n.
+_NUMBER_SETS: Final = _get_domain_table(lambda domain: sum(1 << number for number in NUMBERS
+                                                           if domain & _NUMBER_MASKS[number]))
+_NUMBER_SET_SIZES: Final = tuple(bin(number_set).count("1") for number_set in range(1 << (MAX_REGION_SIZE + 1)))
+# The bit index of every pair in the domain.
+_DOMAIN_PAIRS: Final = _get_domain_table(lambda domain: tuple(
+    pair for pair in range(_NUM_OF_PAIRS) if domain >> pair & 1))
+
+
+# The sets of at least 2 of the 4 cells of a 2x2 block (by their index in the block) that are in a given set (as a mask
+# with bit i for the cell i), each with the other cells of the block.
+_BLOCK_SUBSETS: Final = tuple(tuple((tuple(index for index in range(4) if subset >> index & 1),
+                                     tuple(index for index in range(4) if not subset >> index & 1))
+                                    for subset in range(16) if subset & ~cells == 0 and bin(subset).count("1") >= 2)
+                              for cells in range(16))
+
+
+class _ShapeCells(NamedTuple):
+    # Masks of the cells that can take a shape: with each number n (with any number for n = 0), with any number up to
+    # n, with no number but n, with a single number, and with no other shape.
+    cells_with_number: Tuple[int, ...]
+    cells_up_to_number: Tuple[int, ...]
+    cells_with_only_number: Tuple[int, ...]
+    cells_with_fixed_number: int
+    fixed_shape_cells: int
+
+
+class _RegionPlacements(NamedTuple):
+    # The placements over a region, each referred to by its index, so sets of them are masks with a bit per index.
+    all_placements: int
+    # By size n: the placements of n cells, of at most n cells, and of at least n cells.
+    placements_of_size: Tuple[int, ...]
+    placements_of_size_at_most: Tuple[int, ...]
+    placements_of_size_at_least: Tuple[int, ...]
+    # By cell: the placements it is in, and the placements it is around.
+    placements_with_cell: List[int]
+    placements_around_cell: List[int]
+    cells: int
+    other_cells: Tuple[int, ...]
+    border_cells: int
+    read_cells: Tuple[int, ...]
+    get_read_domains: operator.itemgetter
+
+
+class PachamamaSolver:
+    """
+    Solves a Pachamama puzzle by constraint propagation and backtracking.
+    Every cell keeps the (number, shape) pairs it can still take, and the rules remove pairs until nothing changes:
+    - A number is never next to (including diagonally) the same number, so the 4 cells of a 2x2 block have different
+      numbers, and if some of them can only take as many numbers as there are of them, the others cannot take these.
+    - Diagonal neighbors of the same shape are in the same region, so (since regions have at most MAX_REGION_SIZE
+      cells) one of the two cells next to both of them has that shape too.
+    - Cells of the same shape next to each other form a region of at most MAX_REGION_SIZE cells, with different
+      numbers, which are exactly 1 to its size. So a number n needs the numbers below it in cells its region can reach.
+    - A region whose shape is known is one of the placements of a polyomino over its cells (see
+      PachamamaPlacementTable) that the domains allow, so the cells in all of them are in it, and the cells around
+      all of them are not.
+    The cheap rules run on the cells that changed, and the region rules on the whole grid once those are done. The
+    search then branches on the shape of the cell with the fewest shapes left (and the most solved neighbors), and on
+    numbers once all the shapes are known. Domains are recorded on a trail before they change, so backtracking only
+    undoes what changed.
+    For every pair there is a mask of the cells that can take it (with bit row * num_of_cols + col for the cell), so
+    the region rules work on whole sets of cells at once.
+    """
+
+    def __init__(self, puzzle):
+        self.num_of_rows: Final = puzzle.num_of_rows
+        self.num_of_cols: Final = puzzle.num_of_cols
+        self.num_of_guesses = 0
+        self._trail: Final = Trail()
+        self._changed_cells: Final[List[int]] = []
+        self._solutions: Optional[List[PachamamaSolvedPuzzle]] = None
+        self._solutions_limit = 0
+        self._deadline: Optional[float] = None
+        cells = [self._get_cell(index) for index in range(self.num_of_rows * self.num_of_cols)]
+        self._neighbors: Final = [[self._get_index(*neighbor) for neighbor in puzzle._get_neighbor_indices(row, col)]
+                                  for row, col in cells]
+        self._blocks: Final = [self._get_blocks(row, col) for row, col in cells]
+        self._diagonals: Final = [self._get_diagonals(row, col) for row, col in cells]
+        self._domains: Final = [self._get_initial_domain(puzzle.puzzle[row][col]) for row, col in cells]
+        self._cells_with_pair: Final = [0] * _NUM_OF_PAIRS
+        for index, domain in enumerate(self._domains):
+            for pair in _DOMAIN_PAIRS[domain]:
+                self._cells_with_pair[pair] |= 1 << index
+        self._all_cells_mask: Final = (1 << len(self._domains)) - 1
+        self._not_first_col_mask: Final = sum(1 << index for index, (_, col) in enumerate(cells) if col > 0)
+        self._not_last_col_mask: Final = sum(1 << index for index, (_, col) in enumerate(cells)
+                                             if col < self.num_of_cols - 1)
+        self._placement_table: Final = get_placement_table(self.num_of_rows, self.num_of_cols)
+        self._shape_cells: Final[List[Optional[_ShapeCells]]] = [None] * len(SHAPES)
+        # The placements over every region seen so far, by the mask of its cells.
+        self._region_placements: Final[Dict[int, _RegionPlacements]] = {}
+        self._regions: Final[Dict[int, Tuple[int, ...]]] = {}
+        # The domains a region check last read, by the mask of the region. The check would find the same things
+        # again as long as they have not changed, so it is skipped.
+        self._region_checks: Final[Dict[tuple, Optional[tuple]]] = {}
+
+    def solve(self) -> Optional[PachamamaSolvedPuzzle or Tuple[PachamamaSolvedPuzzle, PachamamaSolvedPuzzle]]:
+        """
+        Returns the solution if there is exactly one, a tuple of 2 solutions if there are several, or None if there
+        are none.
+        """
+        num_of_solutions = self.count_solutions(2)
+        if num_of_solutions == 0:
+            return None
+        if num_of_solutions > 1:
+            return self._solutions[0], self._solutions[1]
+        return self._solutions[0]
+
+    def count_solutions(self, limit: int = 2, timeout: Optional[float] = None) -> int:
+        """
+        Returns the number of solutions of the puzzle, or the given limit if there are at least that many.
+        The search stops as soon as limit solutions are found, or raises TimeoutError once it has taken over timeout
+        seconds (if given).
+        """
+        if limit < 1:
+            raise ValueError("The limit of solutions to count must be at least 1.")
+        if self._solutions is None or (len(self._solutions) == self._solutions_limit and limit > self._solutions_limit):
+            self._deadline = time.monotonic() + timeout if timeout is not None else None
+            try:
+                self._solutions = self._find_solutions(limit)
+            finally:
+                self._deadline = None
+            self._solutions_limit = limit
+        return min(len(self._solutions), limit)
+
+    def is_single_solution(self) -> bool:
+        return self.count_solutions(2) == 1
+
+    def restore_state(self, state: Tuple[int, int]):
+        index, domain = state
+        self._update_cells_with_pair(index, domain)
+        self._domains[index] = domain
+
+    def _find_solutions(self, limit: int) -> List[PachamamaSolvedPuzzle]:
+        checkpoint = self._trail.get_checkpoint()
+        solutions = []
+        self.num_of_guesses = 0
+        self._changed_cells.extend(range(len(self._domains)))
+        try:
+            self._propagate()
+            self._search(solutions, limit)
+        except UnsolvableError:
+            pass
+        finally:
+            self._rollback(checkpoint)
+        return solutions
+
+    def _search(self, solutions: List[PachamamaSolvedPuzzle], limit: int):
+        # Must be called on a propagated grid; callers should roll back afterwards.
+        index = self._get_most_constrained_cell()
+        if index is None:
+            solutions.append(self._get_solution())
+            return
+        if self._deadline is not None and time.monotonic() > self._deadline:
+            raise TimeoutError("The search for solutions took too long.")
+        domain = self._domains[index]
+        if _FIXED_SHAPES[domain] == -1:
+            pairs_to_try = domain & _SHAPE_MASKS[_DOMAIN_SHAPES[domain][0]]
+        else:
+            pairs_to_try = domain & -domain
+        self.num_of_guesses += 1
+        checkpoint = self._trail.get_checkpoint()
+        for new_domain in (pairs_to_try, domain & ~pairs_to_try):
+            try:
+                self._set_domain(index, new_domain)
+                self._propagate()
+                self._search(solutions, limit)
+            except UnsolvableError:
+                pass
+            self._rollback(checkpoint)
+            if len(solutions) >= limit:
+                return
+
+    def _get_most_constrained_cell(self) -> Optional[int]:
+        # Shapes are chosen before numbers, since they decide the regions. Among cells as constrained, those with more
+        # solved neighbors come first, since wrong guesses there fail sooner.
+        domains = self._domains
+        best_index = None
+        best_key = (len(SHAPES) + 2, _NUM_OF_PAIRS + 1, 0)
+        for index, domain in enumerate(domains):
+            size = _DOMAIN_SIZES[domain]
+            if size > 1:
+                num_of_shapes = len(_DOMAIN_SHAPES[domain])
+                num_of_solved_neighbors = sum(1 for neighbor in self._neighbors[index]
+                                              if _DOMAIN_SIZES[domains[neighbor]] == 1)
+                key = (num_of_shapes if num_of_shapes > 1 else len(SHAPES) + 1, size, -num_of_solved_neighbors)
+                if key < best_key:
+                    best_index = index
+                    best_key = key
+        return best_index
+
+    def _propagate(self):
+        while True:
+            self._propagate_changed_cells()
+            if not self._mark_regions() and not self._mark_region_sizes():
+                return
+
+    def _propagate_changed_cells(self):
+        domains = self._domains
+        while len(self._changed_cells) > 0:
+            index = self._changed_cells.pop()
+            number = _FIXED_NUMBERS[domains[index]]
+            if number != 0:
+                for neighbor in self._neighbors[index]:
+                    if domains[neighbor] & _NUMBER_MASKS[number]:
+                        self._set_domain(neighbor, domains[neighbor] & ~_NUMBER_MASKS[number])
+            for first, second, first_corner, second_corner in self._diagonals[index]:
+                self._mark_diagonal(first, second, first_corner, second_corner)
+                self._mark_diagonal(second, first, first_corner, second_corner)
+            for block in self._blocks[index]:
+                self._mark_block(block)
+
+    def _mark_diagonal(self, index: int, diagonal: int, first_corner: int, second_corner: int):
+        shape_index = _FIXED_SHAPES[self._domains[index]]
+        if shape_index == -1:
+            return
+        shape_mask = _SHAPE_MASKS[shape_index]
+        can_first_corner_connect = self._domains[first_corner] & shape_mask != 0
+        can_second_corner_connect = self._domains[second_corner] & shape_mask != 0
+        if can_first_corner_connect and can_second_corner_connect:
+            return
+        if _FIXED_SHAPES[self._domains[diagonal]] != shape_index:
+            if not can_first_corner_connect and not can_second_corner_connect:
+                self._remove_pairs(diagonal, shape_mask)
+        elif not can_first_corner_connect and not can_second_corner_connect:
+            raise UnsolvableError("Two diagonal cells of the same shape are in different regions.")
+        elif can_first_corner_connect:
+            self._keep_pairs(first_corner, shape_mask)
+        else:
+            self._keep_pairs(second_corner, shape_mask)
+
+    def _mark_block(self, block: Tuple[int, int, int, int]):
+        # The cells of a 2x2 block all touch each other, so they have different numbers. If some of them can only take
+        # as many numbers as there are of them, they take all these numbers, and the other cells do not.
+        number_sets = [_NUMBER_SETS[self._domains[index]] for index in block]
+        # Only cells with fewer numbers than the block has cells can be in such a set.
+        small_cells = 0
+        for cell, number_set in enumerate(number_sets):
+            if _NUMBER_SET_SIZES[number_set] < 4:
+                small_cells |= 1 << cell
+        for subset, other_cells in _BLOCK_SUBSETS[small_cells]:
+            numbers = 0
+            for cell in subset:
+                numbers |= number_sets[cell]
+            num_of_numbers = _NUMBER_SET_SIZES[numbers]
+            if num_of_numbers < len(subset):
+                raise UnsolvableError("The cells of a 2x2 block cannot all have different numbers.")
+            if num_of_numbers == len(subset):
+                for cell in other_cells:
+                    if number_sets[cell] & numbers:
+                        self._remove_pairs(block[cell], _NUMBER_SET_MASKS[numbers])
+
+    def _mark_regions(self) -> bool:
+        # A check may fix the shapes of more cells, which then join a region. Checking the smaller region is still
+        # sound, and the joined one is checked in the next pass.
+        regions = [(region_mask, shape_index) for shape_index in range(len(SHAPES))
+                   for region_mask in self._get_regions(self._get_shape_cells(shape_index).fixed_shape_cells)]
+        changed = False
+        for region_mask, shape_index in regions:
+            if region_mask & (region_mask - 1):
+                changed = self._mark_region(region_mask, shape_index) or changed
+        if changed:
+            return True
+        # Single cells have by far the most placements, so they are only checked once the other regions have nothing
+        # more to find.
+        for region_mask, shape_index in regions:
+            if region_mask & (region_mask - 1) == 0:
+                changed = self._mark_region(region_mask, shape_index) or changed
+        return changed
+
+    def _get_regions(self, cells_mask: int) -> Tuple[int, ...]:
+        # The groups of connected cells in the mask, kept since the same cells come back often as the search
+        # backtracks.
+        regions = self._regions.get(cells_mask)
+        if regions is None:
+            if len(self._regions) >= MAX_NUM_OF_CACHED_REGIONS:
+                self._regions.clear()
+            regions = []
+            cells_to_check = cells_mask
+            while cells_to_check:
+                region_mask = self._get_component(cells_to_check & -cells_to_check, cells_mask)
+                cells_to_check &= ~region_mask
+                regions.append(region_mask)
+            regions = self._regions[cells_mask] = tuple(regions)
+        return regions
+
+    def _mark_region(self, region_mask: int, shape_index: int) -> bool:
+        # A check only reads the cells that its placements cover or touch, so the same domains there give the same
+        # changes (or the same failure, kept as None), and the search meets them again after every backtrack.
+        region_placements = self._get_region_placements(region_mask)
+        read_domains = region_placements.get_read_domains(self._domains)
+        key = (region_mask, read_domains)
+        if key not in self._region_checks:
+            if len(self._region_checks) >= MAX_NUM_OF_REGION_CHECKS:
+                self._region_checks.clear()
+            self._region_checks[key] = None
+            self._check_region(region_mask, shape_index, region_placements)
+            self._region_checks[key] = tuple(
+                (cell, domain) for cell, domain, old_domain in zip(
+                    region_placements.read_cells, region_placements.get_read_domains(self._domains), read_domains)
+                if domain != old_domain)
+            return len(self._region_checks[key]) > 0
+
+        changes = self._region_checks[key]
+        if changes is None:
+            raise UnsolvableError("A region fits nowhere.")
+        for cell, domain in changes:
+            self._set_domain(cell, domain)
+        return len(changes) > 0
+
+    def _check_region(self, region_mask: int, shape_index: int, region_placements: _RegionPlacements) -> bool:
+        domains = self._domains
+        region = _get_indices(region_mask)
+        if len(region) > MAX_REGION_SIZE:
+            raise UnsolvableError("A region is too large.")
+        changed = False
+
+        # The numbers in a region are all different.
+        numbers_mask = 0
+        num_of_unknown_numbers = 0
+        for cell in region:
+            number = _FIXED_NUMBERS[domains[cell]]
+            if number == 0:
+                num_of_unknown_numbers += 1
+            elif numbers_mask & _NUMBER_MASKS[number]:
+                raise UnsolvableError("A number appears twice in the same region.")
+            numbers_mask |= _NUMBER_MASKS[number]
+        if num_of_unknown_numbers > 0:
+            for cell in region:
+                if _FIXED_NUMBERS[domains[cell]] == 0:
+                    changed = self._remove_pairs(cell, numbers_mask) or changed
+
+        growth_mask = self._get_adjacent_cells(region_mask) & self._get_shape_cells(shape_index).cells_with_number[0]
+        if growth_mask == 0:
+            # The region is complete, so its cells take each of the numbers 1 to its size.
+            if num_of_unknown_numbers > 0:
+                for cell in region:
+                    changed = self._keep_pairs(cell, _NUMBERS_UP_TO_MASKS[len(region)]) or changed
+            cells_with_number = self._get_shape_cells(shape_index).cells_with_number
+            for number in NUMBERS[:len(region)]:
+                cells = region_mask & cells_with_number[number]
+                if cells == 0:
+                    raise UnsolvableError("A number is missing from a region.")
+                if cells & (cells - 1) == 0:
+                    changed = self._keep_pairs(cells.bit_length() - 1, _NUMBER_MASKS[number]) or changed
+            return changed
+        return self._mark_region_placements(region_mask, growth_mask, shape_index, region_placements) or changed
+
+    def _mark_region_placements(self, region_mask: int, growth_mask: int, shape_index: int,
+                                region_placements: _RegionPlacements) -> bool:
+        legal_placements = self._get_legal_placements(region_mask, shape_index, region_placements)
+        if legal_placements == 0:
+            raise UnsolvableError("A region fits nowhere.")
+        shape_cells = self._get_shape_cells(shape_index)
+        shape_mask = _SHAPE_MASKS[shape_index]
+
+        placements_with_cell = region_placements.placements_with_cell
+        # The placements with a cell that can only take each number, by the number. No other cell of them takes it.
+        placements_with_number = [0] * (MAX_REGION_SIZE + 1)
+        for cell in _get_indices(region_mask & shape_cells.cells_with_fixed_number):
+            placements_with_number[_FIXED_NUMBERS[self._domains[cell] & shape_mask]] = legal_placements
+        for cell in _get_indices(region_placements.cells & shape_cells.cells_with_fixed_number):
+            placements_with_number[_FIXED_NUMBERS[self._domains[cell] & shape_mask]] |= placements_with_cell[cell]
+
+        cells_in_placements = region_mask
+        common_cells = 0
+        for cell in region_placements.other_cells:
+            placements = legal_placements & placements_with_cell[cell]
+            if placements:
+                cells_in_placements |= 1 << cell
+                if placements == legal_placements:
+                    common_cells |= 1 << cell
+
+        changed = False
+        for cell in _get_indices(common_cells & ~shape_cells.fixed_shape_cells):
+            changed = self._keep_pairs(cell, shape_mask) or changed
+        # The cells next to the region that are in no placement, or around all of them, do not take its shape.
+        for cell in _get_indices(growth_mask & ~cells_in_placements):
+            changed = self._remove_pairs(cell, shape_mask) or changed
+        for cell in _get_indices(region_placements.border_cells & shape_cells.cells_with_number[0]):
+            if legal_placements & ~region_placements.placements_around_cell[cell] == 0:
+                changed = self._remove_pairs(cell, shape_mask) or changed
+        # A cell of the region, or next to it, takes a number only in the placements of at least that many cells in
+        # which no other cell has to take it.
+        cells_to_narrow = (growth_mask | region_mask) & cells_in_placements & ~shape_cells.cells_with_fixed_number
+        for cell in _get_indices(cells_to_narrow):
+            placements = legal_placements & placements_with_cell[cell]
+            numbers_to_remove = 0
+            for number in NUMBERS:
+                if placements & region_placements.placements_of_size_at_least[number] \
+                        & ~placements_with_number[number] == 0:
+                    numbers_to_remove |= 1 << number
+            changed = self._remove_pairs(cell, shape_mask & _NUMBER_SET_MASKS[numbers_to_remove]) or changed
+        # A number every placement needs, which only one cell of them can take.
+        for number in NUMBERS:
+            if legal_placements & region_placements.placements_of_size_at_most[number - 1]:
+                break
+            cells = cells_in_placements & shape_cells.cells_with_number[number]
+            if cells & (cells - 1) == 0:
+                changed = self._keep_pairs(cells.bit_length() - 1, shape_mask & _NUMBER_MASKS[number]) or changed
+        return changed
+
+    def _get_legal_placements(self, region_mask: int, shape_index: int,
+                              region_placements: _RegionPlacements) -> int:
+        """
+        The placements over the region (as a mask of their indices in region_placements) whose cells can all take its
+        shape, and can take each of the numbers 1 to their number of cells with no number twice (as far as counting
+        the cells that can take each number tells), and that have no cell of the same shape around them.
+        """
+        shape_cells = self._get_shape_cells(shape_index)
+        placements_with_cell = region_placements.placements_with_cell
+        illegal_placements = 0
+        for cell in _get_indices(region_placements.border_cells & shape_cells.fixed_shape_cells):
+            illegal_placements |= region_placements.placements_around_cell[cell]
+        # A placement of size n cannot have a cell that can only take larger numbers. Fewer cells are excluded from
+        # larger placements, so the placements with each excluded cell are only collected once.
+        placements_with_excluded_cells = 0
+        larger_excluded_cells = 0
+        for size in range(MAX_REGION_SIZE, 0, -1):
+            if region_mask & ~shape_cells.cells_up_to_number[size]:
+                illegal_placements |= region_placements.placements_of_size_at_most[size]
+                break
+            excluded_cells = region_placements.cells & ~shape_cells.cells_up_to_number[size]
+            for cell in _get_indices(excluded_cells & ~larger_excluded_cells):
+                placements_with_excluded_cells |= placements_with_cell[cell]
+            larger_excluded_cells = excluded_cells
+            illegal_placements |= placements_with_excluded_cells & region_placements.placements_of_size[size]
+        legal_placements = region_placements.all_placements & ~illegal_placements
+
+        for number in NUMBERS:
+            if legal_placements == 0:
+                break
+            # Every placement of at least this size has a cell that can take the number, and at most one cell that
+            # can only take the number.
+            if region_mask & shape_cells.cells_with_number[number] == 0:
+                placements_with_number = 0
+                for cell in _get_indices(region_placements.cells & shape_cells.cells_with_number[number]):
+                    placements_with_number |= placements_with_cell[cell]
+                legal_placements &= placements_with_number | ~region_placements.placements_of_size_at_least[number]
+            cells_with_only_number = region_placements.cells & shape_cells.cells_with_only_number[number]
+            if region_mask & shape_cells.cells_with_only_number[number]:
+                for cell in _get_indices(cells_with_only_number):
+                    legal_placements &= ~placements_with_cell[cell]
+            else:
+                placements_with_only_number = 0
+                for cell in _get_indices(cells_with_only_number):
+                    legal_placements &= ~(placements_with_only_number & placements_with_cell[cell])
+                    placements_with_only_number |= placements_with_cell[cell]
+        return legal_placements
+
+    def _get_region_placements(self, region_mask: int) -> _RegionPlacements:
+        # The placements over a region do not depend on the domains, so they are found once per region.
+        region_placements = self._region_placements.get(region_mask)
+        if region_placements is None:
+            region_placements = self._create_region_placements(region_mask)
+            self._region_placements[region_mask] = region_placements
+        return region_placements
+
+    def _create_region_placements(self, region_mask: int) -> _RegionPlacements:
+        cell = region_mask.bit_length() - 1
+        placements = [placement for placement in self._placement_table.get_placements_of_cell(*self._get_cell(cell))
+                      if placement.cells_mask & region_mask == region_mask]
+        num_of_cols = self.num_of_cols
+        placements_with_cell = [0] * len(self._domains)
+        placements_around_cell = [0] * len(self._domains)
+        placements_of_size = [0] * (MAX_REGION_SIZE + 1)
+        cells = 0
+        border_cells = 0
+        for placement_index, placement in enumerate(placements):
+            placement_bit = 1 << placement_index
+            for row, col in placement.cells:
+                placements_with_cell[row * num_of_cols + col] |= placement_bit
+            for row, col in placement.border:
+                placements_around_cell[row * num_of_cols + col] |= placement_bit
+            placements_of_size[len(placement.cells)] |= placement_bit
+            cells |= placement.cells_mask
+            border_cells |= placement.border_mask
+        cells &= ~region_mask
+        # A getter of a single item returns the item rather than a tuple, so the region's cell is always added.
+        read_cells = tuple(_get_indices(region_mask | cells | border_cells)) + (cell,)
+        get_read_domains = operator.itemgetter(*read_cells)
+        return _RegionPlacements(
+            (1 << len(placements)) - 1, tuple(placements_of_size),
+            tuple(sum(placements_of_size[:size + 1]) for size in range(MAX_REGION_SIZE + 1)),
+            tuple(sum(placements_of_size[size:]) for size in range(MAX_REGION_SIZE + 1)),
+            placements_with_cell, placements_around_cell, cells, tuple(_get_indices(cells)), border_cells,
+            read_cells, get_read_domains)
+
+    def _mark_region_sizes(self) -> bool:
+        # A cell with number n is in a region of at least n cells, which has all the numbers below n in its other
+        # cells. These cells are all connected to it through cells that can have its shape.
+        changed = False
+        for shape_index, shape_mask in enumerate(_SHAPE_MASKS):
+            cells_with_number = self._get_shape_cells(shape_index).cells_with_number
+            # The cells that can take a number above n, by n.
+            cells_above_number = [0] * (MAX_REGION_SIZE + 1)
+            for number in range(MAX_REGION_SIZE - 1, -1, -1):
+                cells_above_number[number] = cells_above_number[number + 1] | cells_with_number[number + 1]
+            cells_to_check = cells_with_number[0]
+            while cells_to_check:
+                component_mask = self._get_component(cells_to_check & -cells_to_check, cells_with_number[0])
+                cells_to_check &= ~component_mask
+                max_size = min(_count_cells(component_mask), MAX_REGION_SIZE)
+                # The cells that can take no number above n, by n.
+                cells_up_to_number = [0] * (MAX_REGION_SIZE + 1)
+                cells_up_to_number[max_size] = component_mask
+                for number in NUMBERS[:max_size - 1]:
+                    cells = component_mask & cells_with_number[number]
+                    if cells == 0:
+                        cells_up_to_number[number] |= component_mask
+                        break
+                    if cells & (cells - 1) == 0:
+                        cells_up_to_number[number] |= cells
+                for number, cells in enumerate(cells_up_to_number):
+                    for cell in _get_indices(cells & cells_above_number[number]):
+                        changed = self._remove_pairs(cell, shape_mask & ~_NUMBERS_UP_TO_MASKS[number]) or changed
+        return changed
+
+    def _get_shape_cells(self, shape_index: int) -> _ShapeCells:
+        # Kept until any domain changes.
+        shape_cells = self._shape_cells[shape_index]
+        if shape_cells is None:
+            shape_cells = self._shape_cells[shape_index] = self._create_shape_cells(shape_index)
+        return shape_cells
+
+    def _create_shape_cells(self, shape_index: int) -> _ShapeCells:
+        cells_with_number = [0] + [self._cells_with_pair[(number - 1) * len(SHAPES) + shape_index]
+                                   for number in NUMBERS]
+        cells_up_to_number = [0] * (MAX_REGION_SIZE + 1)
+        cells_with_several_numbers = 0
+        for number in NUMBERS:
+            cells_with_several_numbers |= cells_up_to_number[number - 1] & cells_with_number[number]
+            cells_up_to_number[number] = cells_up_to_number[number - 1] | cells_with_number[number]
+        cells_with_number[0] = cells_up_to_number[MAX_REGION_SIZE]
+        cells_with_other_shapes = 0
+        for other_shape_index in range(len(SHAPES)):
+            if other_shape_index != shape_index:
+                for number in NUMBERS:
+                    cells_with_other_shapes |= self._cells_with_pair[(number - 1) * len(SHAPES) + other_shape_index]
+        cells_with_only_number = [0] + [cells_with_number[number] & ~cells_with_several_numbers for number in NUMBERS]
+        return _ShapeCells(tuple(cells_with_number), tuple(cells_up_to_number), tuple(cells_with_only_number),
+                           cells_with_number[0] & ~cells_with_several_numbers,
+                           cells_with_number[0] & ~cells_with_other_shapes)
+
+    def _get_adjacent_cells(self, cells_mask: int) -> int:
+        # The cells next to (but not in) the given cells.
+        adjacent_mask = (cells_mask & self._not_last_col_mask) << 1 | (cells_mask & self._not_first_col_mask) >> 1 \
+            | cells_mask << self.num_of_cols | cells_mask >> self.num_of_cols
+        return adjacent_mask & self._all_cells_mask & ~cells_mask
+
+    def _get_component(self, cells_mask: int, allowed_mask: int) -> int:
+        # The cells connected to the given cells through cells in allowed_mask.
+        while True:
+            adjacent_mask = self._get_adjacent_cells(cells_mask) & allowed_mask
+            if adjacent_mask == 0:
+                return cells_mask
+            cells_mask |= adjacent_mask
+
+    def _remove_pairs(self, index: int, pairs_mask: int) -> bool:
+        return self._set_domain(index, self._domains[index] & ~pairs_mask)
+
+    def _keep_pairs(self, index: int, pairs_mask: int) -> bool:
+        return self._set_domain(index, self._domains[index] & pairs_mask)
+
+    def _set_domain(self, index: int, domain: int) -> bool:
+        if domain == self._domains[index]:
+            return False
+        if domain == 0:
+            raise UnsolvableError("There are no legal values left for the cell.")
+        self._trail.record(self, (index, self._domains[index]))
+        self._update_cells_with_pair(index, domain)
+        self._domains[index] = domain
+        self._changed_cells.append(index)
+        return True
+
+    def _update_cells_with_pair(self, index: int, domain: int):
+        # Must be called before the domain of the cell changes to the given one.
+        cell_mask = 1 << index
+        self._shape_cells[:] = (None,) * len(SHAPES)
+        for pair in _DOMAIN_PAIRS[self._domains[index] ^ domain]:
+            self._cells_with_pair[pair] ^= cell_mask
+
+    def _rollback(self, checkpoint: int):
+        self._trail.rollback(checkpoint)
+        self._changed_cells.clear()
+
+    def _get_solution(self) -> PachamamaSolvedPuzzle:
+        cells = [PachamamaFilledCell(_FIXED_NUMBERS[domain], SHAPES[_FIXED_SHAPES[domain]]) for domain in self._domains]
+        return PachamamaSolvedPuzzle(tuple(tuple(cells[row * self.num_of_cols:(row + 1) * self.num_of_cols])
+                                           for row in range(self.num_of_rows)))
+
+    def _get_blocks(self, row: int, col: int) -> List[Tuple[int, int, int, int]]:
+        # Every 2x2 block the cell is in, as its top left, top right, bottom left and bottom right cells.
+        blocks = []
+        for top in (row - 1, row):
+            for left in (col - 1, col):
+                if 0 <= top and top + 1 < self.num_of_rows and 0 <= left and left + 1 < self.num_of_cols:
+                    blocks.append((self._get_index(top, left), self._get_index(top, left + 1),
+                                   self._get_index(top + 1, left), self._get_index(top + 1, left + 1)))
+        return blocks
+
+    def _get_diagonals(self, row: int, col: int) -> List[Tuple[int, int, int, int]]:
+        # Both diagonals of every 2x2 block the cell is in, each with the two other cells of the block.
+        diagonals = []
+        for top_left, top_right, bottom_left, bottom_right in self._get_blocks(row, col):
+            diagonals.append((top_left, bottom_right, top_right, bottom_left))
+            diagonals.append((top_right, bottom_left, top_left, bottom_right))
+        return diagonals
+
+    @staticmethod
+    def _get_initial_domain(cell: PachamamaCell) -> int:
+        domain = _FULL_DOMAIN
+        if cell.number is not None:
+            domain &= _NUMBER_MASKS[cell.number]
+        if cell.shape is not None:
+            domain &= _SHAPE_MASKS[SHAPES.index(cell.shape)]
+        return domain
+
+    def _get_index(self, row: int, col: int) -> int:
+        return row * self.num_of_cols + col
+
+    def _get_cell(self, index: int) -> Tuple[int, int]:
+        return divmod(index, self.num_of_cols)
+
+
+def _get_indices(cells_mask: int) -> List[int]:
+    indices = []
+    while cells_mask:
+        cell_mask = cells_mask & -cells_mask
+        indices.append(cell_mask.bit_length() - 1)
+        cells_mask ^= cell_mask
+    return indices
+
+
+def _count_cells(cells_mask: int) -> int:
+    return bin(cells_mask).count("1")
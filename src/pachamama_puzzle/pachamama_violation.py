@@ -0,0 +1,19 @@
+from enum import Enum
+from typing import NamedTuple
+
+
+class PachamamaRule(Enum):
+    NOT_FILLED = 0
+    NUMBERS_TOUCHING = 1
+    REGIONS_TOUCHING = 2
+    REGION_TOO_LARGE = 3
+    REGION_NUMBERS = 4
+
+
+class PachamamaViolation(NamedTuple):
+    """
+    A rule that a solution breaks, and the cell where the break was found.
+    """
+    rule: PachamamaRule
+    row: int
+    col: int
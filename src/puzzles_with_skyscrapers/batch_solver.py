@@ -0,0 +1,381 @@
+import argparse
+import functools
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Callable, Dict, Final, Iterable, Iterator, List, NamedTuple, Optional, TextIO, Tuple, Union
+
+from src.puzzles_with_skyscrapers.components.abstract_puzzle_with_skyscrapers import DEFAULT_SEARCH_ENGINE, \
+    SEARCH_ENGINES
+from src.puzzles_with_skyscrapers.components.candidate_tensor import NUMPY_AVAILABLE, presolve_puzzles
+from src.puzzles_with_skyscrapers.components.solution_cache import DEFAULT_MAX_ENTRIES, SolutionCache
+from src.puzzles_with_skyscrapers.components.symmetry import CanonicalForm, get_canonical_form, get_inverse, \
+    transform_grid
+from src.puzzles_with_skyscrapers.haido_puzzle import HaidoPuzzle
+from src.puzzles_with_skyscrapers.skyscrapers_extra_building_puzzle import SkyscrapersExtraBuildingPuzzle
+from src.puzzles_with_skyscrapers.skyscrapers_gaps_puzzle import SkyscrapersGapsPuzzle
+from src.puzzles_with_skyscrapers.skyscrapers_puzzle import SkyscrapersPuzzle
+
+PUZZLE_VARIANTS: Final = {
+    "skyscrapers": SkyscrapersPuzzle,
+    "gaps": SkyscrapersGapsPuzzle,
+    "extra_building": SkyscrapersExtraBuildingPuzzle,
+    "haido": HaidoPuzzle,
+}
+
+DEFAULT_CHUNK_SIZE: Final = 16
+
+# The fields that can be written for every puzzle (besides its index), by the name of the option that selects them.
+OUTPUT_FIELDS: Final = {
+    "solution": ("solutions",),
+    "uniqueness": ("status",),
+    "timing": ("seconds",),
+    "stats": ("num_of_guesses",),
+}
+DEFAULT_OUTPUT_FIELDS: Final = ("solution", "uniqueness")
+
+# A batch keeps this many chunks per worker submitted at a time, so the input is read lazily.
+_CHUNKS_IN_FLIGHT_PER_WORKER: Final = 2
+
+
+class PuzzleSpec(NamedTuple):
+    variant: str
+    puzzle: Tuple[Tuple[Optional[int], ...], ...]
+    hints: Tuple[Optional[int], ...]
+
+
+class InvalidPuzzleSpec(NamedTuple):
+    """
+    A record that is not a valid puzzle, with the reason. It takes the place of the spec of the record in a batch, and
+    of its solution in the output of solve_batch, so that one bad record does not stop the batch.
+    """
+    error: str
+
+
+class SolveResult(NamedTuple):
+    index: int
+    # One of "single", "multiple", "none", "timeout" or "error" (for an invalid puzzle, with the reason in error).
+    status: str
+    solutions: List[List[List[Optional[int]]]]
+    seconds: float
+    num_of_guesses: int
+    error: Optional[str] = None
+
+
+def solve_puzzle_spec(spec: PuzzleSpec, solution_cache: Optional[SolutionCache] = None):
+    puzzle = _create_puzzle(spec)
+    puzzle.set_solution_cache(solution_cache)
+    return puzzle.solve()
+
+
+def solve_puzzle_spec_with_result(spec: PuzzleSpec, index: int = 0, timeout: Optional[float] = None,
+                                  search_engine: str = DEFAULT_SEARCH_ENGINE,
+                                  solution_cache: Optional[SolutionCache] = None) -> SolveResult:
+    start = time.perf_counter()
+    puzzle = _try_creating_puzzle(spec)
+    if isinstance(puzzle, InvalidPuzzleSpec):
+        return SolveResult(index, "error", [], time.perf_counter() - start, 0, puzzle.error)
+    return _solve_puzzle_with_result(puzzle, index, timeout, search_engine, solution_cache, start)
+
+
+def solve_chunk_with_results(specs: List[Union[PuzzleSpec, InvalidPuzzleSpec]], timeout: Optional[float] = None,
+                             search_engine: str = DEFAULT_SEARCH_ENGINE, presolve: bool = False,
+                             deduplicate: bool = False,
+                             solution_cache: Optional[SolutionCache] = None) -> List[SolveResult]:
+    """
+    Solve the given puzzles one after the other. With presolve, the rules of the rows and columns are first applied to
+    all the puzzles of every size together on a candidate tensor (which requires numpy), and the time that took is
+    split evenly between them.
+    With deduplicate, puzzles that are rotations or reflections of an earlier puzzle are not solved again: they get
+    the result of the earlier puzzle, with its solutions rotated or reflected back, and the time that took.
+    With a solution cache, puzzles found in it are not solved again, and the others are added to it.
+    Invalid puzzles get results with the status "error".
+    """
+    if not deduplicate:
+        return _solve_distinct_specs(specs, timeout, search_engine, presolve, solution_cache)
+    # An invalid puzzle may not even have a canonical form, so it is kept apart from all the others.
+    canonical_forms = [None if isinstance(_try_creating_puzzle(spec), InvalidPuzzleSpec) else get_canonical_form(*spec)
+                       for spec in specs]
+    first_indices: Dict[tuple, int] = {}
+    for index, canonical_form in enumerate(canonical_forms):
+        first_indices.setdefault(_get_deduplication_key(canonical_form, index), index)
+    distinct_indices = sorted(first_indices.values())
+    distinct_results = dict(zip(distinct_indices, _solve_distinct_specs(
+        [specs[index] for index in distinct_indices], timeout, search_engine, presolve, solution_cache)))
+
+    results = []
+    for index, canonical_form in enumerate(canonical_forms):
+        first_index = first_indices[_get_deduplication_key(canonical_form, index)]
+        if first_index == index:
+            results.append(distinct_results[index]._replace(index=index))
+            continue
+        start = time.perf_counter()
+        # From the solved puzzle to the canonical form, and from there to this puzzle.
+        to_canonical, from_canonical = canonical_forms[first_index].symmetry, get_inverse(canonical_form.symmetry)
+        solutions = [[list(row) for row in transform_grid(transform_grid(solution, to_canonical), from_canonical)]
+                     for solution in distinct_results[first_index].solutions]
+        results.append(distinct_results[first_index]._replace(index=index, solutions=solutions,
+                                                             seconds=time.perf_counter() - start))
+    return results
+
+
+def _get_deduplication_key(canonical_form: Optional[CanonicalForm], index: int) -> tuple:
+    return ("invalid", index) if canonical_form is None else canonical_form.get_key()
+
+
+def _solve_distinct_specs(specs: List[Union[PuzzleSpec, InvalidPuzzleSpec]], timeout: Optional[float],
+                          search_engine: str, presolve: bool,
+                          solution_cache: Optional[SolutionCache]) -> List[SolveResult]:
+    if not presolve:
+        return [solve_puzzle_spec_with_result(spec, index, timeout, search_engine, solution_cache)
+                for index, spec in enumerate(specs)]
+    start = time.perf_counter()
+    puzzles = [_try_creating_puzzle(spec) for spec in specs]
+    may_have_solution = [True] * len(puzzles)
+    indices_by_size: Dict[int, List[int]] = {}
+    for index, puzzle in enumerate(puzzles):
+        if not isinstance(puzzle, InvalidPuzzleSpec):
+            indices_by_size.setdefault(puzzle.num_of_rows, []).append(index)
+    for indices in indices_by_size.values():
+        for index, result in zip(indices, presolve_puzzles([puzzles[index] for index in indices])):
+            may_have_solution[index] = result
+    presolve_seconds = (time.perf_counter() - start) / len(puzzles)
+
+    results = []
+    for index, puzzle in enumerate(puzzles):
+        if isinstance(puzzle, InvalidPuzzleSpec):
+            results.append(SolveResult(index, "error", [], presolve_seconds, 0, puzzle.error))
+        elif may_have_solution[index]:
+            results.append(_solve_puzzle_with_result(puzzle, index, timeout, search_engine, solution_cache,
+                                                     time.perf_counter() - presolve_seconds))
+        else:
+            results.append(SolveResult(index, "none", [], presolve_seconds, 0))
+    return results
+
+
+def _solve_puzzle_with_result(puzzle, index: int, timeout: Optional[float], search_engine: str,
+                              solution_cache: Optional[SolutionCache], start: float) -> SolveResult:
+    puzzle.set_search_engine(search_engine)
+    puzzle.set_solution_cache(solution_cache)
+    try:
+        puzzle.count_solutions(2, timeout)
+    except TimeoutError:
+        return SolveResult(index, "timeout", [], time.perf_counter() - start, puzzle.num_of_guesses)
+    solution = puzzle.solve()
+    seconds = time.perf_counter() - start
+    if solution is None:
+        return SolveResult(index, "none", [], seconds, puzzle.num_of_guesses)
+    if isinstance(solution, tuple):
+        return SolveResult(index, "multiple", list(solution), seconds, puzzle.num_of_guesses)
+    return SolveResult(index, "single", [solution], seconds, puzzle.num_of_guesses)
+
+
+def solve_batch(specs: Iterable[PuzzleSpec], workers: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                ordered: bool = True, solution_cache: Optional[SolutionCache] = None) -> Iterator[Tuple[int, object]]:
+    """
+    Solve the given puzzles over a pool of worker processes, yielding (index in specs, solution) pairs.
+    The pairs are yielded in input order if ordered is True, or as soon as each chunk is solved otherwise.
+    A single worker solves the puzzles in this process. All the workers share the solution cache, if given.
+    An invalid puzzle is paired with an InvalidPuzzleSpec instead of a solution.
+    """
+    solve = functools.partial(_try_solving_puzzle_spec, solution_cache=solution_cache)
+    return _map_in_chunks(functools.partial(_map_chunk, solve), specs, workers, chunk_size, ordered)
+
+
+def solve_batch_with_results(specs: Iterable[PuzzleSpec], workers: Optional[int] = None,
+                             chunk_size: int = DEFAULT_CHUNK_SIZE, ordered: bool = True,
+                             timeout: Optional[float] = None, search_engine: str = DEFAULT_SEARCH_ENGINE,
+                             presolve: bool = False, deduplicate: bool = False,
+                             solution_cache: Optional[SolutionCache] = None) -> Iterator[SolveResult]:
+    """
+    Like solve_batch, but yields a SolveResult for every puzzle, and gives up on puzzles that take over timeout seconds
+    (if given) to solve. With presolve, every chunk is presolved together, and with deduplicate, puzzles are only
+    solved once per chunk up to rotations and reflections (see solve_chunk_with_results).
+    """
+    if presolve and not NUMPY_AVAILABLE:
+        raise ImportError("Presolving requires numpy.")
+    solve = functools.partial(solve_chunk_with_results, timeout=timeout, search_engine=search_engine,
+                              presolve=presolve, deduplicate=deduplicate, solution_cache=solution_cache)
+    for index, result in _map_in_chunks(solve, specs, workers, chunk_size, ordered):
+        yield result._replace(index=index)
+
+
+def spec_from_json(line: str) -> PuzzleSpec:
+    try:
+        spec = json.loads(line)
+        return PuzzleSpec(spec["variant"], tuple(tuple(row) for row in spec["puzzle"]), tuple(spec["hints"]))
+    except (ValueError, KeyError, TypeError) as error:
+        raise ValueError(f"Invalid puzzle record: {error!r}.") from error
+
+
+def result_to_json(result: SolveResult, output_fields: Iterable[str] = DEFAULT_OUTPUT_FIELDS) -> str:
+    """
+    The index of the result and the given fields, as a JSON object. An error is always written, with its status.
+    """
+    record = {"index": result.index}
+    for output_field in output_fields:
+        for field in OUTPUT_FIELDS[output_field]:
+            record[field] = getattr(result, field)
+    if result.error is not None:
+        record["status"] = result.status
+        record["error"] = result.error
+    return json.dumps(record)
+
+
+def main(args: Optional[List[str]] = None, stdin: TextIO = sys.stdin, stdout: TextIO = sys.stdout):
+    parser = argparse.ArgumentParser(
+        description="Solve a batch of skyscraper puzzles given as JSON lines of "
+                    "{\"variant\": ..., \"puzzle\": [[...], ...], \"hints\": [...]}.")
+    parser.add_argument("input", nargs="?", default="-", help="the puzzles file, or - (the default) for stdin")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="number of puzzles sent to a worker at a time")
+    parser.add_argument("--unordered", action="store_true",
+                        help="write every solution as soon as it is found instead of in input order")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="seconds after which to give up on a puzzle (its status is then timeout)")
+    parser.add_argument("--fields", default=",".join(DEFAULT_OUTPUT_FIELDS),
+                        help=f"comma separated fields to write for every puzzle, out of: {', '.join(OUTPUT_FIELDS)}")
+    parser.add_argument("--engine", choices=SEARCH_ENGINES, default=DEFAULT_SEARCH_ENGINE,
+                        help="how to search once the rules are stuck")
+    parser.add_argument("--presolve", action="store_true",
+                        help="apply the rules to every chunk of puzzles together before solving (requires numpy)")
+    parser.add_argument("--deduplicate", action="store_true",
+                        help="solve rotations and reflections of the same puzzle only once per chunk")
+    parser.add_argument("--cache", default=None,
+                        help="an SQLite file of solutions to reuse between runs (created if missing)")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_ENTRIES,
+                        help="the number of puzzles the cache keeps, dropping the least recently used ones")
+    parsed = parser.parse_args(args)
+    output_fields = [output_field for output_field in parsed.fields.split(",") if output_field]
+    for output_field in output_fields:
+        if output_field not in OUTPUT_FIELDS:
+            parser.error(f"Unknown field {output_field}. Known fields: {', '.join(OUTPUT_FIELDS)}.")
+    if parsed.presolve and not NUMPY_AVAILABLE:
+        parser.error("--presolve requires numpy.")
+
+    solution_cache = SolutionCache(parsed.cache, parsed.cache_size) if parsed.cache is not None else None
+    input_file = stdin if parsed.input == "-" else open(parsed.input)
+    try:
+        specs = (_try_reading_spec(line) for line in input_file if line.strip())
+        for result in solve_batch_with_results(specs, parsed.workers, parsed.chunk_size, not parsed.unordered,
+                                               parsed.timeout, parsed.engine, parsed.presolve,
+                                               parsed.deduplicate, solution_cache):
+            stdout.write(result_to_json(result, output_fields) + "\n")
+            stdout.flush()
+    finally:
+        if input_file is not stdin:
+            input_file.close()
+        if solution_cache is not None:
+            solution_cache.close()
+
+
+def _try_reading_spec(line: str) -> Union[PuzzleSpec, InvalidPuzzleSpec]:
+    try:
+        return spec_from_json(line)
+    except ValueError as error:
+        return InvalidPuzzleSpec(str(error))
+
+
+def _create_puzzle(spec: Union[PuzzleSpec, InvalidPuzzleSpec]):
+    if isinstance(spec, InvalidPuzzleSpec):
+        raise ValueError(spec.error)
+    if spec.variant not in PUZZLE_VARIANTS:
+        raise ValueError(f"Unknown puzzle variant {spec.variant}. Known variants: {', '.join(PUZZLE_VARIANTS)}.")
+    try:
+        return PUZZLE_VARIANTS[spec.variant](tuple(tuple(row) for row in spec.puzzle), tuple(spec.hints))
+    except TypeError as error:
+        raise ValueError(f"Invalid puzzle: {error}.") from error
+
+
+def _try_creating_puzzle(spec: Union[PuzzleSpec, InvalidPuzzleSpec]):
+    """
+    The puzzle of the spec, or an InvalidPuzzleSpec with the reason it cannot be created.
+    """
+    try:
+        return _create_puzzle(spec)
+    except ValueError as error:
+        return InvalidPuzzleSpec(str(error))
+
+
+def _try_solving_puzzle_spec(spec: Union[PuzzleSpec, InvalidPuzzleSpec], solution_cache: Optional[SolutionCache]):
+    puzzle = _try_creating_puzzle(spec)
+    if isinstance(puzzle, InvalidPuzzleSpec):
+        return puzzle
+    puzzle.set_solution_cache(solution_cache)
+    return puzzle.solve()
+
+
+def _map_in_chunks(map_chunk: Callable[[List[PuzzleSpec]], List[object]], specs: Iterable[PuzzleSpec],
+                   workers: Optional[int], chunk_size: int, ordered: bool) -> Iterator[Tuple[int, object]]:
+    if chunk_size < 1:
+        raise ValueError("The chunk size must be at least 1.")
+    if workers is not None and workers < 1:
+        raise ValueError("There must be at least 1 worker.")
+
+    if workers == 1:
+        for first_index, chunk_specs in _get_chunks(specs, chunk_size):
+            for offset, result in enumerate(map_chunk(chunk_specs)):
+                yield first_index + offset, result
+        return
+
+    workers = workers if workers is not None else os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Chunks solved out of order wait for the ones before them, so they count as in flight too.
+        max_chunks_in_flight = workers * _CHUNKS_IN_FLIGHT_PER_WORKER
+        chunks = _get_chunks(specs, chunk_size)
+        in_flight: Dict[Future, int] = {}
+        solved_chunks: Dict[int, List[object]] = {}
+        next_chunk_to_yield = 0
+        is_input_exhausted = False
+
+        while True:
+            while not is_input_exhausted and len(in_flight) + len(solved_chunks) < max_chunks_in_flight:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    is_input_exhausted = True
+                else:
+                    first_index, chunk_specs = chunk
+                    in_flight[executor.submit(map_chunk, chunk_specs)] = first_index
+            if len(in_flight) == 0:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                solved_chunks[in_flight.pop(future)] = future.result()
+
+            if ordered:
+                while next_chunk_to_yield in solved_chunks:
+                    results = solved_chunks.pop(next_chunk_to_yield)
+                    for offset, result in enumerate(results):
+                        yield next_chunk_to_yield + offset, result
+                    next_chunk_to_yield += len(results)
+            else:
+                for first_index in sorted(solved_chunks):
+                    for offset, result in enumerate(solved_chunks[first_index]):
+                        yield first_index + offset, result
+                solved_chunks.clear()
+
+
+def _map_chunk(func: Callable, specs: List[PuzzleSpec]) -> List[object]:
+    return [func(spec) for spec in specs]
+
+
+def _get_chunks(specs: Iterable[PuzzleSpec], chunk_size: int) -> Iterator[Tuple[int, List[PuzzleSpec]]]:
+    chunk = []
+    first_index = 0
+    for index, spec in enumerate(specs):
+        if len(chunk) == 0:
+            first_index = index
+        chunk.append(spec)
+        if len(chunk) == chunk_size:
+            yield first_index, chunk
+            chunk = []
+    if len(chunk) > 0:
+        yield first_index, chunk
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,29 @@
-import copy
 import os
+import random
+import time
 from abc import abstractmethod, ABC
-from typing import List, Optional, Tuple, Final
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import List, Optional, Set, Tuple, Final
 
 from src.components.abstract_grid_puzzle import NUMBER_OF_GRID_SIDES
 from src.components.abstract_square_grid_puzzle import AbstractSquareGridPuzzle
 import src.components.utils as utils
+from src.components.trail import Trail
 from src.puzzles_with_skyscrapers.components.cell_with_skyscraper import CellWithSkyscraper
+from src.puzzles_with_skyscrapers.components.filled_cells_counter import FilledCellsCounter
+from src.puzzles_with_skyscrapers.components.solution_cache import CachedSolution, SolutionCache, \
+    SOLUTIONS_PER_ENTRY
+from src.puzzles_with_skyscrapers.components.solve_memo import MemoizedSolutions, get_solve_memo
+from src.puzzles_with_skyscrapers.components.solver_stats import SolverStats
+from src.puzzles_with_skyscrapers.components.symmetry import CanonicalForm, get_canonical_form, get_inverse, \
+    transform_grid
+from src.components.exact_cover import ExactCover
+from src.puzzles_with_skyscrapers.components.uniqueness_oracle import get_uniqueness_oracle
 from src.components.unsolvable_error import UnsolvableError
 
+SEARCH_ENGINES: Final = ("cells", "exact_cover")
+DEFAULT_SEARCH_ENGINE: Final = "cells"
+
 
 class AbstractPuzzleWithSkyscrapers(AbstractSquareGridPuzzle, ABC):
     SPACES_BETWEEN_HINT_AND_GRID: Final = "   "
@@ -24,6 +39,16 @@ class AbstractPuzzleWithSkyscrapers(AbstractSquareGridPuzzle, ABC):
         """
         self.is_solved = False
         self.solution = None
+        self._solutions = None
+        self._solutions_limit = 0
+        self._search_start_checkpoint = None
+        # The number of cells the last search branched on, as a measure of how hard the puzzle is.
+        self.num_of_guesses = 0
+        self._deadline: Optional[float] = None
+        self.stats: Optional[SolverStats] = None
+        self._search_engine = DEFAULT_SEARCH_ENGINE
+        self._solution_cache: Optional[SolutionCache] = None
+        self._canonical_form: Optional[CanonicalForm] = None
         self.hints: Final = hints
         if len(self.hints) != self.num_of_rows * NUMBER_OF_GRID_SIDES:
             raise ValueError("A wrong number of hints was given")
@@ -45,6 +70,19 @@ class AbstractPuzzleWithSkyscrapers(AbstractSquareGridPuzzle, ABC):
                                     (None, None, None, None), can_be_empty=True)
                  for j in range(self.num_of_rows)]
                 for i in range(self.num_of_rows)]
+        self._rows: Final = tuple(tuple(row) for row in self.puzzle_to_draw_on)
+        self._cols: Final = tuple(tuple(row[j] for row in self.puzzle_to_draw_on) for j in range(self.num_of_rows))
+        # The cells of every hint's row or column, in the order they are seen from the hint.
+        self._hint_lines: Final = tuple(self._build_hint_line(i)
+                                        for i in range(NUMBER_OF_GRID_SIDES * self.num_of_rows))
+        # Every change to a cell is recorded on the trail, so the search can undo a failed guess by rolling back,
+        # and the propagation can find the rows, columns and hints that changed since it last reached a fixpoint.
+        self._trail: Final = Trail()
+        self._fixpoint_checkpoints = []
+        self._filled_cells: Final = FilledCellsCounter(self.num_of_rows)
+        for i in range(self.num_of_rows):
+            for j in range(self.num_of_rows):
+                self.puzzle_to_draw_on[i][j].attach_to_grid(self._trail, i, j, self._filled_cells)
 
     def solve(self) -> Optional[List[List[int]] or Tuple[List[List[Optional[int]]], List[List[Optional[int]]]]]:
         if self.is_solved:
@@ -53,6 +91,57 @@ class AbstractPuzzleWithSkyscrapers(AbstractSquareGridPuzzle, ABC):
         self.is_solved = True
         return self.solution
 
+    def set_search_engine(self, search_engine: str):
+        """
+        Choose how the search guesses once the rules are stuck:
+        - cells: branch on the cell with the fewest possible values.
+        - exact_cover: branch on the cell, or the value that must appear in a row or column, with the fewest options.
+        The engines take about as long on the puzzles the line permutation tables cover, and on easy larger ones.
+        On hard puzzles beyond the tables exact cover can be much faster: the cells engine probes every value of every
+        cell before it searches, and still guesses more.
+        """
+        if search_engine not in SEARCH_ENGINES:
+            raise ValueError(f"Unknown search engine {search_engine}. Known engines: {', '.join(SEARCH_ENGINES)}.")
+        self._search_engine = search_engine
+
+    def set_solution_cache(self, solution_cache: Optional[SolutionCache]):
+        """
+        Look the solutions up in the given cache before searching for them (after the memo of this process, see
+        solve_memo), and add them to it after searching.
+        """
+        self._solution_cache = solution_cache
+
+    def enable_stats(self) -> SolverStats:
+        """
+        Start collecting statistics on the rules and the search, available in self.stats after solving.
+        Without calling this, no statistics are collected, and solving pays nothing for them.
+        Puzzles that collect statistics always search, instead of looking their solutions up in the memo or cache.
+        """
+        if self.stats is None:
+            self.stats = SolverStats()
+            self.stats.instrument(self)
+        return self.stats
+
+    def count_solutions(self, limit: int = 2, timeout: Optional[float] = None) -> int:
+        """
+        Returns the number of solutions of the puzzle, or the given limit if there are at least that many.
+        The search stops as soon as limit solutions are found, or raises TimeoutError once it has taken over timeout
+        seconds (if given).
+        """
+        if limit < 1:
+            raise ValueError("The limit of solutions to count must be at least 1.")
+        if self._solutions is None and self.stats is None:
+            self._load_cached_solutions()
+        if self._solutions is None or (len(self._solutions) == self._solutions_limit and limit > self._solutions_limit):
+            self._deadline = time.monotonic() + timeout if timeout is not None else None
+            try:
+                self._solutions = self._find_solutions(limit)
+            finally:
+                self._deadline = None
+            self._solutions_limit = limit
+            self._store_cached_solutions()
+        return min(len(self._solutions), limit)
+
     def solve_and_print(self):
         sol = self.solve()
         if sol is None:
@@ -81,15 +170,24 @@ class AbstractPuzzleWithSkyscrapers(AbstractSquareGridPuzzle, ABC):
         return puzzle_state_drawing
 
     def is_single_solution(self):
-        sol = self.solve()
-        return sol is not None and isinstance(sol, list)
+        return self.count_solutions(2) == 1
 
-    def get_minimal_hints_puzzle(self):
+    def get_minimal_hints_puzzle(self, workers: int = 1):
+        """
+        With more than 1 worker, all the hints that could be removed next are checked at once over worker processes,
+        and the first of them (by hint index) that leaves a single solution is removed, just like with 1 worker.
+        """
         # TODO add more tests? (with some cells filled, other types of puzzles besides regular skyscrapers)
-        if not self.is_single_solution():
+        if workers < 1:
+            raise ValueError("There must be at least 1 worker.")
+        if self.count_solutions(2) != 1:
             print("Puzzle is not solvable.")
             return None
-        minimal = self._get_minimal_hints_puzzle(self.hints)
+        if workers == 1:
+            minimal = self._get_minimal_hints_puzzle(self.hints)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                minimal = self._get_minimal_hints_puzzle(self.hints, executor)
         if minimal.hints == self.hints:
             print("The puzzle is already minimal!")
         else:
@@ -98,36 +196,140 @@ class AbstractPuzzleWithSkyscrapers(AbstractSquareGridPuzzle, ABC):
         return minimal
 
     def _solve(self):
+        num_of_solutions = self.count_solutions(2)
+        if num_of_solutions == 0:
+            return None
+        if num_of_solutions > 1:
+            return self._solutions[0], self._solutions[1]
+        return self._solutions[0]
+
+    def _get_canonical_form(self) -> CanonicalForm:
+        if self._canonical_form is None:
+            self._canonical_form = get_canonical_form(self.__class__.__name__, self.puzzle, self.hints)
+        return self._canonical_form
+
+    def _get_memo_key(self) -> tuple:
+        return self.__class__, tuple(tuple(row) for row in self.puzzle), tuple(self.hints)
+
+    def _load_cached_solutions(self):
+        memo = get_solve_memo()
+        memoized = memo.get(self._get_memo_key()) if memo.capacity > 0 else None
+        if memoized is None and self._solution_cache is not None:
+            canonical_form = self._get_canonical_form()
+            cached_solution = self._solution_cache.get(canonical_form.get_key())
+            if cached_solution is not None:
+                inverse = get_inverse(canonical_form.symmetry)
+                memoized = MemoizedSolutions(tuple(transform_grid(solution, inverse)
+                                                   for solution in cached_solution.solutions),
+                                             cached_solution.num_of_guesses)
+                memo.put(self._get_memo_key(), memoized)
+        if memoized is None:
+            return
+        # Every puzzle gets its own copy of the solutions, so the memoized ones never change.
+        self._solutions = [[list(row) for row in solution] for solution in memoized.solutions]
+        self._solutions_limit = SOLUTIONS_PER_ENTRY
+        self.num_of_guesses = memoized.num_of_guesses
+        if len(self._solutions) == 1:
+            self._restore_solution(self._solutions[0])
+
+    def _store_cached_solutions(self):
+        # A search that stopped at its first solution does not tell whether it is the only one.
+        if self._solutions_limit < SOLUTIONS_PER_ENTRY and len(self._solutions) > 0:
+            return
+        solutions = self._solutions[:SOLUTIONS_PER_ENTRY]
+        get_solve_memo().put(self._get_memo_key(), MemoizedSolutions(
+            tuple(tuple(tuple(row) for row in solution) for solution in solutions), self.num_of_guesses))
+        if self._solution_cache is None:
+            return
+        canonical_form = self._get_canonical_form()
+        status = ("none", "single", "multiple")[len(solutions)]
+        self._solution_cache.put(canonical_form.get_key(), CachedSolution(
+            status, [[list(row) for row in transform_grid(solution, canonical_form.symmetry)] for solution in solutions],
+            self.num_of_guesses, self.stats.to_dict() if self.stats is not None else None))
+
+    def _find_solutions(self, limit: int) -> List[List[List[Optional[int]]]]:
+        # A repeated search starts over from the state the first search started from.
+        if self._search_start_checkpoint is None:
+            self._search_start_checkpoint = self._trail.get_checkpoint()
+        else:
+            self._rollback(self._search_start_checkpoint)
+        solutions = []
+        self.num_of_guesses = 0
         try:
             self._validate()
             self._try_solving_basic()
-            if self._is_complete():
-                return self._get_puzzle_with_filled_values()
-            copy_with_necessary_values = copy.deepcopy(self)
-            solved_first = self._guess_values(True)
-        except UnsolvableError as e:
-            print(e)
-            return None
-        second_copy = copy.deepcopy(copy_with_necessary_values)
-        solved_second = second_copy._guess_values(False)  # should not throw exception at this point
-        if ((not solved_first) and solved_second) or (solved_first and (not solved_second)):
-            raise Exception("This is not supposed to happen.")
-        if not solved_first:
-            return self._return_multiple_solutions(second_copy)
-        if self.puzzle_to_draw_on != second_copy.puzzle_to_draw_on:
-            return self._return_multiple_solutions(second_copy)
-        another_solution = self._try_finding_another_solution(copy_with_necessary_values)
-        if another_solution is not None:
-            return self._return_multiple_solutions(another_solution)
-        return self._get_puzzle_with_filled_values()
-
-    def _get_minimal_hints_puzzle(self, original_hints):
-        for i in range(len(self.hints)):
-            if self.hints[i] is not None:
-                less_hints = tuple(self.hints[j] if j != i else None for j in range(len(self.hints)))
-                smaller_puzzle = self.__class__(self.puzzle, less_hints)
-                if smaller_puzzle.is_single_solution():
-                    return smaller_puzzle._get_minimal_hints_puzzle(original_hints)
+            if self._search_engine == "exact_cover":
+                self._search_with_exact_cover(self._build_exact_cover(), solutions, limit)
+            else:
+                # Branching on cells alone gets lost in large puzzles without the values that fail right away.
+                if not self._are_hinted_lines_covered_by_tables():
+                    self._mark_failing_values_illegal()
+                self._search(solutions, limit)
+        except UnsolvableError:
+            pass
+        finally:
+            self._rollback(self._search_start_checkpoint)
+        if len(solutions) == 1:
+            self._restore_solution(solutions[0])
+        return solutions
+
+    def get_random_solution(self, rng: random.Random) -> Optional[List[List[Optional[int]]]]:
+        """
+        Get one of the solutions of the puzzle, picked using the given random number generator (but not uniformly).
+        Returns None if the puzzle has no solution.
+        """
+        checkpoint = self._trail.get_checkpoint()
+        solutions = []
+        try:
+            self._validate()
+            self._try_solving_basic()
+            self._search_randomly(solutions, rng)
+        except UnsolvableError:
+            pass
+        self._rollback(checkpoint)
+        return solutions[0] if len(solutions) > 0 else None
+
+    def get_hints_of_solution(self, rng: Optional[random.Random] = None) -> Tuple[Optional[int], ...]:
+        """
+        Get all the hints of a puzzle whose grid is already filled.
+        Variants with more than one possible hint for a row or column use the given random number generator to pick one.
+        """
+        if not self._is_complete():
+            raise ValueError("Only the hints of a filled grid can be found.")
+        rng = rng if rng is not None else random.Random()
+        return tuple(self._get_hint_of_line([cell.get_value() for cell in line], rng) for line in self._hint_lines)
+
+    def get_all_minimal_hints_puzzles(self) -> List["AbstractPuzzleWithSkyscrapers"]:
+        """
+        Get a puzzle for every subset of the hints that leaves a single solution, but not after removing any more hints.
+        """
+        oracle = get_uniqueness_oracle(self.__class__, self.puzzle, self.hints)
+        return [self.__class__(self.puzzle, oracle.get_hints(mask)) for mask in oracle.get_all_minimal_masks()]
+
+    def _get_minimal_hints_puzzle(self, original_hints, executor: Optional[Executor] = None):
+        # Hints that cannot be removed at one level cannot be removed at the levels after it either, and the oracle
+        # answers for them without solving again.
+        oracle = get_uniqueness_oracle(self.__class__, self.puzzle, original_hints)
+        all_less_hints = [tuple(self.hints[j] if j != i else None for j in range(len(self.hints)))
+                          for i in range(len(self.hints)) if self.hints[i] is not None]
+        if executor is None:
+            for less_hints in all_less_hints:
+                if oracle.is_single_solution(less_hints):
+                    return self.__class__(self.puzzle, less_hints)._get_minimal_hints_puzzle(original_hints)
+            return self
+
+        masks = [oracle.get_mask(less_hints) for less_hints in all_less_hints]
+        futures = [executor.submit(_has_single_solution, self.__class__, self.puzzle, less_hints)
+                   if oracle.get_known_answer_for_mask(mask) is None else None
+                   for less_hints, mask in zip(all_less_hints, masks)]
+        for less_hints, mask, future in zip(all_less_hints, masks, futures):
+            if future is not None:
+                oracle.add_answer_for_mask(mask, future.result())
+            if oracle.get_known_answer_for_mask(mask):
+                for other_future in futures:
+                    if other_future is not None:
+                        other_future.cancel()
+                return self.__class__(self.puzzle, less_hints)._get_minimal_hints_puzzle(original_hints, executor)
         return self
 
     def _get_hints_row_drawing(self, hints_row_index: int) -> str:
@@ -139,92 +341,238 @@ class AbstractPuzzleWithSkyscrapers(AbstractSquareGridPuzzle, ABC):
         if (not self._are_values_unique()) or (not self._are_puzzle_specifics_valid()):
             raise UnsolvableError("Puzzle is not solvable.")
 
-    def _try_finding_another_solution(self, copy_with_necessary_values: "AbstractPuzzleWithSkyscrapers") \
-            -> Optional["AbstractPuzzleWithSkyscrapers"]:
-        if type(copy_with_necessary_values) is not type(self):
-            raise ValueError(f"Trying to create a puzzle of type {type(self)} from a puzzle of type "
-                             f"{type(copy_with_necessary_values)}.")
+    def _search(self, solutions: List[List[List[Optional[int]]]], limit: int):
+        # Branches on the most constrained cell: first with its lowest possible value set, then with that value
+        # marked as illegal. Must be called on a propagated grid; callers should roll back afterwards.
+        if self._is_complete():
+            solutions.append(self._get_puzzle_with_filled_values())
+            return
+        if self._deadline is not None and time.monotonic() > self._deadline:
+            raise TimeoutError("The search for solutions took too long.")
+        cell = self._get_most_constrained_cell()
+        value_to_try = cell.get_min_possible_value()
+        self.num_of_guesses += 1
+        checkpoint = self._trail.get_checkpoint()
+        try:
+            cell.set_value(value_to_try)
+            self._try_solving_basic()
+            self._search(solutions, limit)
+        except UnsolvableError:
+            pass
+        self._rollback(checkpoint)
+        if len(solutions) >= limit:
+            return
+        try:
+            cell.add_illegal_value(value_to_try)
+            self._try_solving_basic()
+            self._search(solutions, limit)
+        except UnsolvableError:
+            pass
+        self._rollback(checkpoint)
+
+    def _search_with_exact_cover(self, exact_cover: ExactCover, solutions: List[List[List[Optional[int]]]],
+                                 limit: int):
+        # Like _search, but branches on the item of the exact cover with the fewest options. Options that the rules
+        # ruled out stay in the exact cover and are skipped, so only the chosen options have to be undone.
+        if self._is_complete():
+            solutions.append(self._get_puzzle_with_filled_values())
+            return
+        if self._deadline is not None and time.monotonic() > self._deadline:
+            raise TimeoutError("The search for solutions took too long.")
+        options = self._get_options_of_most_constrained_item(exact_cover)
+        if len(options) > 1:
+            self.num_of_guesses += 1
+        checkpoint = self._trail.get_checkpoint()
+        for option in options:
+            row, col, value = option
+            removed = exact_cover.choose(option)
+            try:
+                self.puzzle_to_draw_on[row][col].set_value(value)
+                self._try_solving_basic()
+                self._search_with_exact_cover(exact_cover, solutions, limit)
+            except UnsolvableError:
+                pass
+            exact_cover.unchoose(option, removed)
+            self._rollback(checkpoint)
+            if len(solutions) >= limit:
+                return
+
+    def _build_exact_cover(self) -> ExactCover:
+        # Every option is a value in a cell, covering the cell and the value in the cell's row and column.
+        # When not all the values must appear in every line, the values only have to be covered at most once.
+        # When several cells in every line are empty, the empty value is not covered at all.
+        options = {}
+        value_items = set()
         for i in range(self.num_of_rows):
             for j in range(self.num_of_rows):
-                another_copy = copy.deepcopy(copy_with_necessary_values)
-                if another_copy.puzzle_to_draw_on[i][j].get_value() is None:
-                    another_copy.puzzle_to_draw_on[i][j].add_illegal_value(self.puzzle_to_draw_on[i][j].get_value())
-                    try:
-                        was_single_solution_found = another_copy._guess_values()
-                    except UnsolvableError:
-                        continue
-                    if not was_single_solution_found:
-                        print("Did not find a complete second solution.")
-                    return another_copy
-
-    def _guess_values(self, from_low: bool = True) -> bool:
-        prev_grid = None
-        while prev_grid != self.puzzle_to_draw_on and not self._is_complete():
-            prev_grid = copy.deepcopy(self.puzzle_to_draw_on)
-            for i in range(self.num_of_rows):
-                for j in range(self.num_of_rows):
-                    if self.puzzle_to_draw_on[i][j].get_value() is None:
-                        self._guess_cell_value(i, j, from_low)
-        return self._is_complete()
-
-    def _guess_cell_value(self, row: int, col: int, from_low: bool):
-        values_to_try = self.puzzle_to_draw_on[row][col].get_possible_values()
-        while len(values_to_try) > 0:
-            curr_val_to_try = min(values_to_try) if from_low else max(values_to_try)
-            values_to_try.discard(curr_val_to_try)
-            copy_puzzle_to_draw_on = copy.deepcopy(self)
-            copy_puzzle_to_draw_on.puzzle_to_draw_on[row][col].set_value(curr_val_to_try)
+                for value in range(self._get_lowest_possible_value(), self._get_highest_possible_value() + 1):
+                    items = [("cell", i, j)]
+                    if value != 0 or self._get_num_of_empty_cells() == 1:
+                        items += [("row", i, value), ("col", j, value)]
+                        value_items.update(items[1:])
+                    options[(i, j, value)] = items
+        return ExactCover(options, () if self._must_all_values_appear() else value_items)
+
+    def _get_options_of_most_constrained_item(self, exact_cover: ExactCover) -> List[Tuple[int, int, int]]:
+        fewest_options = None
+        for item in exact_cover.get_uncovered_primary_items():
+            options = [option for option in exact_cover.get_options_of_item(item)
+                       if self.puzzle_to_draw_on[option[0]][option[1]].is_value_possible(option[2])]
+            if fewest_options is None or len(options) < len(fewest_options):
+                fewest_options = options
+                if len(fewest_options) <= 1:
+                    break
+        return sorted(fewest_options) if fewest_options is not None else []
+
+    def _mark_failing_values_illegal(self):
+        # Tries every possible value of every empty cell, and marks the values that lead to a contradiction right away
+        # as illegal, until there are no more such values.
+        prev_checkpoint = None
+        while prev_checkpoint != self._trail.get_checkpoint() and not self._is_complete():
+            prev_checkpoint = self._trail.get_checkpoint()
+            for row in self.puzzle_to_draw_on:
+                for cell in row:
+                    values_to_try = cell.get_possible_values_mask() if cell.get_value() is None else 0
+                    while values_to_try:
+                        value_to_try = (values_to_try & -values_to_try).bit_length() - 1
+                        values_to_try &= values_to_try - 1
+                        checkpoint = self._trail.get_checkpoint()
+                        try:
+                            cell.set_value(value_to_try)
+                            self._try_solving_basic()
+                            self._rollback(checkpoint)
+                        except UnsolvableError:
+                            self._rollback(checkpoint)
+                            cell.add_illegal_value(value_to_try)
+                            self._try_solving_basic()
+
+    def _are_hinted_lines_covered_by_tables(self) -> bool:
+        """
+        Whether the line permutation tables remove every value that the hints of its line rule out, in which case
+        probing every value before the search finds little more and is skipped.
+        """
+        return False
+
+    def _search_randomly(self, solutions: List[List[List[Optional[int]]]], rng: random.Random):
+        if self._is_complete():
+            solutions.append(self._get_puzzle_with_filled_values())
+            return
+        cell = self._get_most_constrained_cell()
+        values_to_try = sorted(cell.get_possible_values())
+        rng.shuffle(values_to_try)
+        checkpoint = self._trail.get_checkpoint()
+        for value_to_try in values_to_try:
             try:
-                copy_puzzle_to_draw_on._try_solving_basic()
-                if copy_puzzle_to_draw_on._is_complete():
-                    self.puzzle_to_draw_on = copy_puzzle_to_draw_on.puzzle_to_draw_on
-                    return
+                cell.set_value(value_to_try)
+                self._try_solving_basic()
+                self._search_randomly(solutions, rng)
             except UnsolvableError:
-                self.puzzle_to_draw_on[row][col].add_illegal_value(curr_val_to_try)
+                pass
+            self._rollback(checkpoint)
+            if len(solutions) > 0:
+                return
+
+    def _get_most_constrained_cell(self) -> CellWithSkyscraper:
+        most_constrained_cell = None
+        fewest_possible_values = None
+        for i, row in enumerate(self._rows):
+            if self._filled_cells.in_rows[i] == self.num_of_rows:
+                continue
+            for cell in row:
+                if cell.get_value() is None:
+                    num_of_possible_values = cell.count_possible_values()
+                    if fewest_possible_values is None or num_of_possible_values < fewest_possible_values:
+                        most_constrained_cell = cell
+                        fewest_possible_values = num_of_possible_values
+                        if fewest_possible_values == 2:
+                            return most_constrained_cell
+        return most_constrained_cell
+
+    def _restore_solution(self, solution: List[List[Optional[int]]]):
+        for i in range(self.num_of_rows):
+            for j in range(self.num_of_rows):
+                self.puzzle_to_draw_on[i][j].set_value(solution[i][j])
 
     def _try_solving_basic(self):
-        prev_num_of_cells_with_values = -1
-        while self._count_filled_cells() > prev_num_of_cells_with_values:
-            prev_num_of_cells_with_values = self._count_filled_cells()
-            self._mark_basic_conclusions()
-            for i in range(self.num_of_rows):
-                for j in range(self.num_of_rows):
-                    self._mark_illegal_clashing_values(i, j)
+        # Every rule runs only on the rows, columns and hints whose cells changed since the rules last ran on them,
+        # until no cell changes anymore (this includes candidates being removed without the cell being filled).
+        dirty_rows, dirty_cols, dirty_hints = self._get_lines_changed_since_fixpoint()
+        while len(dirty_rows) > 0 or len(dirty_cols) > 0 or len(dirty_hints) > 0:
+            checkpoint = self._trail.get_checkpoint()
+            dirty_lines = [self._rows[i] for i in sorted(dirty_rows)] + [self._cols[j] for j in sorted(dirty_cols)]
+            dirty_hints = sorted(dirty_hints)
+            for hint_index in dirty_hints:
+                self._mark_hint_basic_conclusions(hint_index)
+            for line in dirty_lines:
+                self._mark_line_clashing_values(line)
             if self._must_all_values_appear():
-                self._fill_only_possible_locations()
-            self._mark_nontrivial_seen_and_unseen()
-            self._mark_illegals_for_seen_status()
-            self._mark_puzzle_specific_rules()
-            if not self._can_cells_be_filled():
-                raise UnsolvableError("There aren't enough values to fill the grid.")
-            if not self._are_values_unique():
-                raise UnsolvableError("There is a value repeated in a row or column.")
+                for line in dirty_lines:
+                    self._fill_only_possible_locations_in_line(line)
+            for hint_index in dirty_hints:
+                self._mark_general_seen_and_unseen(hint_index)
+                self._mark_puzzle_specific_seen_and_unseen(hint_index)
+            for hint_index in dirty_hints:
+                self._mark_hint_illegals_for_seen_status(hint_index)
+            for hint_index in dirty_hints:
+                self._mark_hint_specific_rules(hint_index)
+            for line in dirty_lines:
+                if not self._can_line_be_filled(line):
+                    raise UnsolvableError("There aren't enough values to fill the grid.")
+                if not self._are_single_row_or_column_values_unique([cell.get_value() for cell in line]):
+                    raise UnsolvableError("There is a value repeated in a row or column.")
+            dirty_rows, dirty_cols, dirty_hints = self._get_lines_changed_since(checkpoint)
+        if len(self._fixpoint_checkpoints) == 0 or self._fixpoint_checkpoints[-1] != self._trail.get_checkpoint():
+            self._fixpoint_checkpoints.append(self._trail.get_checkpoint())
+
+    def _get_lines_changed_since_fixpoint(self) -> Tuple[Set[int], Set[int], Set[int]]:
+        if len(self._fixpoint_checkpoints) == 0:
+            return set(range(self.num_of_rows)), set(range(self.num_of_rows)), set(range(len(self.hints)))
+        return self._get_lines_changed_since(self._fixpoint_checkpoints[-1])
+
+    def _get_lines_changed_since(self, checkpoint: int) -> Tuple[Set[int], Set[int], Set[int]]:
+        changed_rows = set()
+        changed_cols = set()
+        for cell in self._trail.get_recorded_since(checkpoint):
+            row, col = cell.position
+            changed_rows.add(row)
+            changed_cols.add(col)
+        changed_hints = set()
+        for row in changed_rows:
+            changed_hints.add(self.num_of_rows + row)
+            changed_hints.add(self.num_of_rows * 3 + row)
+        for col in changed_cols:
+            changed_hints.add(col)
+            changed_hints.add(self.num_of_rows * 2 + col)
+        return changed_rows, changed_cols, changed_hints
+
+    def _rollback(self, checkpoint: int):
+        self._trail.rollback(checkpoint)
+        while len(self._fixpoint_checkpoints) > 0 and self._fixpoint_checkpoints[-1] > checkpoint:
+            self._fixpoint_checkpoints.pop()
+
+    def _mark_basic_conclusions(self):
+        for hint_index in range(len(self.hints)):
+            self._mark_hint_basic_conclusions(hint_index)
 
     def _mark_illegal_clashing_values(self, row: int, col: int):
-        cell_value = self.puzzle_to_draw_on[row][col].get_value()
+        cell = self.puzzle_to_draw_on[row][col]
+        self._mark_illegal_clashing_values_in_line(self._rows[row], cell)
+        self._mark_illegal_clashing_values_in_line(self._cols[col], cell)
 
-        if cell_value is None:
-            return
-        if cell_value > 0:
-            self._mark_illegal_clashing_values_for_cell_with_value(col, row, cell_value)
-        elif cell_value == 0:
-            self._mark_illegal_clashing_values_for_empty_cell(col, row, cell_value)
-        else:
-            raise ValueError("A cell cannot have a negative value.")
+    def _mark_line_clashing_values(self, line: Tuple[CellWithSkyscraper, ...]):
+        for cell in line:
+            self._mark_illegal_clashing_values_in_line(line, cell)
 
     def _fill_only_possible_locations(self):
-        prev_num_of_filled_cells = -1
-        while self._count_filled_cells() > prev_num_of_filled_cells:
-            prev_num_of_filled_cells = self._count_filled_cells()
-            for i in range(self._get_lowest_possible_value(), self._get_highest_possible_value() + 1):
-                for row in self.puzzle_to_draw_on:
-                    possible_in_row = [cell for cell in row if i in cell.get_possible_values()]
-                    self._mark_according_to_possible_locations(i, possible_in_row)
-                for col_index in range(self.num_of_rows):
-                    possible_in_col = [self.puzzle_to_draw_on[row_index][col_index]
-                                       for row_index in range(self.num_of_rows)
-                                       if i in self.puzzle_to_draw_on[row_index][col_index].get_possible_values()]
-                    self._mark_according_to_possible_locations(i, possible_in_col)
+        prev_checkpoint = None
+        while prev_checkpoint != self._trail.get_checkpoint():
+            prev_checkpoint = self._trail.get_checkpoint()
+            for line in self._rows + self._cols:
+                self._fill_only_possible_locations_in_line(line)
+
+    def _fill_only_possible_locations_in_line(self, line: Tuple[CellWithSkyscraper, ...]):
+        for i in range(self._get_lowest_possible_value(), self._get_highest_possible_value() + 1):
+            self._mark_according_to_possible_locations(i, [cell for cell in line if cell.is_value_possible(i)])
 
     def _mark_nontrivial_seen_and_unseen(self):
         for hint_index in range(len(self.hints)):
@@ -233,65 +581,61 @@ class AbstractPuzzleWithSkyscrapers(AbstractSquareGridPuzzle, ABC):
 
     def _mark_illegals_for_seen_status(self):
         for hint_index in range(len(self.hints)):
-            if self.hints[hint_index] is not None:
-                for i in range(self.num_of_rows):
-                    self._mark_cell_illegals_for_seen_status(hint_index, i)
+            self._mark_hint_illegals_for_seen_status(hint_index)
+
+    def _mark_hint_illegals_for_seen_status(self, hint_index: int):
+        if self.hints[hint_index] is not None:
+            for i in range(self.num_of_rows):
+                self._mark_cell_illegals_for_seen_status(hint_index, i)
+
+    def _mark_puzzle_specific_rules(self):
+        for hint_index in range(len(self.hints)):
+            self._mark_hint_specific_rules(hint_index)
 
     def _mark_general_seen_and_unseen(self, hint_index: int):
-        cell_next_to_hint = self._get_cell_with_distance_from_hint(hint_index, 0)
-        if 0 not in cell_next_to_hint.get_possible_values():
-            cell_next_to_hint.set_seen_from_side(self._get_hint_side(hint_index), True)
-        for i in range(1, self.num_of_rows):
-            if self._is_cell_blocked(hint_index, i):
-                self._get_cell_with_distance_from_hint(hint_index, i).set_seen_from_side(
-                    self._get_hint_side(hint_index), False)
-            if self._is_cell_exposed(hint_index, i):
-                self._get_cell_with_distance_from_hint(hint_index, i).set_seen_from_side(
-                    self._get_hint_side(hint_index), True)
+        line = self._hint_lines[hint_index]
+        side = self._get_hint_side(hint_index)
+        if not line[0].is_value_possible(0):
+            line[0].set_seen_from_side(side, True)
+        # The largest of the lowest and of the highest possible values of the cells in front of the current one.
+        lower_bound_in_front = line[0].get_min_possible_value()
+        upper_bound_in_front = line[0].get_max_possible_value()
+        for cell in line[1:]:
+            if lower_bound_in_front >= cell.get_max_possible_value():
+                cell.set_seen_from_side(side, False)
+            if upper_bound_in_front <= cell.get_min_possible_value():
+                cell.set_seen_from_side(side, True)
+            lower_bound_in_front = max(lower_bound_in_front, cell.get_min_possible_value())
+            upper_bound_in_front = max(upper_bound_in_front, cell.get_max_possible_value())
 
     def _can_cells_be_filled(self) -> bool:
-        for row in self.puzzle_to_draw_on:
-            possible_values = set(possible_value
-                                  for cell in row
-                                  for possible_value in cell.get_possible_values())
-            if len(possible_values) < self.num_of_rows - max(0, self._get_num_of_empty_cells() - 1):
-                return False
+        return all(self._can_line_be_filled(line) for line in self._rows + self._cols)
 
-        for i in range(self.num_of_rows):
-            possible_values = set(possible_value
-                                  for row in self.puzzle_to_draw_on
-                                  for possible_value in row[i].get_possible_values())
-            if len(possible_values) < self.num_of_rows - max(0, self._get_num_of_empty_cells() - 1):
-                return False
+    def _can_line_be_filled(self, line: Tuple[CellWithSkyscraper, ...]) -> bool:
+        possible_values_mask = 0
+        for cell in line:
+            possible_values_mask |= cell.get_possible_values_mask()
+        return bin(possible_values_mask).count("1") >= self.num_of_rows - max(0, self._get_num_of_empty_cells() - 1)
 
-        return True
+    def _mark_illegal_clashing_values_in_line(self, line: Tuple[CellWithSkyscraper, ...], cell: CellWithSkyscraper):
+        cell_value = cell.get_value()
 
-    def _mark_illegal_clashing_values_for_cell_with_value(self, col: int, row: int, cell_value: int):
-        for j in range(self.num_of_rows):
-            if j != col:
-                self.puzzle_to_draw_on[row][j].add_illegal_value(cell_value)
-        for i in range(self.num_of_rows):
-            if i != row:
-                self.puzzle_to_draw_on[i][col].add_illegal_value(cell_value)
-
-    def _mark_illegal_clashing_values_for_empty_cell(self, col: int, row: int, cell_value: int):
-        zeroes_in_row = [j for j in range(self.num_of_rows)
-                         if self.puzzle_to_draw_on[row][j].get_value() == 0]
-        if len(zeroes_in_row) > self._get_num_of_empty_cells():
-            raise UnsolvableError("Too many empty cells in the same row.")
-        if len(zeroes_in_row) == self._get_num_of_empty_cells():
-            for j in range(self.num_of_rows):
-                if j not in zeroes_in_row:
-                    self.puzzle_to_draw_on[row][j].add_illegal_value(cell_value)
-
-        zeroes_in_col = [i for i in range(self.num_of_rows)
-                         if self.puzzle_to_draw_on[i][col].get_value() == 0]
-        if len(zeroes_in_col) > self._get_num_of_empty_cells():
-            raise UnsolvableError("Too many empty cells in the same column.")
-        if len(zeroes_in_col) == self._get_num_of_empty_cells():
-            for i in range(self.num_of_rows):
-                if i not in zeroes_in_col:
-                    self.puzzle_to_draw_on[i][col].add_illegal_value(cell_value)
+        if cell_value is None:
+            return
+        if cell_value > 0:
+            for other_cell in line:
+                if other_cell is not cell:
+                    other_cell.add_illegal_value(cell_value)
+        elif cell_value == 0:
+            num_of_empty_cells_in_line = len([other_cell for other_cell in line if other_cell.get_value() == 0])
+            if num_of_empty_cells_in_line > self._get_num_of_empty_cells():
+                raise UnsolvableError("Too many empty cells in the same row or column.")
+            if num_of_empty_cells_in_line == self._get_num_of_empty_cells():
+                for other_cell in line:
+                    if other_cell.get_value() != 0:
+                        other_cell.add_illegal_value(cell_value)
+        else:
+            raise ValueError("A cell cannot have a negative value.")
 
     def _mark_according_to_possible_locations(self, val, possible_locations):
         if val < 0:
@@ -312,15 +656,8 @@ class AbstractPuzzleWithSkyscrapers(AbstractSquareGridPuzzle, ABC):
         return [[cell.get_value() for cell in row] for row in self.puzzle_to_draw_on]
 
     def _are_values_unique(self) -> bool:
-        for row in self.puzzle_to_draw_on:
-            values = [x.get_value() for x in row]
-            if not self._are_single_row_or_column_values_unique(values):
-                return False
-        for i in range(self.num_of_rows):
-            values = [row[i].get_value() for row in self.puzzle_to_draw_on]
-            if not self._are_single_row_or_column_values_unique(values):
-                return False
-        return True
+        return all(self._are_single_row_or_column_values_unique([cell.get_value() for cell in line])
+                   for line in self._rows + self._cols)
 
     def _are_single_row_or_column_values_unique(self, values: List[Optional[int]]):
         values_without_nones_and_zeroes = [v for v in values if v]
@@ -332,17 +669,22 @@ class AbstractPuzzleWithSkyscrapers(AbstractSquareGridPuzzle, ABC):
         return True
 
     def _is_complete(self) -> bool:
-        return self._count_filled_cells() == self.num_of_rows ** 2
+        return self._filled_cells.is_full()
 
     def _count_filled_cells(self) -> int:
-        return len(
-            set((i, j) for i in range(self.num_of_rows) for j in range(self.num_of_rows) if
-                self.puzzle_to_draw_on[i][j].get_value() is not None))
+        return self._filled_cells.total
 
     def _get_cell_with_distance_from_hint(self, hint_index: int, distance: int) -> CellWithSkyscraper:
         self._validate_hint_index(hint_index)
         if not 0 <= distance < self.num_of_rows:
             raise ValueError("Wrong distance.")
+        return self._hint_lines[hint_index][distance]
+
+    def _build_hint_line(self, hint_index: int) -> Tuple[CellWithSkyscraper, ...]:
+        return tuple(self._get_cell_with_distance_from_hint_in_grid(hint_index, distance)
+                     for distance in range(self.num_of_rows))
+
+    def _get_cell_with_distance_from_hint_in_grid(self, hint_index: int, distance: int) -> CellWithSkyscraper:
         is_col_hint = self._get_hint_side(hint_index) % 2 == 0
         is_backwards = self._get_hint_side(hint_index) in {1, 2}
         row = self.num_of_rows - 1 - distance if is_backwards else distance
@@ -351,16 +693,6 @@ class AbstractPuzzleWithSkyscrapers(AbstractSquareGridPuzzle, ABC):
             row, col = col, row
         return self.puzzle_to_draw_on[row][col]
 
-    def _is_cell_blocked(self, hint_index: int, cell_distance_from_hint: int) -> bool:
-        return (max(min(self._get_cell_with_distance_from_hint(hint_index, j).get_possible_values())
-                    for j in range(cell_distance_from_hint)) >=
-                max(self._get_cell_with_distance_from_hint(hint_index, cell_distance_from_hint).get_possible_values()))
-
-    def _is_cell_exposed(self, hint_index: int, cell_distance_from_hint: int) -> bool:
-        return (max(max(self._get_cell_with_distance_from_hint(hint_index, j).get_possible_values())
-                    for j in range(cell_distance_from_hint)) <=
-                min(self._get_cell_with_distance_from_hint(hint_index, cell_distance_from_hint).get_possible_values()))
-
     def _get_lowest_possible_value(self) -> int:
         return 0 if self._get_num_of_empty_cells() > 0 else 1
 
@@ -372,16 +704,13 @@ class AbstractPuzzleWithSkyscrapers(AbstractSquareGridPuzzle, ABC):
         if not 0 <= hint_index < number_of_hints:
             raise ValueError(f"There are only {number_of_hints} possible hints.")
 
-    def _return_multiple_solutions(self, second_copy: "AbstractPuzzleWithSkyscrapers"):
-        return self._get_puzzle_with_filled_values(), second_copy._get_puzzle_with_filled_values()
-
     @abstractmethod
     def _are_puzzle_specifics_valid(self) -> bool:
         raise NotImplementedError("_are_puzzle_specifics_valid not implemented.")
 
     @abstractmethod
-    def _mark_basic_conclusions(self):
-        raise NotImplementedError("_mark_basic_conclusions not implemented.")
+    def _mark_hint_basic_conclusions(self, hint_index: int):
+        raise NotImplementedError("_mark_hint_basic_conclusions not implemented.")
 
     @abstractmethod
     def _mark_puzzle_specific_seen_and_unseen(self, hint_index: int):
@@ -392,8 +721,12 @@ class AbstractPuzzleWithSkyscrapers(AbstractSquareGridPuzzle, ABC):
         raise NotImplementedError("_mark_cell_illegals_for_seen_status not implemented.")
 
     @abstractmethod
-    def _mark_puzzle_specific_rules(self):
-        raise NotImplementedError("_mark_puzzle_specific_rules not implemented.")
+    def _mark_hint_specific_rules(self, hint_index: int):
+        raise NotImplementedError("_mark_hint_specific_rules not implemented.")
+
+    @abstractmethod
+    def _get_hint_of_line(self, values: List[int], rng: random.Random) -> Optional[int]:
+        raise NotImplementedError("_get_hint_of_line not implemented.")
 
     def _get_num_of_empty_cells(self) -> int:
         return 0
@@ -407,3 +740,8 @@ class AbstractPuzzleWithSkyscrapers(AbstractSquareGridPuzzle, ABC):
     # TODO document, readme, copyrights, etc.
     # TODO draw more nicely
     # TODO add equals?!
+
+
+def _has_single_solution(puzzle_class, puzzle: Tuple[Tuple[Optional[int], ...], ...],
+                         hints: Tuple[Optional[int], ...]) -> bool:
+    return puzzle_class(puzzle, hints).count_solutions(2) == 1
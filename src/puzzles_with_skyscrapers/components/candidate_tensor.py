@@ -0,0 +1,187 @@
+from typing import Final, List, NamedTuple, Sequence, Tuple
+
+from src.components.abstract_grid_puzzle import NUMBER_OF_GRID_SIDES
+from src.components.unsolvable_error import UnsolvableError
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+NUMPY_AVAILABLE: Final = np is not None
+
+
+class TensorRules(NamedTuple):
+    """
+    What every puzzle in a batch of candidate tensors requires of its rows and columns, with one row per puzzle.
+    """
+    # How many cells of a line may hold every value (the empty value may appear several times), shaped (B, V).
+    multiplicities: "np.ndarray"
+    # Whether every value must appear that many times in every line, shaped (B, V).
+    required: "np.ndarray"
+    # The fewest different values every line must hold, shaped (B,).
+    min_distinct_values: "np.ndarray"
+    # The highest value of every puzzle, which can never be hidden behind another building, shaped (B,).
+    highest_values: "np.ndarray"
+
+
+def get_num_of_tensor_values(size: int) -> int:
+    # The values 0 (empty) to size + 1 (with an extra building) cover every variant.
+    return size + 2
+
+
+def get_candidate_tensor(puzzles: Sequence) -> "np.ndarray":
+    """
+    The possible values of the cells of puzzles of the same size, as a boolean array shaped (B, N, N, V), where
+    [b, i, j, v] is True iff v is a possible value of cell (i, j) of puzzle b.
+    """
+    _check_numpy()
+    size = _get_common_size(puzzles)
+    masks = np.array([[[cell.get_possible_values_mask() for cell in row] for row in puzzle._rows]
+                      for puzzle in puzzles], dtype=np.int64).reshape(len(puzzles), size, size)
+    return (masks[..., None] >> np.arange(get_num_of_tensor_values(size))) & 1 == 1
+
+
+def get_tensor_rules(puzzles: Sequence) -> TensorRules:
+    _check_numpy()
+    size = _get_common_size(puzzles)
+    num_of_values = get_num_of_tensor_values(size)
+    multiplicities = np.zeros((len(puzzles), num_of_values), dtype=np.int64)
+    required = np.zeros((len(puzzles), num_of_values), dtype=bool)
+    min_distinct_values = np.zeros(len(puzzles), dtype=np.int64)
+    highest_values = np.zeros(len(puzzles), dtype=np.int64)
+    for b, puzzle in enumerate(puzzles):
+        lowest, highest = puzzle._get_lowest_possible_value(), puzzle._get_highest_possible_value()
+        multiplicities[b, lowest:highest + 1] = 1
+        if lowest == 0:
+            multiplicities[b, 0] = puzzle._get_num_of_empty_cells()
+        required[b, lowest:highest + 1] = puzzle._must_all_values_appear()
+        min_distinct_values[b] = size - max(0, puzzle._get_num_of_empty_cells() - 1)
+        highest_values[b] = highest
+    return TensorRules(multiplicities, required, min_distinct_values, highest_values)
+
+
+def propagate_candidate_tensor(candidates: "np.ndarray", rules: TensorRules) -> "np.ndarray":
+    """
+    Apply the rules of the rows and columns to all the lines of all the puzzles at once, in place, until nothing
+    changes: values that already fill their line are removed from the rest of it, values with as many possible
+    locations in a line as they must appear are placed there, and values that are hidden or seen from some side
+    are removed according to the bounds of the cells in front.
+    Returns a boolean array shaped (B,) which is True for every puzzle found to have no solution.
+    """
+    _check_numpy()
+    num_of_puzzles = candidates.shape[0]
+    multiplicities = rules.multiplicities[:, None, None, :]
+    required = rules.required[:, None, None, :]
+    highest = np.arange(candidates.shape[-1]) == rules.highest_values[:, None]
+    is_unsolvable = np.zeros(num_of_puzzles, dtype=bool)
+    while True:
+        before = candidates.copy()
+        for line_axis in (1, 2):
+            num_of_candidates = candidates.sum(axis=-1, keepdims=True)
+            fixed = candidates & (num_of_candidates == 1)
+            num_of_fixed = fixed.sum(axis=line_axis, keepdims=True)
+            is_unsolvable |= (num_of_fixed > multiplicities).any(axis=(1, 2, 3))
+            candidates &= ~((num_of_fixed >= multiplicities) & ~fixed)
+
+            num_of_locations = candidates.sum(axis=line_axis, keepdims=True)
+            is_unsolvable |= (required & (num_of_locations < multiplicities)).any(axis=(1, 2, 3))
+            forced = required & (num_of_locations == multiplicities) & candidates
+            is_unsolvable |= (forced.sum(axis=-1) > 1).any(axis=(1, 2))
+            candidates[...] = np.where(forced.any(axis=-1, keepdims=True), forced, candidates)
+
+            num_of_distinct_values = candidates.any(axis=line_axis).sum(axis=-1)
+            is_unsolvable |= (num_of_distinct_values < rules.min_distinct_values[:, None]).any(axis=1)
+
+        is_unsolvable |= ~candidates.any(axis=-1).all(axis=(1, 2))
+        seen, unseen = get_seen_and_unseen(candidates)
+        is_unsolvable |= (seen & unseen).any(axis=(1, 2, 3))
+        candidates[..., 0] &= ~seen.any(axis=1)
+        candidates &= ~(unseen.any(axis=1)[..., None] & highest[:, None, None, :])
+        if is_unsolvable.all() or np.array_equal(before, candidates):
+            return is_unsolvable
+
+
+def presolve_puzzles(puzzles: Sequence) -> List[bool]:
+    """
+    Propagate the rules of the rows and columns on puzzles of the same size together, and remove the values ruled out
+    from the cells of every puzzle, marking the cells found to be seen or hidden from every side on the way.
+    The puzzles may be of different variants.
+    Returns whether every puzzle may still have a solution (puzzles without one may be left partially updated).
+    """
+    if len(puzzles) == 0:
+        return []
+    candidates = get_candidate_tensor(puzzles)
+    is_unsolvable = propagate_candidate_tensor(candidates, get_tensor_rules(puzzles))
+    masks = (candidates.astype(np.int64) << np.arange(candidates.shape[-1])).sum(axis=-1)
+    seen, unseen = get_seen_and_unseen(candidates)
+    may_have_solution = []
+    for b, puzzle in enumerate(puzzles):
+        if is_unsolvable[b]:
+            may_have_solution.append(False)
+            continue
+        try:
+            for i, row in enumerate(puzzle._rows):
+                for j, cell in enumerate(row):
+                    _remove_values_not_in_mask(cell, int(masks[b, i, j]))
+                    for side in range(NUMBER_OF_GRID_SIDES):
+                        if seen[b, side, i, j] or unseen[b, side, i, j]:
+                            cell.set_seen_from_side(side, bool(seen[b, side, i, j]))
+        except UnsolvableError:
+            may_have_solution.append(False)
+            continue
+        may_have_solution.append(True)
+    return may_have_solution
+
+
+def get_seen_and_unseen(candidates: "np.ndarray") -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    The cells surely seen and surely hidden from every side, as two boolean arrays shaped (B, 4, N, N), with the sides
+    numbered like the hints. These are the bounds of _mark_general_seen_and_unseen, for all the lines at once: a cell is
+    hidden if a cell in front of it is surely at least as high as it can be, and seen if every cell in front of it is
+    surely at most as high as it is.
+    """
+    num_of_values = candidates.shape[-1]
+    has_candidates = candidates.any(axis=-1)
+    lowest = np.where(has_candidates, candidates.argmax(axis=-1), 0)
+    highest = np.where(has_candidates, num_of_values - 1 - candidates[..., ::-1].argmax(axis=-1), 0)
+    seen = np.zeros((lowest.shape[0], NUMBER_OF_GRID_SIDES) + lowest.shape[1:], dtype=bool)
+    unseen = np.zeros(seen.shape, dtype=bool)
+    for side in range(NUMBER_OF_GRID_SIDES):
+        # Hints on the top and bottom look along the columns, and hints on the right and bottom look backwards.
+        line_axis = 1 if side % 2 == 0 else 2
+        is_backwards = side in {1, 2}
+        side_lowest, side_highest = [np.flip(array, axis=line_axis) if is_backwards else array
+                                     for array in (lowest, highest)]
+        lower_bound_in_front = np.maximum.accumulate(side_lowest, axis=line_axis)
+        upper_bound_in_front = np.maximum.accumulate(side_highest, axis=line_axis)
+        first, rest, in_front = [(slice(None),) * line_axis + (index,) for index in (0, slice(1, None), slice(None, -1))]
+        side_seen = np.zeros(lowest.shape, dtype=bool)
+        side_unseen = np.zeros(lowest.shape, dtype=bool)
+        side_seen[first] = side_lowest[first] > 0
+        side_seen[rest] = upper_bound_in_front[in_front] <= side_lowest[rest]
+        side_unseen[rest] = lower_bound_in_front[in_front] >= side_highest[rest]
+        seen[:, side] = np.flip(side_seen, axis=line_axis) if is_backwards else side_seen
+        unseen[:, side] = np.flip(side_unseen, axis=line_axis) if is_backwards else side_unseen
+    return seen, unseen
+
+
+def _remove_values_not_in_mask(cell, mask: int):
+    removed_values = cell.get_possible_values_mask() & ~mask
+    while removed_values:
+        value = (removed_values & -removed_values).bit_length() - 1
+        removed_values &= removed_values - 1
+        if cell.get_value() is None:
+            cell.add_illegal_value(value)
+
+
+def _get_common_size(puzzles: Sequence) -> int:
+    sizes = set(puzzle.num_of_rows for puzzle in puzzles)
+    if len(sizes) != 1:
+        raise ValueError("The puzzles of a candidate tensor must all be of the same size.")
+    return sizes.pop()
+
+
+def _check_numpy():
+    if not NUMPY_AVAILABLE:
+        raise ImportError("The candidate tensor engine requires numpy.")
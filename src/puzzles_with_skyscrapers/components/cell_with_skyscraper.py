@@ -1,7 +1,9 @@
 from typing import Optional, Set, Tuple
 
 from src.components.abstract_grid_puzzle import NUMBER_OF_GRID_SIDES
+from src.components.trail import Trail
 from src.components.unsolvable_error import UnsolvableError
+from src.puzzles_with_skyscrapers.components.filled_cells_counter import FilledCellsCounter
 
 
 class CellWithSkyscraper:
@@ -13,18 +15,63 @@ class CellWithSkyscraper:
         self.highest_possible_value = highest_possible_value
         self.can_be_empty = can_be_empty
         self.lowest_possible_value = 0 if can_be_empty else 1
+        # Bit i of the mask is set iff i is still a possible value for the cell.
+        self._all_values_mask = (1 << (self.highest_possible_value + 1)) - (1 << self.lowest_possible_value)
         self._seen = (None, None, None, None)
         self._value = None
-        self._illegal_values = set()
+        self._possible_values_mask = self._all_values_mask
+        self._trail: Optional[Trail] = None
+        self.position: Optional[Tuple[int, int]] = None
+        self._filled_cells_counter: Optional[FilledCellsCounter] = None
         if value is not None:
             self.set_value(value)
         self._set_seen(seen)
 
+    def attach_to_grid(self, trail: Trail, row: int, col: int,
+                       filled_cells_counter: Optional[FilledCellsCounter] = None):
+        self._trail = trail
+        self.position = (row, col)
+        self._filled_cells_counter = filled_cells_counter
+        if self._value is not None:
+            self._count_filled(1)
+
+    def restore_state(self, state: Tuple[Optional[int], int, Tuple[Optional[bool], ...]]):
+        was_filled = self._value is not None
+        self._value, self._possible_values_mask, self._seen = state
+        if was_filled and self._value is None:
+            self._count_filled(-1)
+
+    def count_changes_since(self, state: Tuple[Optional[int], int, Tuple[Optional[bool], ...]]) -> Tuple[int, bool]:
+        """
+        The number of possible values the cell lost since it recorded the given state, and whether it got a value since.
+        """
+        value, possible_values_mask, _ = state
+        num_of_removed_values = bin(possible_values_mask & ~self._possible_values_mask).count("1")
+        return num_of_removed_values, value is None and self._value is not None
+
+    @property
+    def _illegal_values(self) -> Set[int]:
+        return self._get_values_in_mask(self._all_values_mask & ~self._possible_values_mask)
+
     def get_possible_values(self) -> Set[int]:
         if self._value is not None:
             return {self._value}
-        return set(i for i in range(self.lowest_possible_value, self.highest_possible_value + 1)
-                   if i not in self._illegal_values)
+        return self._get_values_in_mask(self._possible_values_mask)
+
+    def get_possible_values_mask(self) -> int:
+        return self._possible_values_mask
+
+    def is_value_possible(self, value: int) -> bool:
+        return value >= 0 and (self._possible_values_mask >> value) & 1 == 1
+
+    def get_min_possible_value(self) -> int:
+        return (self._possible_values_mask & -self._possible_values_mask).bit_length() - 1
+
+    def get_max_possible_value(self) -> int:
+        return self._possible_values_mask.bit_length() - 1
+
+    def count_possible_values(self) -> int:
+        return bin(self._possible_values_mask).count("1")
 
     def get_value(self):
         return self._value
@@ -36,11 +83,12 @@ class CellWithSkyscraper:
             return
         if self._value is not None:
             raise UnsolvableError("Trying to set the value of a cell that already has a different value.")
-        if value_to_set in self._illegal_values:
+        if not self.is_value_possible(value_to_set):
             raise UnsolvableError("Trying to set the value of a cell to an illegal value.")
+        self._save_state()
         self._value = value_to_set
-        self._illegal_values = set(i for i in range(self.lowest_possible_value, self.highest_possible_value + 1)
-                                   if i != self._value)
+        self._possible_values_mask = 1 << value_to_set
+        self._count_filled(1)
         if self._value == self.highest_possible_value:
             self._set_seen((True, True, True, True))
         if self._value == 0:
@@ -51,15 +99,20 @@ class CellWithSkyscraper:
             raise ValueError("Trying to set an illegal value to an out of range number.")
         if self._value == illegal_value:
             raise UnsolvableError("Trying to set an illegal value that is the same as the value.")
-        self._illegal_values.add(illegal_value)
-        if len(self._illegal_values) == self.highest_possible_value - self.lowest_possible_value + 1:
+        if not self.is_value_possible(illegal_value):
+            return
+        self._save_state()
+        self._possible_values_mask &= ~(1 << illegal_value)
+        if self._possible_values_mask == 0:
             # We shouldn't really ever get here.
             raise UnsolvableError("There are no legal values left for the cell.")
-        if len(self._illegal_values) == self.highest_possible_value - self.lowest_possible_value:
-            self.set_value(self.get_possible_values().pop())
+        if self._possible_values_mask & (self._possible_values_mask - 1) == 0:
+            self.set_value(self.get_min_possible_value())
 
     def set_seen_from_side(self, hint_side: int, is_seen: bool):
         self._validate_hint_side(hint_side)
+        if self._seen[hint_side] is is_seen:
+            return
         self._set_seen(tuple(None if i != hint_side else is_seen for i in range(NUMBER_OF_GRID_SIDES)))
 
     def get_seen_from_side(self, hint_side: int) -> bool:
@@ -78,7 +131,10 @@ class CellWithSkyscraper:
                 new_seen.append(is_seen[i])
             else:
                 new_seen.append(self._seen[i])
-        self._seen = tuple(new_seen)
+        new_seen = tuple(new_seen)
+        if new_seen != self._seen:
+            self._save_state()
+            self._seen = new_seen
         for i in range(len(self._seen)):
             if self._seen[i] is False:
                 self.add_illegal_value(self.highest_possible_value)
@@ -87,6 +143,18 @@ class CellWithSkyscraper:
                 if self._seen[i] is True:
                     self.add_illegal_value(0)
 
+    def _save_state(self):
+        if self._trail is not None:
+            self._trail.record(self, (self._value, self._possible_values_mask, self._seen))
+
+    def _count_filled(self, delta: int):
+        if self._filled_cells_counter is not None:
+            self._filled_cells_counter.add(self.position[0], self.position[1], delta)
+
+    @staticmethod
+    def _get_values_in_mask(mask: int) -> Set[int]:
+        return set(i for i in range(mask.bit_length()) if (mask >> i) & 1)
+
     @staticmethod
     def _validate_hint_side(hint_side: int):
         if not 0 <= hint_side < NUMBER_OF_GRID_SIDES:
@@ -96,4 +164,6 @@ class CellWithSkyscraper:
         if not isinstance(other, CellWithSkyscraper):
             return False
         return (self.highest_possible_value == other.highest_possible_value and self._value == other._value
-                and self._seen == other._seen and self._illegal_values == other._illegal_values)
+                and self._seen == other._seen
+                and self._all_values_mask & ~self._possible_values_mask
+                == other._all_values_mask & ~other._possible_values_mask)
@@ -0,0 +1,22 @@
+from typing import Final, List
+
+
+class FilledCellsCounter:
+    """
+    The number of cells with a value in a grid, in total and in every row and column.
+    Cells update it themselves whenever they get a value or lose one on rollback.
+    """
+
+    def __init__(self, size: int):
+        self.size: Final = size
+        self.total = 0
+        self.in_rows: Final[List[int]] = [0] * size
+        self.in_cols: Final[List[int]] = [0] * size
+
+    def add(self, row: int, col: int, delta: int):
+        self.total += delta
+        self.in_rows[row] += delta
+        self.in_cols[col] += delta
+
+    def is_full(self) -> bool:
+        return self.total == self.size ** 2
@@ -0,0 +1,124 @@
+import functools
+import itertools
+import os
+import pickle
+import tempfile
+from typing import Final, List, Optional, Sequence, Tuple
+
+MAX_LINE_LENGTH: Final = 7
+
+_disk_cache_directory: Optional[str] = None
+
+
+class LinePermutationTable:
+    """
+    All the fillings of a single row or column that agree with the hints at both of its ends.
+    For every position in the line and every value, the table keeps a bitset of the fillings (by index) that have
+    that value in that position, so filtering the fillings by the possible values of the cells only takes a few
+    integer operations per position.
+    """
+
+    def __init__(self, lines: Sequence[Tuple[int, ...]], line_length: int, highest_value: int):
+        self.num_of_lines: Final = len(lines)
+        self._lines_with_value: Final = tuple(
+            tuple(self._get_lines_bitset(lines, position, value) for value in range(highest_value + 1))
+            for position in range(line_length))
+
+    def get_possible_values_masks(self, possible_values_masks: Sequence[int]) -> Optional[Tuple[int, ...]]:
+        """
+        Get the possible values (as masks) of each cell in the line, given the possible values of each cell now.
+        Returns None if no filling of the line agrees with the given possible values.
+        """
+        consistent_lines = (1 << self.num_of_lines) - 1
+        for position, possible_values_mask in enumerate(possible_values_masks):
+            lines_with_possible_value = 0
+            for value, lines_with_value in enumerate(self._lines_with_value[position]):
+                if possible_values_mask >> value & 1:
+                    lines_with_possible_value |= lines_with_value
+            consistent_lines &= lines_with_possible_value
+            if consistent_lines == 0:
+                return None
+
+        return tuple(sum(1 << value for value, lines_with_value in enumerate(self._lines_with_value[position])
+                         if lines_with_value & consistent_lines)
+                     for position in range(len(possible_values_masks)))
+
+    @staticmethod
+    def _get_lines_bitset(lines: Sequence[Tuple[int, ...]], position: int, value: int) -> int:
+        return int("".join("1" if line[position] == value else "0" for line in reversed(lines)) or "0", 2)
+
+
+def set_disk_cache_directory(directory: Optional[str]):
+    """
+    Keep the tables in the given directory as well, so they are built only once across runs.
+    None (the default) keeps them in memory only.
+    """
+    global _disk_cache_directory
+    _disk_cache_directory = directory
+
+
+@functools.lru_cache(maxsize=None)
+def get_line_permutation_table(line_length: int, highest_value: int, num_of_empty_cells: int,
+                               front_hint: Optional[int], back_hint: Optional[int]) -> LinePermutationTable:
+    if _disk_cache_directory is None:
+        return _build_line_permutation_table(line_length, highest_value, num_of_empty_cells, front_hint, back_hint)
+
+    path = os.path.join(_disk_cache_directory, "line_table_{}_{}_{}_{}_{}.pickle".format(
+        line_length, highest_value, num_of_empty_cells, front_hint, back_hint))
+    table = _load_table(path)
+    if table is not None:
+        return table
+    table = _build_line_permutation_table(line_length, highest_value, num_of_empty_cells, front_hint, back_hint)
+    _store_table(path, table)
+    return table
+
+
+def _load_table(path: str) -> Optional[LinePermutationTable]:
+    # A missing file, or one that cannot be unpickled (cut short by a crash, or left by an older version), is built
+    # again. A broken pickle can fail in many ways, so any error counts.
+    try:
+        with open(path, "rb") as f:
+            table = pickle.load(f)
+    except Exception:
+        return None
+    return table if isinstance(table, LinePermutationTable) else None
+
+
+def _store_table(path: str, table: LinePermutationTable):
+    # Several processes may share the directory, so the table is written to a file of its own and then renamed into
+    # place, which no reader can see halfway.
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path), suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, "wb") as f:
+            pickle.dump(table, f)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+def count_visible(line: Sequence[int]) -> int:
+    num_of_visible = 0
+    tallest = 0
+    for value in line:
+        if value > tallest:
+            num_of_visible += 1
+            tallest = value
+    return num_of_visible
+
+
+def _build_line_permutation_table(line_length: int, highest_value: int, num_of_empty_cells: int,
+                                  front_hint: Optional[int], back_hint: Optional[int]) -> LinePermutationTable:
+    lines = [line for line in _get_all_lines(line_length, highest_value, num_of_empty_cells)
+             if (front_hint is None or count_visible(line) == front_hint)
+             and (back_hint is None or count_visible(line[::-1]) == back_hint)]
+    return LinePermutationTable(lines, line_length, highest_value)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_all_lines(line_length: int, highest_value: int, num_of_empty_cells: int) -> List[Tuple[int, ...]]:
+    values = [0] * num_of_empty_cells + list(range(1, highest_value + 1))
+    return sorted(set(line for line in itertools.permutations(values, line_length)
+                      if line.count(0) == num_of_empty_cells))
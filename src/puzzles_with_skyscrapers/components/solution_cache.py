@@ -0,0 +1,122 @@
+import json
+import os
+import sqlite3
+import time
+from typing import Final, List, NamedTuple, Optional, Tuple
+
+# Part of every key, so that entries written by an older solver are never read. It must be increased whenever a change
+# to the solver changes its results (the solutions found for puzzles with several solutions included).
+SOLVER_VERSION: Final = 1
+# Entries keep the first solutions found up to this many, which is enough to tell a single solution from several.
+SOLUTIONS_PER_ENTRY: Final = 2
+DEFAULT_MAX_ENTRIES: Final = 100_000
+# Seconds to wait for another process that is writing to the cache.
+DEFAULT_BUSY_TIMEOUT: Final = 30.0
+# Evicting means walking the entries in order of use, so it is done once per this many writes of a connection.
+# The cache may go over its size by this many entries per writing process in between.
+_WRITES_PER_EVICTION: Final = 64
+
+
+class CachedSolution(NamedTuple):
+    # One of "single", "multiple" or "none".
+    status: str
+    solutions: List[List[List[Optional[int]]]]
+    num_of_guesses: int
+    # The SolverStats of the solve, if it collected them.
+    stats: Optional[dict]
+
+
+class SolutionCache:
+    """
+    Solutions of puzzles kept in an SQLite file between runs, keyed by the canonical form of the puzzle (so rotations and
+    reflections of a puzzle share an entry, see symmetry.get_canonical_form) and the solver version.
+    The least recently used entries are evicted once there are more than max_entries.
+    Any number of processes may share the file: SQLite locks it while writing, and in its write-ahead log mode
+    readers do not wait for writers. Every process opens its own connection on first use, so a cache can be passed
+    to worker processes.
+    """
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES, busy_timeout: float = DEFAULT_BUSY_TIMEOUT):
+        if max_entries < 1:
+            raise ValueError("The cache must be able to hold at least 1 entry.")
+        self.path: Final = path
+        self.max_entries: Final = max_entries
+        self.busy_timeout: Final = busy_timeout
+        self.num_of_hits = 0
+        self.num_of_misses = 0
+        self._connection: Optional[sqlite3.Connection] = None
+        self._connection_pid: Optional[int] = None
+        self._num_of_writes_since_eviction = 0
+
+    def get(self, key: Tuple) -> Optional[CachedSolution]:
+        connection = self._get_connection()
+        encoded_key = _encode_key(key)
+        row = connection.execute("SELECT status, solutions, num_of_guesses, stats FROM solutions WHERE key = ?",
+                                 (encoded_key,)).fetchone()
+        if row is None:
+            self.num_of_misses += 1
+            return None
+        self.num_of_hits += 1
+        connection.execute("UPDATE solutions SET last_used = ? WHERE key = ?", (time.time(), encoded_key))
+        status, solutions, num_of_guesses, stats = row
+        return CachedSolution(status, json.loads(solutions), num_of_guesses,
+                              json.loads(stats) if stats is not None else None)
+
+    def put(self, key: Tuple, cached_solution: CachedSolution):
+        connection = self._get_connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO solutions (key, status, solutions, num_of_guesses, stats, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (_encode_key(key), cached_solution.status, json.dumps(cached_solution.solutions[:SOLUTIONS_PER_ENTRY]),
+             cached_solution.num_of_guesses,
+             json.dumps(cached_solution.stats) if cached_solution.stats is not None else None, time.time()))
+        self._num_of_writes_since_eviction += 1
+        if self._num_of_writes_since_eviction >= _WRITES_PER_EVICTION:
+            self.evict()
+
+    def evict(self):
+        """
+        Delete the least recently used entries beyond max_entries.
+        """
+        self._num_of_writes_since_eviction = 0
+        self._get_connection().execute(
+            "DELETE FROM solutions WHERE key IN "
+            "(SELECT key FROM solutions ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+    def get_num_of_entries(self) -> int:
+        return self._get_connection().execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+
+    def clear(self):
+        self._get_connection().execute("DELETE FROM solutions")
+
+    def close(self):
+        if self._connection is not None and self._connection_pid == os.getpid():
+            self._connection.close()
+        self._connection = None
+        self._connection_pid = None
+
+    def __getstate__(self):
+        # Connections cannot be shared between processes, so every process opens its own.
+        state = dict(self.__dict__)
+        state["_connection"] = None
+        state["_connection_pid"] = None
+        return state
+
+    def _get_connection(self) -> sqlite3.Connection:
+        if self._connection is None or self._connection_pid != os.getpid():
+            # Every statement commits on its own, which keeps the locks short.
+            connection = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS solutions (key TEXT PRIMARY KEY, status TEXT NOT NULL, "
+                               "solutions TEXT NOT NULL, num_of_guesses INTEGER NOT NULL, stats TEXT, "
+                               "last_used REAL NOT NULL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS solutions_by_last_used ON solutions (last_used)")
+            self._connection = connection
+            self._connection_pid = os.getpid()
+            self._num_of_writes_since_eviction = 0
+        return self._connection
+
+
+def _encode_key(key: Tuple) -> str:
+    return json.dumps([SOLVER_VERSION, *key])
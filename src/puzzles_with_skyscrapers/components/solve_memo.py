@@ -0,0 +1,80 @@
+from collections import OrderedDict
+from typing import Final, NamedTuple, Optional, Tuple
+
+DEFAULT_CAPACITY: Final = 1024
+
+
+class MemoizedSolutions(NamedTuple):
+    # Up to 2 solutions, as tuples so that no caller can change them.
+    solutions: Tuple[Tuple[Tuple[Optional[int], ...], ...], ...]
+    num_of_guesses: int
+
+
+class SolveMemo:
+    """
+    The solutions of the last capacity puzzles solved in this process, by the class, grid and hints of the puzzle, so
+    that new instances of a puzzle that was already solved (like the ones the hint minimization creates) skip
+    the search. A capacity of 0 turns memoization off.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = 0
+        self.num_of_hits = 0
+        self.num_of_misses = 0
+        self._entries: "OrderedDict[tuple, MemoizedSolutions]" = OrderedDict()
+        self.set_capacity(capacity)
+
+    def get(self, key: tuple) -> Optional[MemoizedSolutions]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.num_of_misses += 1
+            return None
+        self.num_of_hits += 1
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: tuple, entry: MemoizedSolutions):
+        if self.capacity == 0:
+            return
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def set_capacity(self, capacity: int):
+        if capacity < 0:
+            raise ValueError("The capacity cannot be negative.")
+        self.capacity = capacity
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def get_hit_rate(self) -> float:
+        num_of_queries = self.num_of_hits + self.num_of_misses
+        if num_of_queries == 0:
+            return 0.0
+        return self.num_of_hits / num_of_queries
+
+    def clear(self):
+        """
+        Forget all the solutions and reset the statistics.
+        """
+        self._entries.clear()
+        self.num_of_hits = 0
+        self.num_of_misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_solve_memo: Final = SolveMemo()
+
+
+def get_solve_memo() -> SolveMemo:
+    """
+    Get the memo shared by all the puzzles in this process.
+    """
+    return _solve_memo
+
+
+def clear_solve_memo():
+    _solve_memo.clear()
@@ -0,0 +1,119 @@
+import functools
+import time
+from typing import Callable, Dict, Final, Tuple
+
+from src.components.trail import Trail
+
+# The method that runs every rule in the propagation loop, by the name of the rule. The loop runs every rule on the
+# rows, columns and hints that changed, so most rules are named after the whole grid methods that run them everywhere.
+# Each method is wrapped on its own and no wrapped method calls another, so no call or time is counted twice.
+RULE_METHODS: Final = {
+    "mark_basic_conclusions": "_mark_hint_basic_conclusions",
+    "mark_illegal_clashing_values": "_mark_line_clashing_values",
+    "fill_only_possible_locations": "_fill_only_possible_locations_in_line",
+    "mark_general_seen_and_unseen": "_mark_general_seen_and_unseen",
+    "mark_puzzle_specific_seen_and_unseen": "_mark_puzzle_specific_seen_and_unseen",
+    "mark_illegals_for_seen_status": "_mark_hint_illegals_for_seen_status",
+    "mark_puzzle_specific_rules": "_mark_hint_specific_rules",
+}
+
+
+class RuleStats:
+
+    def __init__(self):
+        self.num_of_calls = 0
+        self.seconds = 0.0
+        # The number of possible values the rule removed from cells, and the number of cells it filled.
+        self.num_of_eliminations = 0
+        self.num_of_filled_cells = 0
+
+    def to_dict(self) -> Dict[str, float]:
+        return dict(vars(self))
+
+
+class SolverStats:
+    """
+    Counters of the work a puzzle did while solving: the calls, time and progress of every rule, and of the search.
+    A puzzle only collects them after enable_stats is called on it, which replaces the rule methods of that puzzle
+    with counting wrappers, so puzzles without stats run exactly the same code as before.
+    The solver never copies the grid: the search saves cell states on the trail instead, so the trail entries
+    are counted in place of state copies.
+    """
+
+    def __init__(self):
+        self.rules: Final[Dict[str, RuleStats]] = {rule: RuleStats() for rule in RULE_METHODS}
+        self.num_of_guesses = 0
+        self.num_of_backtracks = 0
+        self.num_of_trail_entries = 0
+
+    def instrument(self, puzzle):
+        trail: Trail = puzzle._trail
+        for rule, method_name in RULE_METHODS.items():
+            setattr(puzzle, method_name, self._wrap_rule(self.rules[rule], getattr(puzzle, method_name), trail))
+        puzzle._find_solutions = self._wrap_find_solutions(puzzle, puzzle._find_solutions)
+        puzzle._rollback = self._wrap_rollback(puzzle._rollback, trail)
+        trail.record = self._wrap_counter("num_of_trail_entries", trail.record)
+
+    def to_dict(self) -> dict:
+        return {
+            "rules": {rule: rule_stats.to_dict() for rule, rule_stats in self.rules.items()},
+            "num_of_guesses": self.num_of_guesses,
+            "num_of_backtracks": self.num_of_backtracks,
+            "num_of_trail_entries": self.num_of_trail_entries,
+        }
+
+    @staticmethod
+    def _wrap_rule(rule_stats: RuleStats, method: Callable, trail: Trail) -> Callable:
+        @functools.wraps(method)
+        def wrapper(*args):
+            checkpoint = trail.get_checkpoint()
+            start = time.perf_counter()
+            try:
+                return method(*args)
+            finally:
+                rule_stats.seconds += time.perf_counter() - start
+                rule_stats.num_of_calls += 1
+                num_of_eliminations, num_of_filled_cells = _count_changes_since(trail, checkpoint)
+                rule_stats.num_of_eliminations += num_of_eliminations
+                rule_stats.num_of_filled_cells += num_of_filled_cells
+        return wrapper
+
+    def _wrap_counter(self, counter_name: str, method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(*args):
+            setattr(self, counter_name, getattr(self, counter_name) + 1)
+            return method(*args)
+        return wrapper
+
+    def _wrap_find_solutions(self, puzzle, find_solutions: Callable) -> Callable:
+        # Every search engine counts its guesses in the puzzle, which starts counting over in every search.
+        @functools.wraps(find_solutions)
+        def wrapper(limit: int):
+            try:
+                return find_solutions(limit)
+            finally:
+                self.num_of_guesses += puzzle.num_of_guesses
+        return wrapper
+
+    def _wrap_rollback(self, rollback: Callable, trail: Trail) -> Callable:
+        @functools.wraps(rollback)
+        def wrapper(checkpoint: int):
+            if checkpoint < trail.get_checkpoint():
+                self.num_of_backtracks += 1
+            return rollback(checkpoint)
+        return wrapper
+
+
+def _count_changes_since(trail: Trail, checkpoint: int) -> Tuple[int, int]:
+    # The first state a cell recorded since the checkpoint is the state it had at the checkpoint.
+    # Cells are compared by value, so they are told apart by their ids.
+    states_at_checkpoint = {}
+    for cell, state in trail.get_entries_since(checkpoint):
+        states_at_checkpoint.setdefault(id(cell), (cell, state))
+    num_of_eliminations = 0
+    num_of_filled_cells = 0
+    for cell, state in states_at_checkpoint.values():
+        num_of_removed_values, was_filled = cell.count_changes_since(state)
+        num_of_eliminations += num_of_removed_values
+        num_of_filled_cells += was_filled
+    return num_of_eliminations, num_of_filled_cells
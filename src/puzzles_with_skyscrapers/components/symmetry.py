@@ -0,0 +1,106 @@
+from typing import Final, Iterable, NamedTuple, Optional, Sequence, Tuple
+
+from src.components.abstract_grid_puzzle import NUMBER_OF_GRID_SIDES
+
+Grid = Tuple[Tuple[Optional[int], ...], ...]
+Hints = Tuple[Optional[int], ...]
+
+# The cell next to the hint of every side, as a function of the size and the position of the hint along its side,
+# and the direction in which the hint looks, in the order of the hints.
+_HINT_STARTS: Final = (
+    lambda size, k: (0, k),
+    lambda size, k: (k, size - 1),
+    lambda size, k: (size - 1, k),
+    lambda size, k: (k, 0),
+)
+_HINT_DIRECTIONS: Final = ((1, 0), (0, -1), (-1, 0), (0, 1))
+
+
+class Symmetry(NamedTuple):
+    """
+    One of the 8 symmetries of a square: the grid is reflected left to right if is_reflected, and then rotated
+    clockwise num_of_rotations times. The hints move with the rows and columns they look at.
+    """
+    num_of_rotations: int
+    is_reflected: bool
+
+
+SYMMETRIES: Final = tuple(Symmetry(num_of_rotations, is_reflected)
+                          for is_reflected in (False, True) for num_of_rotations in range(4))
+IDENTITY: Final = SYMMETRIES[0]
+
+
+class CanonicalForm(NamedTuple):
+    variant: str
+    puzzle: Grid
+    hints: Hints
+    # The symmetry that maps the original puzzle to this form.
+    symmetry: Symmetry
+
+    def get_key(self) -> Tuple[str, Grid, Hints]:
+        """
+        The same for all the puzzles that are rotations or reflections of each other.
+        """
+        return self.variant, self.puzzle, self.hints
+
+
+def get_inverse(symmetry: Symmetry) -> Symmetry:
+    # Reflections undo themselves, and rotations are undone by rotating the rest of the way around.
+    if symmetry.is_reflected:
+        return symmetry
+    return Symmetry((NUMBER_OF_GRID_SIDES - symmetry.num_of_rotations) % NUMBER_OF_GRID_SIDES, False)
+
+
+def transform_cell(symmetry: Symmetry, size: int, row: int, col: int) -> Tuple[int, int]:
+    if symmetry.is_reflected:
+        col = size - 1 - col
+    for _ in range(symmetry.num_of_rotations):
+        row, col = col, size - 1 - row
+    return row, col
+
+
+def transform_grid(grid: Sequence[Sequence[Optional[int]]], symmetry: Symmetry) -> Grid:
+    size = len(grid)
+    transformed = [[None] * size for _ in range(size)]
+    for i in range(size):
+        for j in range(size):
+            new_row, new_col = transform_cell(symmetry, size, i, j)
+            transformed[new_row][new_col] = grid[i][j]
+    return tuple(tuple(row) for row in transformed)
+
+
+def transform_hints(hints: Sequence[Optional[int]], symmetry: Symmetry) -> Hints:
+    size = len(hints) // NUMBER_OF_GRID_SIDES
+    transformed = [None] * len(hints)
+    for hint_index, hint in enumerate(hints):
+        side, k = divmod(hint_index, size)
+        new_row, new_col = transform_cell(symmetry, size, *_HINT_STARTS[side](size, k))
+        new_side = _HINT_DIRECTIONS.index(_transform_direction(symmetry, _HINT_DIRECTIONS[side]))
+        transformed[new_side * size + (new_col if new_side % 2 == 0 else new_row)] = hint
+    return tuple(transformed)
+
+
+def get_canonical_form(variant: str, grid: Sequence[Sequence[Optional[int]]],
+                       hints: Sequence[Optional[int]]) -> CanonicalForm:
+    """
+    The smallest of the 8 symmetric copies of the puzzle, comparing the grid and then the hints, with empty cells and
+    missing hints before all the values.
+    A solution of the canonical puzzle is mapped back with transform_grid(solution, get_inverse(form.symmetry)).
+    """
+    forms = [CanonicalForm(variant, transform_grid(grid, symmetry), transform_hints(hints, symmetry), symmetry)
+             for symmetry in SYMMETRIES]
+    return min(forms, key=lambda form: (_get_sort_key(value for row in form.puzzle for value in row),
+                                        _get_sort_key(form.hints)))
+
+
+def _transform_direction(symmetry: Symmetry, direction: Tuple[int, int]) -> Tuple[int, int]:
+    row_step, col_step = direction
+    if symmetry.is_reflected:
+        col_step = -col_step
+    for _ in range(symmetry.num_of_rotations):
+        row_step, col_step = col_step, -row_step
+    return row_step, col_step
+
+
+def _get_sort_key(values: Iterable[Optional[int]]) -> Tuple[int, ...]:
+    return tuple(-1 if value is None else value for value in values)
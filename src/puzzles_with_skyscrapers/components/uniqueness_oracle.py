@@ -0,0 +1,154 @@
+from collections import OrderedDict
+from typing import Dict, Final, List, Optional, Tuple
+
+# How many oracles get_uniqueness_oracle keeps, dropping the least recently used one first.
+MAX_NUM_OF_ORACLES: Final = 16
+
+
+class UniquenessOracle:
+    """
+    Answers whether a puzzle has a single solution with only some of its hints, for subsets of one full set of hints.
+    As long as the puzzle has a solution with all of its hints, every subset of the hints has a solution too, so if
+    a subset of the hints leaves a single solution, so does every superset of it, and if it leaves several, so does
+    every subset of it. The oracle keeps the smallest subsets known to leave a single solution and the largest
+    subsets known to leave several, and only solves the puzzle when neither answers the question.
+    Subsets are represented as bitmasks over the indices of the hints in the full set of hints.
+    With a timeout, a subset whose solutions take longer than timeout seconds to count is treated as leaving several
+    solutions, so the oracle may wrongly deny that a subset leaves a single solution, but never wrongly confirm it.
+    """
+
+    def __init__(self, puzzle_class, puzzle: Tuple[Tuple[Optional[int], ...], ...],
+                 hints: Tuple[Optional[int], ...], timeout: Optional[float] = None):
+        self.puzzle_class: Final = puzzle_class
+        self.puzzle: Final = puzzle
+        self.hints: Final = hints
+        self.timeout: Final = timeout
+        self.full_mask: Final = sum(1 << i for i, hint in enumerate(hints) if hint is not None)
+        self.num_of_queries = 0
+        self.num_of_solves = 0
+        self._single_solution_masks: List[int] = []
+        self._multiple_solutions_masks: List[int] = []
+        self._answers: Dict[int, bool] = {}
+        num_of_solutions_with_all_hints = self._try_counting_solutions(self.full_mask)
+        self._is_monotone = num_of_solutions_with_all_hints is not None and num_of_solutions_with_all_hints > 0
+        self.add_answer_for_mask(self.full_mask, num_of_solutions_with_all_hints == 1)
+
+    def is_single_solution(self, hints: Tuple[Optional[int], ...]) -> bool:
+        return self.is_single_solution_for_mask(self.get_mask(hints))
+
+    def is_single_solution_for_mask(self, mask: int) -> bool:
+        self.num_of_queries += 1
+        known = self.get_known_answer_for_mask(mask)
+        if known is not None:
+            return known
+        self.num_of_solves += 1
+        is_single = self._try_counting_solutions(mask) == 1
+        self.add_answer_for_mask(mask, is_single)
+        return is_single
+
+    def get_known_answer_for_mask(self, mask: int) -> Optional[bool]:
+        if mask in self._answers:
+            return self._answers[mask]
+        if not self._is_monotone:
+            return None
+        if any(single_mask & ~mask == 0 for single_mask in self._single_solution_masks):
+            return True
+        if any(mask & ~multiple_mask == 0 for multiple_mask in self._multiple_solutions_masks):
+            return False
+        return None
+
+    def add_answer_for_mask(self, mask: int, is_single: bool):
+        self._answers[mask] = is_single
+        if is_single:
+            self._single_solution_masks = [m for m in self._single_solution_masks if mask & ~m != 0]
+            self._single_solution_masks.append(mask)
+        else:
+            self._multiple_solutions_masks = [m for m in self._multiple_solutions_masks if m & ~mask != 0]
+            self._multiple_solutions_masks.append(mask)
+
+    def get_hit_rate(self) -> float:
+        """
+        The fraction of the queries answered without solving the puzzle.
+        """
+        if self.num_of_queries == 0:
+            return 0.0
+        return 1 - self.num_of_solves / self.num_of_queries
+
+    def get_all_minimal_masks(self) -> List[int]:
+        """
+        Get every subset of the hints that leaves a single solution, but not after removing any one of its hints.
+        """
+        if not self.is_single_solution_for_mask(self.full_mask):
+            return []
+        minimal_masks = []
+        visited = {self.full_mask}
+        to_visit = [self.full_mask]
+        while len(to_visit) > 0:
+            mask = to_visit.pop()
+            is_minimal = True
+            for bit in self._get_bits(mask):
+                smaller_mask = mask & ~bit
+                if self.is_single_solution_for_mask(smaller_mask):
+                    is_minimal = False
+                    if smaller_mask not in visited:
+                        visited.add(smaller_mask)
+                        to_visit.append(smaller_mask)
+            if is_minimal:
+                minimal_masks.append(mask)
+        return sorted(minimal_masks)
+
+    def get_mask(self, hints: Tuple[Optional[int], ...]) -> int:
+        if len(hints) != len(self.hints):
+            raise ValueError("Wrong number of hints.")
+        mask = 0
+        for i, hint in enumerate(hints):
+            if hint is not None:
+                if hint != self.hints[i]:
+                    raise ValueError("The hints must be a subset of the oracle's hints.")
+                mask |= 1 << i
+        return mask
+
+    def get_hints(self, mask: int) -> Tuple[Optional[int], ...]:
+        return tuple(hint if mask >> i & 1 else None for i, hint in enumerate(self.hints))
+
+    def _try_counting_solutions(self, mask: int) -> Optional[int]:
+        """
+        Returns the number of solutions with the given subset of the hints (up to 2), or None if counting timed out.
+        """
+        try:
+            return self.puzzle_class(self.puzzle, self.get_hints(mask)).count_solutions(2, self.timeout)
+        except TimeoutError:
+            return None
+
+    @staticmethod
+    def _get_bits(mask: int) -> List[int]:
+        bits = []
+        while mask:
+            bit = mask & -mask
+            bits.append(bit)
+            mask &= ~bit
+        return bits
+
+
+_oracles: "OrderedDict[tuple, UniquenessOracle]" = OrderedDict()
+
+
+def get_uniqueness_oracle(puzzle_class, puzzle: Tuple[Tuple[Optional[int], ...], ...],
+                          hints: Tuple[Optional[int], ...]) -> UniquenessOracle:
+    """
+    Get the oracle shared by all the puzzles of the given class with the given grid and (full set of) hints.
+    Only the last MAX_NUM_OF_ORACLES oracles are kept, so a long run over many puzzles does not hold the answers for
+    all of them.
+    """
+    key = (puzzle_class, puzzle, hints)
+    oracle = _oracles.get(key)
+    if oracle is None:
+        oracle = _oracles[key] = UniquenessOracle(puzzle_class, puzzle, hints)
+        while len(_oracles) > MAX_NUM_OF_ORACLES:
+            _oracles.popitem(last=False)
+    _oracles.move_to_end(key)
+    return oracle
+
+
+def clear_uniqueness_oracles():
+    _oracles.clear()
@@ -0,0 +1,185 @@
+import argparse
+import json
+import os
+import random
+import sys
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Dict, Final, Iterator, List, NamedTuple, Optional, TextIO, Tuple
+
+from src.puzzles_with_skyscrapers.batch_solver import PUZZLE_VARIANTS
+from src.puzzles_with_skyscrapers.components.uniqueness_oracle import UniquenessOracle
+
+# The number of guesses the solver makes on puzzles of every difficulty (with no upper bound for None).
+DIFFICULTIES: Final = {
+    "easy": (0, 0),
+    "medium": (1, 3),
+    "hard": (4, None),
+}
+
+DEFAULT_MAX_ATTEMPTS: Final = 1000
+
+_TASKS_IN_FLIGHT_PER_WORKER: Final = 2
+
+
+class GeneratedPuzzle(NamedTuple):
+    index: int
+    variant: str
+    puzzle: Tuple[Tuple[Optional[int], ...], ...]
+    hints: Tuple[Optional[int], ...]
+    solution: Tuple[Tuple[int, ...], ...]
+    num_of_guesses: int
+
+
+def generate_puzzle(variant: str, size: int, rng: random.Random, strip_givens: bool = False,
+                    difficulty: Optional[str] = None, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                    index: int = 0, check_timeout: Optional[float] = None) -> Optional[GeneratedPuzzle]:
+    """
+    Generate a puzzle with a single solution, by picking a random solution, finding all of its hints and then removing
+    hints (and givens, if strip_givens is True) in a random order for as long as the solution stays single.
+    Without strip_givens, the puzzle starts with no givens, unless the hints alone leave more than one solution.
+    A check for a single solution that takes over check_timeout seconds (if given) counts as failed, which keeps large
+    grids practical at the cost of leaving more hints and givens.
+    Returns None if no puzzle of the given difficulty was found in max_attempts attempts.
+    """
+    if variant not in PUZZLE_VARIANTS:
+        raise ValueError(f"Unknown puzzle variant {variant}. Known variants: {', '.join(PUZZLE_VARIANTS)}.")
+    if difficulty is not None and difficulty not in DIFFICULTIES:
+        raise ValueError(f"Unknown difficulty {difficulty}. Known difficulties: {', '.join(DIFFICULTIES)}.")
+    for _ in range(max_attempts):
+        generated = _try_generating_puzzle(variant, size, rng, strip_givens, index, check_timeout)
+        if _is_of_difficulty(generated.num_of_guesses, difficulty):
+            return generated
+    return None
+
+
+def generate_puzzles(variant: str, size: int, count: int, seed: Optional[int] = None, workers: Optional[int] = None,
+                     strip_givens: bool = False, difficulty: Optional[str] = None,
+                     max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> Iterator[GeneratedPuzzle]:
+    """
+    Generate count puzzles over a pool of worker processes, yielding every puzzle as soon as it is generated.
+    The puzzle with every index is generated with its own random number generator, seeded by seed and the index,
+    so a seed always generates the same puzzles (though not necessarily in the same order).
+    """
+    if count < 0:
+        raise ValueError("The number of puzzles cannot be negative.")
+    if workers is not None and workers < 1:
+        raise ValueError("There must be at least 1 worker.")
+
+    args = (variant, size, seed, strip_givens, difficulty, max_attempts)
+    if workers == 1:
+        for index in range(count):
+            yield _get_generated_puzzle(_generate_puzzle_for_index(*args, index))
+        return
+
+    workers = workers if workers is not None else os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight: Dict[Future, int] = {}
+        next_index = 0
+        while next_index < count or len(in_flight) > 0:
+            while next_index < count and len(in_flight) < workers * _TASKS_IN_FLIGHT_PER_WORKER:
+                in_flight[executor.submit(_generate_puzzle_for_index, *args, next_index)] = next_index
+                next_index += 1
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=lambda f: in_flight[f]):
+                del in_flight[future]
+                yield _get_generated_puzzle(future.result())
+
+
+def generated_puzzle_to_json(generated: GeneratedPuzzle) -> str:
+    return json.dumps(generated._asdict())
+
+
+def main(args: Optional[List[str]] = None, stdout: TextIO = sys.stdout):
+    parser = argparse.ArgumentParser(description="Generate skyscraper puzzles with a single solution as JSON lines.")
+    parser.add_argument("--variant", choices=list(PUZZLE_VARIANTS), default="skyscrapers")
+    parser.add_argument("--size", type=int, required=True, help="the number of rows (and columns) of the grid")
+    parser.add_argument("--count", type=int, required=True, help="the number of puzzles to generate")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: CPU count)")
+    parser.add_argument("--strip-givens", action="store_true", help="start from the filled grid and remove values")
+    parser.add_argument("--difficulty", choices=list(DIFFICULTIES), default=None)
+    parser.add_argument("--output", default="-", help="the output file, or - (the default) for stdout")
+    parsed = parser.parse_args(args)
+
+    output_file = stdout if parsed.output == "-" else open(parsed.output, "w")
+    try:
+        for generated in generate_puzzles(parsed.variant, parsed.size, parsed.count, parsed.seed, parsed.workers,
+                                          parsed.strip_givens, parsed.difficulty):
+            output_file.write(generated_puzzle_to_json(generated) + "\n")
+            output_file.flush()
+    finally:
+        if output_file is not stdout:
+            output_file.close()
+
+
+def _generate_puzzle_for_index(variant: str, size: int, seed: Optional[int], strip_givens: bool,
+                               difficulty: Optional[str], max_attempts: int, index: int) -> Optional[GeneratedPuzzle]:
+    rng = random.Random(f"{seed}:{index}") if seed is not None else random.Random()
+    return generate_puzzle(variant, size, rng, strip_givens, difficulty, max_attempts, index)
+
+
+def _get_generated_puzzle(generated: Optional[GeneratedPuzzle]) -> GeneratedPuzzle:
+    if generated is None:
+        raise ValueError("Could not generate a puzzle of the requested difficulty.")
+    return generated
+
+
+def _try_generating_puzzle(variant: str, size: int, rng: random.Random, strip_givens: bool, index: int,
+                           check_timeout: Optional[float] = None) -> GeneratedPuzzle:
+    puzzle_class = PUZZLE_VARIANTS[variant]
+    no_hints = tuple([None] * (4 * size))
+    solution = puzzle_class(tuple([tuple([None] * size)] * size), no_hints).get_random_solution(rng)
+    solution = tuple(tuple(row) for row in solution)
+    all_hints = puzzle_class(solution, no_hints).get_hints_of_solution(rng)
+
+    if strip_givens:
+        grid = [list(row) for row in solution]
+        cells = [(i, j) for i in range(size) for j in range(size)]
+        rng.shuffle(cells)
+        for i, j in cells:
+            grid[i][j] = None
+            if not _is_single_solution(puzzle_class, grid, all_hints, check_timeout):
+                grid[i][j] = solution[i][j]
+        grid = tuple(tuple(row) for row in grid)
+    else:
+        # The hints alone do not always leave a single solution (especially with an extra building), so random givens
+        # are added until they do.
+        grid = [[None] * size for _ in range(size)]
+        cells = [(i, j) for i in range(size) for j in range(size)]
+        rng.shuffle(cells)
+        for i, j in cells:
+            if _is_single_solution(puzzle_class, grid, all_hints, check_timeout):
+                break
+            grid[i][j] = solution[i][j]
+        grid = tuple(tuple(row) for row in grid)
+
+    oracle = UniquenessOracle(puzzle_class, grid, all_hints, check_timeout)
+    mask = oracle.full_mask
+    hint_indices = [i for i in range(len(all_hints)) if all_hints[i] is not None]
+    rng.shuffle(hint_indices)
+    for i in hint_indices:
+        if oracle.is_single_solution_for_mask(mask & ~(1 << i)):
+            mask &= ~(1 << i)
+
+    puzzle = puzzle_class(grid, oracle.get_hints(mask))
+    puzzle.count_solutions(2)
+    return GeneratedPuzzle(index, variant, grid, puzzle.hints, solution, puzzle.num_of_guesses)
+
+
+def _is_single_solution(puzzle_class, grid: List[List[Optional[int]]], hints: Tuple[Optional[int], ...],
+                        timeout: Optional[float]) -> bool:
+    try:
+        return puzzle_class(tuple(tuple(row) for row in grid), hints).count_solutions(2, timeout) == 1
+    except TimeoutError:
+        return False
+
+
+def _is_of_difficulty(num_of_guesses: int, difficulty: Optional[str]) -> bool:
+    if difficulty is None:
+        return True
+    min_guesses, max_guesses = DIFFICULTIES[difficulty]
+    return num_of_guesses >= min_guesses and (max_guesses is None or num_of_guesses <= max_guesses)
+
+
+if __name__ == '__main__':
+    main()
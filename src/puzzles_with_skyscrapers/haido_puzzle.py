@@ -1,3 +1,6 @@
+import random
+from typing import List, Optional, Tuple
+
 from src.components.unsolvable_error import UnsolvableError
 from src.puzzles_with_skyscrapers.components.abstract_puzzle_with_skyscrapers import AbstractPuzzleWithSkyscrapers
 
@@ -12,34 +15,57 @@ class HaidoPuzzle(AbstractPuzzleWithSkyscrapers):
         return True
 
     def _mark_basic_conclusions(self):
-        for i in range(len(self.hints)):
-            if self.hints[i] is not None:
-                for j in range(self.hints[i], self.num_of_rows):
-                    self._get_cell_with_distance_from_hint(i, j).add_illegal_value(self.hints[i])
+        super()._mark_basic_conclusions()
         self._mark_puzzle_specific_rules()
 
+    def _mark_hint_basic_conclusions(self, hint_index: int):
+        if self.hints[hint_index] is not None:
+            for j in range(self.hints[hint_index], self.num_of_rows):
+                self._hint_lines[hint_index][j].add_illegal_value(self.hints[hint_index])
+
+    def get_hints_of_solution(self, rng: Optional[random.Random] = None) -> Tuple[Optional[int], ...]:
+        rng = rng if rng is not None else random.Random()
+        hints = list(super().get_hints_of_solution(rng))
+        # Opposite hints can only be the same if they are both the highest building, which is seen from everywhere.
+        for i in range(self.num_of_rows * 2):
+            across = i + self.num_of_rows * 2
+            if hints[i] == hints[across] and hints[i] != self.num_of_rows:
+                values_seen_across = self._get_values_seen([cell.get_value() for cell in self._hint_lines[across]])
+                hints[across] = rng.choice([v for v in values_seen_across if v != hints[i]])
+        return tuple(hints)
+
+    def _get_hint_of_line(self, values: List[int], rng: random.Random) -> Optional[int]:
+        return rng.choice(self._get_values_seen(values))
+
     def _mark_puzzle_specific_seen_and_unseen(self, hint_index: int):
         if self.hints[hint_index] is None:
             return
         for i in range(self.num_of_rows):
-            cell = self._get_cell_with_distance_from_hint(hint_index, i)
+            cell = self._hint_lines[hint_index][i]
             if cell.get_value() == self.hints[hint_index]:
                 cell.set_seen_from_side(self._get_hint_side(hint_index), True)
 
     def _mark_cell_illegals_for_seen_status(self, hint_index: int, distance_from_hint: int):
-        cell = self._get_cell_with_distance_from_hint(hint_index, distance_from_hint)
+        cell = self._hint_lines[hint_index][distance_from_hint]
         if cell.get_seen_from_side(self._get_hint_side(hint_index)) is False:
             cell.add_illegal_value(self.hints[hint_index])  # self.hints[hint_index] is not None
 
-    def _mark_puzzle_specific_rules(self):
-        for i in range(len(self.hints)):
-            if self.hints[i] is not None:
-                cells_where_hint_is_possible = [
-                    j for j in range(self.num_of_rows)
-                    if self.hints[i] in self._get_cell_with_distance_from_hint(i, j).get_possible_values()]
-                if len(cells_where_hint_is_possible) == 0:
-                    raise UnsolvableError("There is no possible location for a value.")
-                first_cell_where_hint_is_possible = min(cells_where_hint_is_possible)
-                for j in range(first_cell_where_hint_is_possible + 1):
-                    for k in range(self.hints[i] + 1, self.num_of_rows + 1):
-                        self._get_cell_with_distance_from_hint(i, j).add_illegal_value(k)
+    def _mark_hint_specific_rules(self, hint_index: int):
+        if self.hints[hint_index] is not None:
+            cells_where_hint_is_possible = [
+                j for j in range(self.num_of_rows)
+                if self._hint_lines[hint_index][j].is_value_possible(self.hints[hint_index])]
+            if len(cells_where_hint_is_possible) == 0:
+                raise UnsolvableError("There is no possible location for a value.")
+            first_cell_where_hint_is_possible = min(cells_where_hint_is_possible)
+            for j in range(first_cell_where_hint_is_possible + 1):
+                for k in range(self.hints[hint_index] + 1, self.num_of_rows + 1):
+                    self._hint_lines[hint_index][j].add_illegal_value(k)
+
+    @staticmethod
+    def _get_values_seen(values: List[int]) -> List[int]:
+        values_seen = []
+        for value in values:
+            if len(values_seen) == 0 or value > values_seen[-1]:
+                values_seen.append(value)
+        return values_seen
@@ -9,5 +9,5 @@ class SkyscrapersExtraBuildingPuzzle(SkyscrapersPuzzle):
     def _get_highest_possible_value(self) -> int:
         return self.num_of_rows + 1
 
-    def _mark_basic_illegal_nonblocking_values(self):
+    def _mark_basic_illegal_nonblocking_values(self, hint_index: int):
         pass
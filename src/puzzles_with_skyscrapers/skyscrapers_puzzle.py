@@ -1,5 +1,10 @@
+import random
+from typing import List, Optional
+
 from src.components.unsolvable_error import UnsolvableError
 from src.puzzles_with_skyscrapers.components.abstract_puzzle_with_skyscrapers import AbstractPuzzleWithSkyscrapers
+from src.puzzles_with_skyscrapers.components.line_permutation_table import MAX_LINE_LENGTH, count_visible, \
+    get_line_permutation_table
 
 
 class SkyscrapersPuzzle(AbstractPuzzleWithSkyscrapers):
@@ -8,8 +13,14 @@ class SkyscrapersPuzzle(AbstractPuzzleWithSkyscrapers):
         return self._are_hints_across_possibly_solvable()
 
     def _mark_basic_conclusions(self):
-        self._mark_basic_illegal_blocking_values()
-        self._mark_basic_illegal_nonblocking_values()
+        for i in range(len(self.hints)):
+            self._mark_basic_illegal_blocking_values(i)
+        for i in range(len(self.hints)):
+            self._mark_basic_illegal_nonblocking_values(i)
+
+    def _mark_hint_basic_conclusions(self, hint_index: int):
+        self._mark_basic_illegal_blocking_values(hint_index)
+        self._mark_basic_illegal_nonblocking_values(hint_index)
 
     def _mark_puzzle_specific_seen_and_unseen(self, hint_index: int):
         if self.hints[hint_index] is None:
@@ -31,8 +42,14 @@ class SkyscrapersPuzzle(AbstractPuzzleWithSkyscrapers):
         if self._should_ensure_seen_status(hint_index, distance_from_hint, False):
             self._mark_unblockable_values_illegal(hint_index, distance_from_hint)
 
-    def _mark_puzzle_specific_rules(self):
-        pass
+    def _mark_hint_specific_rules(self, hint_index: int):
+        self._mark_line_permutations_illegals(hint_index)
+
+    def _are_hinted_lines_covered_by_tables(self) -> bool:
+        return self.num_of_rows <= MAX_LINE_LENGTH
+
+    def _get_hint_of_line(self, values: List[int], rng: random.Random) -> Optional[int]:
+        return count_visible(values)
 
     def _are_hints_across_possibly_solvable(self) -> bool:
         hints_half_index = int(len(self.hints) / 2)
@@ -43,69 +60,82 @@ class SkyscrapersPuzzle(AbstractPuzzleWithSkyscrapers):
                 return False
         return True
 
-    def _mark_basic_illegal_blocking_values(self):
-        for i in range(len(self.hints)):
-            if self.hints[i] is not None:
-                cell_indices_possibly_seen_from_hint = [
-                    d for d in range(self.num_of_rows)
-                    if self._get_cell_with_distance_from_hint(i, d).get_seen_from_side(
-                        self._get_hint_side(i)) is not False
-                ]
-                for first_distance_where_legal, illegal_value in \
-                        zip(range(self.hints[i] - 1, -1, -1), range(self._get_highest_possible_value(), -1, -1)):
-                    for j in range(cell_indices_possibly_seen_from_hint[first_distance_where_legal]):
-                        self._get_cell_with_distance_from_hint(i, j).add_illegal_value(illegal_value)
-
-    def _mark_basic_illegal_nonblocking_values(self):
+    def _mark_basic_illegal_blocking_values(self, hint_index: int):
+        if self.hints[hint_index] is not None:
+            line = self._hint_lines[hint_index]
+            side = self._get_hint_side(hint_index)
+            cell_indices_possibly_seen_from_hint = [
+                d for d, cell in enumerate(line) if cell.get_seen_from_side(side) is not False]
+            if len(cell_indices_possibly_seen_from_hint) < self.hints[hint_index]:
+                raise UnsolvableError("Too many cells hidden from hint.")
+            for first_distance_where_legal, illegal_value in \
+                    zip(range(self.hints[hint_index] - 1, -1, -1), range(self._get_highest_possible_value(), -1, -1)):
+                for j in range(cell_indices_possibly_seen_from_hint[first_distance_where_legal]):
+                    line[j].add_illegal_value(illegal_value)
+
+    def _mark_basic_illegal_nonblocking_values(self, hint_index: int):
         # Only relevant if there is a definitive tallest building height.
-        for i in range(len(self.hints)):
-            if self.hints[i] == 2:
-                cells_that_could_be_highest = [d for d in range(self.num_of_rows)
-                                               if self._get_highest_possible_value() in
-                                               self._get_cell_with_distance_from_hint(i, d).get_possible_values()]
-                if len(cells_that_could_be_highest) == 0:
-                    raise UnsolvableError("No cell in a row/column could be the highest.")
-                first_cell_may_be_highest = min(cells_that_could_be_highest)
-                for j in range(1, first_cell_may_be_highest - self._get_num_of_empty_cells()):
-                    self._get_cell_with_distance_from_hint(i, 0).add_illegal_value(j)
+        if self.hints[hint_index] == 2:
+            line = self._hint_lines[hint_index]
+            cells_that_could_be_highest = [d for d, cell in enumerate(line)
+                                           if cell.is_value_possible(self._get_highest_possible_value())]
+            if len(cells_that_could_be_highest) == 0:
+                raise UnsolvableError("No cell in a row/column could be the highest.")
+            first_cell_may_be_highest = min(cells_that_could_be_highest)
+            for j in range(1, first_cell_may_be_highest - self._get_num_of_empty_cells()):
+                line[0].add_illegal_value(j)
+
+    def _mark_line_permutations_illegals(self, hint_index: int):
+        # Both hints of a line are always dirty together, so the line is handled from its top or right hint only.
+        if hint_index >= self.num_of_rows * 2 or self.num_of_rows > MAX_LINE_LENGTH:
+            return
+        back_hint_index = hint_index + self.num_of_rows * 2
+        if self.hints[hint_index] is None and self.hints[back_hint_index] is None:
+            return
+        table = get_line_permutation_table(self.num_of_rows, self._get_highest_possible_value(),
+                                           self._get_num_of_empty_cells(),
+                                           self.hints[hint_index], self.hints[back_hint_index])
+        cells = self._hint_lines[hint_index]
+        possible_values_masks = table.get_possible_values_masks([cell.get_possible_values_mask() for cell in cells])
+        if possible_values_masks is None:
+            raise UnsolvableError("No filling of a row/column agrees with its hints.")
+        for cell, possible_values_mask in zip(cells, possible_values_masks):
+            for value in cell.get_possible_values():
+                if not possible_values_mask >> value & 1:
+                    cell.add_illegal_value(value)
 
     def _count_cells_with_seen_status(self, hint_index: int, seen_status: bool) -> int:
-        return len(
-            [self._get_cell_with_distance_from_hint(hint_index, i)
-             for i in range(self.num_of_rows)
-             if self._get_cell_with_distance_from_hint(hint_index, i).get_seen_from_side(
-                self._get_hint_side(hint_index)) is seen_status])
+        side = self._get_hint_side(hint_index)
+        return len([cell for cell in self._hint_lines[hint_index] if cell.get_seen_from_side(side) is seen_status])
 
     def _set_unmarked_cells_seen_status(self, hint_index: int, seen_status: bool):
-        for i in range(self.num_of_rows):
-            if self._get_cell_with_distance_from_hint(hint_index, i).get_seen_from_side(
-                    self._get_hint_side(hint_index)) is None:
-                self._get_cell_with_distance_from_hint(hint_index, i).set_seen_from_side(
-                    self._get_hint_side(hint_index), seen_status)
+        side = self._get_hint_side(hint_index)
+        for cell in self._hint_lines[hint_index]:
+            if cell.get_seen_from_side(side) is None:
+                cell.set_seen_from_side(side, seen_status)
 
     def _mark_blocking_values_illegal(self, hint_index: int, distance_from_hint: int):
-        largest_possible_for_seen_cells = [max(
-            self._get_cell_with_distance_from_hint(hint_index, j).get_possible_values())
-            for j in range(distance_from_hint + 1, self.num_of_rows)
-            if self._get_cell_with_distance_from_hint(hint_index, j).get_seen_from_side(
-                self._get_hint_side(hint_index)) is True]
+        line = self._hint_lines[hint_index]
+        side = self._get_hint_side(hint_index)
+        largest_possible_for_seen_cells = [
+            cell.get_max_possible_value() for cell in line[distance_from_hint + 1:]
+            if cell.get_seen_from_side(side) is True]
         if len(largest_possible_for_seen_cells) > 0:
             smallest_to_not_block = min(largest_possible_for_seen_cells)
             for k in range(smallest_to_not_block, self._get_highest_possible_value() + 1):
-                self._get_cell_with_distance_from_hint(hint_index, distance_from_hint).add_illegal_value(k)
+                line[distance_from_hint].add_illegal_value(k)
 
     def _mark_unblockable_values_illegal(self, hint_index: int, distance_from_hint: int):
         if distance_from_hint == 0:
-            self._get_cell_with_distance_from_hint(hint_index, distance_from_hint).set_value(0)
+            self._hint_lines[hint_index][distance_from_hint].set_value(0)
         else:
-            largest_possible_blocking = max([
-                max(self._get_cell_with_distance_from_hint(hint_index, j).get_possible_values())
-                for j in range(distance_from_hint)])
+            largest_possible_blocking = max(
+                cell.get_max_possible_value() for cell in self._hint_lines[hint_index][:distance_from_hint])
             for k in range(largest_possible_blocking, self._get_highest_possible_value() + 1):
-                self._get_cell_with_distance_from_hint(hint_index, distance_from_hint).add_illegal_value(k)
+                self._hint_lines[hint_index][distance_from_hint].add_illegal_value(k)
 
     def _mark_blocked_values_illegal(self, hint_index: int, distance_from_hint: int):
-        cell = self._get_cell_with_distance_from_hint(hint_index, distance_from_hint)
+        cell = self._hint_lines[hint_index][distance_from_hint]
 
         if distance_from_hint == 0:
             if cell.can_be_empty:
@@ -117,10 +147,8 @@ class SkyscrapersPuzzle(AbstractPuzzleWithSkyscrapers):
             cell.add_illegal_value(k)
 
     def _get_lower_bound_in_front_of_cell(self, hint_index: int, cell_distance_from_hint: int) -> int:
-        return max([
-            min(self._get_cell_with_distance_from_hint(hint_index, j).get_possible_values())
-            for j in range(cell_distance_from_hint)])
+        return max(cell.get_min_possible_value() for cell in self._hint_lines[hint_index][:cell_distance_from_hint])
 
     def _should_ensure_seen_status(self, hint_index: int, distance_from_hint: int, seen_status: bool) -> bool:
-        cell = self._get_cell_with_distance_from_hint(hint_index, distance_from_hint)
+        cell = self._hint_lines[hint_index][distance_from_hint]
         return cell.get_seen_from_side(self._get_hint_side(hint_index)) is seen_status
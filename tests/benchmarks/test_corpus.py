@@ -0,0 +1,79 @@
+import random
+import unittest
+
+from src.benchmarks.corpus import BUCKETS, CORPUS_VERSION, HARD_SIZES, SIZES, build_pachamama_corpus, \
+    build_skyscrapers_corpus, load_pachamama_corpus, load_skyscrapers_corpus
+from src.pachamama_puzzle.pachamama_factory import create_pachamama_puzzle
+from src.pachamama_puzzle.pachamama_solver import PachamamaSolver
+from src.puzzles_with_skyscrapers.batch_solver import PUZZLE_VARIANTS
+
+
+class TestCorpus(unittest.TestCase):
+
+    def test_load_skyscrapers_corpus(self):
+        for version in range(1, CORPUS_VERSION + 1):
+            with self.subTest(version=version):
+                self._check_skyscrapers_corpus(load_skyscrapers_corpus(version), version)
+
+    def test_load_hard_skyscrapers_corpus(self):
+        entries = [entry for entry in load_skyscrapers_corpus() if entry.bucket == "hard"]
+        self.assertIn("skyscrapers", set(entry.variant for entry in entries))
+        self.assertEqual(set(HARD_SIZES), set(entry.size for entry in entries))
+        for entry in entries:
+            # Much sparser than the guessing puzzles, which keep all the givens they need to stay quick to check.
+            self.assertLess(sum(value is not None for row in entry.puzzle for value in row), entry.size * 2)
+        entry = next(entry for entry in entries if entry.variant == "skyscrapers")
+        puzzle = PUZZLE_VARIANTS[entry.variant](entry.puzzle, entry.hints)
+        self.assertEqual([list(row) for row in entry.solution], puzzle.solve())
+        self.assertGreater(puzzle.num_of_guesses, 0)
+
+    def _check_skyscrapers_corpus(self, entries, version: int):
+        self.assertEqual(set(PUZZLE_VARIANTS), set(entry.variant for entry in entries))
+        self.assertEqual(set(SIZES), set(entry.size for entry in entries))
+        self.assertEqual(set(BUCKETS) - ({"hard"} if version == 1 else set()), set(entry.bucket for entry in entries))
+        for entry in entries:
+            self.assertEqual(entry.size, len(entry.puzzle))
+            self.assertEqual(4 * entry.size, len(entry.hints))
+            solution_hints = PUZZLE_VARIANTS[entry.variant](entry.solution, entry.hints) \
+                .get_hints_of_solution(random.Random(0))
+            if entry.variant != "haido":
+                self.assertTrue(all(hint is None or hint == solution_hints[i] for i, hint in enumerate(entry.hints)))
+        for entry in entries:
+            if entry.size <= 5:
+                puzzle = PUZZLE_VARIANTS[entry.variant](entry.puzzle, entry.hints)
+                self.assertEqual([list(row) for row in entry.solution], puzzle.solve())
+                if entry.bucket == "propagation":
+                    self.assertEqual(0, puzzle.num_of_guesses)
+                # Version 1 was built while no variant probed the values before the search, which now solves some of
+                # its guessing puzzles.
+                if entry.bucket == "guessing" and puzzle._are_hinted_lines_covered_by_tables():
+                    self.assertGreater(puzzle.num_of_guesses, 0)
+
+    def test_load_pachamama_corpus(self):
+        entries = load_pachamama_corpus()
+        self.assertEqual(build_pachamama_corpus(), entries)
+        self.assertEqual(18, len(entries))
+        self.assertEqual(load_pachamama_corpus(1), entries[:16])
+        for entry in entries:
+            if entry.solution is None:
+                self.assertEqual(entry.is_legal, create_pachamama_puzzle(entry.grid).is_legal())
+            else:
+                solver = PachamamaSolver(create_pachamama_puzzle(entry.grid))
+                self.assertEqual(1, solver.count_solutions(2, timeout=10))
+                self.assertGreater(solver.num_of_guesses, 0)
+                self.assertEqual(create_pachamama_puzzle(entry.solution), solver.solve())
+
+    def test_build_skyscrapers_corpus(self):
+        entries = list(build_skyscrapers_corpus(seed=1, variants=["skyscrapers"], sizes=[4], puzzles_per_bucket=1))
+        self.assertLessEqual(len(entries), len(BUCKETS))
+        self.assertEqual("easy", entries[0].bucket)
+        self.assertEqual(16, sum(hint is not None for hint in entries[0].hints))
+        for entry in entries:
+            puzzle = PUZZLE_VARIANTS["skyscrapers"](entry.puzzle, entry.hints)
+            self.assertEqual(1, puzzle.count_solutions(2))
+            if entry.bucket != "easy":
+                self.assertEqual(entry.bucket == "guessing", puzzle.num_of_guesses > 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import io
+import json
+import unittest
+
+from src.benchmarks.corpus import CORPUS_VERSION, load_pachamama_corpus, load_skyscrapers_corpus
+from src.benchmarks.runner import compare_reports, get_percentile, main, run_pachamama_benchmark, \
+    run_skyscrapers_benchmark, summarize_times
+
+
+class TestRunner(unittest.TestCase):
+
+    def test_get_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(50, get_percentile(values, 50))
+        self.assertEqual(95, get_percentile(values, 95))
+        self.assertEqual(100, get_percentile(values, 100))
+        self.assertEqual(1, get_percentile(values, 0))
+        self.assertEqual(7, get_percentile([7], 99))
+        with self.assertRaises(ValueError):
+            get_percentile([], 50)
+
+    def test_summarize_times(self):
+        summary = summarize_times([0.5, 0.1, 0.4, 0.2, 0.3])
+        self.assertAlmostEqual(1.5, summary["wall_seconds"])
+        self.assertAlmostEqual(0.3, summary["p50_seconds"])
+        self.assertAlmostEqual(0.5, summary["p95_seconds"])
+        self.assertAlmostEqual(0.5, summary["p99_seconds"])
+        self.assertAlmostEqual(5 / 1.5, summary["puzzles_per_second"])
+
+    def test_run_skyscrapers_benchmark(self):
+        entries = [entry for entry in load_skyscrapers_corpus() if entry.size == 4 and entry.variant == "gaps"]
+        records = run_skyscrapers_benchmark(entries, repeat=2)
+        self.assertEqual(set(entry.bucket for entry in entries), set(record["bucket"] for record in records))
+        for record in records:
+            self.assertEqual(0, record["num_of_failures"])
+            self.assertLessEqual(record["p50_seconds"], record["p95_seconds"])
+            self.assertLessEqual(record["p95_seconds"], record["p99_seconds"])
+            self.assertGreater(record["peak_memory_bytes"], 0)
+
+        wrong_entry = entries[0]._replace(solution=tuple(tuple(reversed(row)) for row in entries[0].solution))
+        self.assertEqual(1, run_skyscrapers_benchmark([wrong_entry], measure_memory=False)[0]["num_of_failures"])
+
+    def test_run_pachamama_benchmark(self):
+        records = run_pachamama_benchmark(load_pachamama_corpus(), measure_memory=False)
+        self.assertEqual({"legal", "illegal", "solving"}, set(record["bucket"] for record in records))
+        self.assertEqual([0, 0, 0], [record["num_of_failures"] for record in records])
+        self.assertNotIn("peak_memory_bytes", records[0])
+        solving_record = next(record for record in records if record["bucket"] == "solving")
+        self.assertEqual(10, solving_record["size"])
+        self.assertGreater(solving_record["mean_num_of_guesses"], 0)
+
+        entry = next(entry for entry in load_pachamama_corpus() if entry.solution is not None)
+        wrong_entry = entry._replace(solution=tuple(reversed(entry.solution)))
+        self.assertEqual(1, run_pachamama_benchmark([wrong_entry], measure_memory=False)[0]["num_of_failures"])
+
+    def test_compare_reports(self):
+        group = {"variant": "skyscrapers", "size": 4, "bucket": "easy", "p50_seconds": 1.0, "mean_num_of_guesses": 0,
+                 "num_of_failures": 0}
+        baseline = {"corpus_version": CORPUS_VERSION, "groups": [group]}
+        self.assertEqual([], compare_reports(baseline, {"corpus_version": CORPUS_VERSION,
+                                                        "groups": [dict(group, p50_seconds=1.1)]}))
+        self.assertEqual(1, len(compare_reports(baseline, {"corpus_version": CORPUS_VERSION,
+                                                           "groups": [dict(group, p50_seconds=1.5)]})))
+        self.assertEqual(2, len(compare_reports(baseline, {"corpus_version": CORPUS_VERSION,
+                                                           "groups": [dict(group, mean_num_of_guesses=1,
+                                                                           num_of_failures=1)]})))
+        self.assertEqual([], compare_reports(baseline, {"corpus_version": CORPUS_VERSION,
+                                                        "groups": [dict(group, size=5, p50_seconds=9)]}))
+        with self.assertRaises(ValueError):
+            compare_reports(baseline, {"corpus_version": CORPUS_VERSION + 1, "groups": []})
+
+    def test_main(self):
+        stdout = io.StringIO()
+        self.assertEqual(0, main(["--variant", "skyscrapers", "--size", "4", "--bucket", "easy", "--no-memory"],
+                                 stdout))
+        report = json.loads(stdout.getvalue())
+        self.assertEqual(CORPUS_VERSION, report["corpus_version"])
+        self.assertEqual([("skyscrapers", 4, "easy")],
+                         [(group["variant"], group["size"], group["bucket"]) for group in report["groups"]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+
+from src.components.exact_cover import ExactCover
+
+# The example of Knuth's Dancing Links paper, whose single exact cover is made of options A, D and E.
+OPTIONS = {
+    "A": (3, 5, 6),
+    "B": (1, 4, 7),
+    "C": (2, 3, 6),
+    "D": (1, 4),
+    "E": (2, 7),
+    "F": (4, 5, 7),
+}
+
+
+def _find_covers(exact_cover: ExactCover, chosen: list, covers: list):
+    if exact_cover.is_covered():
+        covers.append(sorted(chosen))
+        return
+    item = min(exact_cover.get_uncovered_primary_items(), key=lambda i: len(exact_cover.get_options_of_item(i)))
+    for option in sorted(exact_cover.get_options_of_item(item)):
+        removed = exact_cover.choose(option)
+        _find_covers(exact_cover, chosen + [option], covers)
+        exact_cover.unchoose(option, removed)
+
+
+class TestExactCover(unittest.TestCase):
+
+    def test_find_covers(self):
+        exact_cover = ExactCover(OPTIONS)
+        covers = []
+        _find_covers(exact_cover, [], covers)
+        self.assertEqual([["A", "D", "E"]], covers)
+        self.assertFalse(exact_cover.is_covered())
+        self.assertEqual([1, 2, 3, 4, 5, 6, 7], sorted(exact_cover.get_uncovered_primary_items()))
+
+    def test_choose_and_unchoose(self):
+        exact_cover = ExactCover(OPTIONS)
+        removed = exact_cover.choose("D")
+        self.assertEqual([2, 3, 5, 6, 7], sorted(exact_cover.get_uncovered_primary_items()))
+        self.assertEqual({"E"}, exact_cover.get_options_of_item(7))
+        self.assertEqual({"A"}, exact_cover.get_options_of_item(5))
+        exact_cover.unchoose("D", removed)
+        self.assertEqual({"B", "E", "F"}, exact_cover.get_options_of_item(7))
+        self.assertEqual({"B", "D"}, exact_cover.get_options_of_item(1))
+
+    def test_secondary_items(self):
+        # Two cells, each with one of three values, where every value appears at most once.
+        options = {(cell, value): (("cell", cell), ("value", value)) for cell in range(2) for value in range(3)}
+        exact_cover = ExactCover(options, [("value", value) for value in range(3)])
+        covers = []
+        _find_covers(exact_cover, [], covers)
+        self.assertEqual(6, len(covers))
+        self.assertEqual([("cell", 0), ("cell", 1)], sorted(exact_cover.get_uncovered_primary_items()))
+
+
+if __name__ == '__main__':
+    unittest.main()
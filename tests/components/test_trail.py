@@ -0,0 +1,72 @@
+import unittest
+
+from src.components.trail import Trail
+
+
+class _Box:
+
+    def __init__(self, trail: Trail):
+        self.trail = trail
+        self.value = 0
+
+    def set(self, value: int):
+        self.trail.record(self, self.value)
+        self.value = value
+
+    def restore_state(self, state: int):
+        self.value = state
+
+
+class TestTrail(unittest.TestCase):
+
+    def test_rollback(self):
+        trail = Trail()
+        box = _Box(trail)
+        box.set(1)
+        checkpoint = trail.get_checkpoint()
+        box.set(2)
+        box.set(3)
+        self.assertEqual(3, trail.get_checkpoint())
+        trail.rollback(checkpoint)
+        self.assertEqual(1, box.value)
+        self.assertEqual(checkpoint, trail.get_checkpoint())
+        trail.rollback(0)
+        self.assertEqual(0, box.value)
+
+    def test_get_recorded_since(self):
+        trail = Trail()
+        first_box = _Box(trail)
+        second_box = _Box(trail)
+        first_box.set(1)
+        checkpoint = trail.get_checkpoint()
+        second_box.set(1)
+        first_box.set(2)
+        self.assertEqual([second_box, first_box], list(trail.get_recorded_since(checkpoint)))
+        self.assertEqual([], list(trail.get_recorded_since(trail.get_checkpoint())))
+
+    def test_get_entries_since(self):
+        trail = Trail()
+        box = _Box(trail)
+        box.set(1)
+        checkpoint = trail.get_checkpoint()
+        box.set(2)
+        box.set(3)
+        self.assertEqual([(box, 1), (box, 2)], list(trail.get_entries_since(checkpoint)))
+
+    def test_rollback_to_current_checkpoint(self):
+        trail = Trail()
+        box = _Box(trail)
+        box.set(5)
+        trail.rollback(trail.get_checkpoint())
+        self.assertEqual(5, box.value)
+
+    def test_rollback_to_illegal_checkpoint(self):
+        trail = Trail()
+        with self.assertRaises(ValueError):
+            trail.rollback(1)
+        with self.assertRaises(ValueError):
+            trail.rollback(-1)
+
+
+if __name__ == '__main__':
+    unittest.main()
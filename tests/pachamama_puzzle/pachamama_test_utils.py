@@ -1,5 +1,4 @@
-from collections import Set
-from typing import Tuple
+from typing import Set, Tuple
 
 from src.pachamama_puzzle.pachamama_cell import PachamamaCell
 from src.pachamama_puzzle.pachamama_filled_cell import PachamamaFilledCell
@@ -0,0 +1,77 @@
+import unittest
+
+from src.pachamama_puzzle import pachamama_factory
+from src.pachamama_puzzle.pachamama_batch_validator import NUMPY_AVAILABLE, encode_grids, validate_grids
+from src.pachamama_puzzle.pachamama_shape import PachamamaShape
+
+LEGAL_GRID = (('5S', '4S', '1S', '2S'),
+              ('3S', '2T', '3T', '4T'),
+              ('1T', '5T', '1S', '2S'))
+ILLEGAL_GRIDS = (
+    # A cell without a number.
+    (('1T', '0C'),),
+    # The same numbers next to each other on a diagonal.
+    (('1T', '2T'), ('3T', '1C')),
+    # Regions of the same shape touching at a corner.
+    (('1T', '2C'), ('3C', '4T')),
+    # A region with a repeated number.
+    (('1T', '2T', '3T', '1T'),),
+    # A region missing the number 4.
+    (('1T', '2T', '3T', '5T'),),
+    # A region of 6 cells.
+    (('1T', '2T', '3T'), ('4T', '5T', '1T')),
+)
+
+
+@unittest.skipIf(not NUMPY_AVAILABLE, "numpy is not installed")
+class TestPachamamaBatchValidator(unittest.TestCase):
+
+    def test_encode_grids(self):
+        numbers, shapes = encode_grids([(('1C', '0X'),), (('5S', '2T'),)])
+        self.assertEqual([[[1, 0]], [[5, 2]]], numbers.tolist())
+        self.assertEqual([[[1, 0]], [[3, 2]]], shapes.tolist())
+
+        with self.assertRaises(ValueError):
+            encode_grids([(('1C',),), (('1C', '2T'),)])
+        with self.assertRaises(ValueError):
+            encode_grids([(('6C',),)])
+
+    def test_validate_grids(self):
+        for grid in ILLEGAL_GRIDS:
+            self.assertEqual([False], validate_grids(*encode_grids([grid])).tolist())
+        self.assertEqual([True], validate_grids(*encode_grids([LEGAL_GRID])).tolist())
+
+        # The same verdicts as is_sol_legal, with the givens of the puzzle.
+        puzzle = (('0X', '0T'), ('3X', '0X'))
+        puzzle_numbers, puzzle_shapes = encode_grids([puzzle])
+        grids = [(('1T', '2T'), ('3T', '4T')), (('1T', '2T'), ('3T', '5T')), (('2T', '1T'), ('3T', '4T')),
+                 (('1C', '2T'), ('3C', '1S'))]
+        expected = [pachamama_factory.create_pachamama_puzzle(puzzle).is_sol_legal(
+            pachamama_factory.create_pachamama_puzzle(grid)) for grid in grids]
+        self.assertEqual([True, False, True, False], expected)
+        self.assertEqual(expected, validate_grids(*encode_grids(grids), puzzle_numbers[0], puzzle_shapes[0]).tolist())
+        # One puzzle for every grid.
+        puzzles_numbers, puzzles_shapes = encode_grids([puzzle, puzzle, (('0X', '0X'), ('0X', '0S')), puzzle])
+        self.assertEqual([True, False, False, False],
+                         validate_grids(*encode_grids(grids), puzzles_numbers, puzzles_shapes).tolist())
+
+        with self.assertRaises(ValueError):
+            validate_grids(*(plane[0] for plane in encode_grids([LEGAL_GRID])))
+        with self.assertRaises(ValueError):
+            validate_grids(*encode_grids(grids), puzzles_numbers[:2], puzzles_shapes[:2])
+
+    def test_validate_grids_out_of_range(self):
+        numbers, shapes = encode_grids([LEGAL_GRID] * 3)
+        shapes[1, 0, 0] = len(PachamamaShape) + 1
+        numbers[2, 0, 0] = 7
+        self.assertEqual([True, False, False], validate_grids(numbers, shapes).tolist())
+
+        # Like is_sol_legal, a puzzle of another size has no legal solutions.
+        puzzle_numbers, puzzle_shapes = encode_grids([(('0X',) * 3,) * 3])
+        self.assertEqual([False] * 3, validate_grids(numbers, shapes, puzzle_numbers[0], puzzle_shapes[0]).tolist())
+        self.assertFalse(pachamama_factory.create_pachamama_puzzle((('0X',) * 3,) * 3).is_sol_legal(
+            pachamama_factory.create_pachamama_puzzle(LEGAL_GRID)))
+
+
+if __name__ == '__main__':
+    unittest.main()
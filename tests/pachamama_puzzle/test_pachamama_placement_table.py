@@ -0,0 +1,60 @@
+import unittest
+
+from src.pachamama_puzzle import pachamama_factory
+from src.pachamama_puzzle.pachamama_placement_table import PachamamaPlacementTable, get_placement_table
+
+
+class TestPachamamaPlacementTable(unittest.TestCase):
+
+    def test_placements(self):
+        # The 1 monomino, 2 dominoes, 6 trominoes, 19 tetrominoes and 63 pentominoes, in all their orientations.
+        table = PachamamaPlacementTable(5, 5)
+        self.assertEqual([1, 2, 6, 19, 63],
+                         [sum(1 for placement in table.placements if len(placement.cells) == size
+                              and min(row for row, _ in placement.cells) == min(col for _, col in placement.cells) == 0)
+                          for size in range(1, 6)])
+
+        table = get_placement_table(2, 2)
+        self.assertIs(table, get_placement_table(2, 2))
+        # The 4 monominoes, 4 dominoes, 4 trominoes and the square.
+        self.assertEqual(13, len(table.placements))
+        self.assertEqual(7, len(table.get_placements_of_cell(0, 0)))
+        domino = next(placement for placement in table.placements if placement.cells == ((0, 0), (0, 1)))
+        self.assertEqual(((1, 0), (1, 1)), domino.border)
+        self.assertEqual(0b0011, domino.cells_mask)
+        self.assertEqual(0b1100, domino.border_mask)
+
+        with self.assertRaises(ValueError):
+            PachamamaPlacementTable(0, 2)
+
+    def test_get_consistent_placements(self):
+        table = get_placement_table(2, 2)
+        self.assertEqual([((0, 0), (0, 1))],
+                         [placement.cells for placement in table.get_consistent_placements(
+                             0, 0, required_mask=table.get_cell_mask(0, 1), max_size=2)])
+        # A placement may cover the cell that must not be next to it.
+        self.assertEqual([((0, 0),), ((0, 0), (1, 0), (1, 1))],
+                         [placement.cells for placement in table.get_consistent_placements(
+                             0, 0, forbidden_mask=table.get_cell_mask(0, 1),
+                             forbidden_border_mask=table.get_cell_mask(1, 1))])
+        self.assertEqual([], table.get_consistent_placements(0, 0, min_size=5))
+
+    def test_get_candidate_regions(self):
+        # A region with a 2 has at least 2 cells, but the only cell next to it has another shape.
+        puzzle = pachamama_factory.create_pachamama_puzzle((('2C', '0T', '0X'),))
+        self.assertEqual([], get_placement_table(1, 3).get_candidate_regions(puzzle, 0, 0))
+        # The region cannot stop next to another circle, so it takes all of the row.
+        puzzle = pachamama_factory.create_pachamama_puzzle((('2C', '0X', '0C'),))
+        candidates = get_placement_table(1, 3).get_candidate_regions(puzzle, 0, 0)
+        self.assertEqual([((0, 0), (0, 1), (0, 2))], [placement.cells for placement in candidates])
+        # Two cells with the same number are never in the same region.
+        puzzle = pachamama_factory.create_pachamama_puzzle((('1X', '0X', '1X'),))
+        candidates = get_placement_table(1, 3).get_candidate_regions(puzzle, 0, 0)
+        self.assertEqual([((0, 0),), ((0, 0), (0, 1))], [placement.cells for placement in candidates])
+
+        with self.assertRaises(ValueError):
+            get_placement_table(2, 2).get_candidate_regions(puzzle, 0, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+from src.pachamama_puzzle.pachamama_region_labels import PachamamaRegionUnionFind, label_regions
+from src.pachamama_puzzle.pachamama_shape import PachamamaShape
+import tests.pachamama_puzzle.pachamama_test_utils as pachamama_test_utils
+
+C = PachamamaShape.CIRCLE
+T = PachamamaShape.TRIANGLE
+
+
+class TestPachamamaRegionLabels(unittest.TestCase):
+
+    def test_label_regions(self):
+        # The circles meet only at the bottom row, after both arms of the U were given labels of their own.
+        labels = label_regions(((C, T, C),
+                                (C, T, C),
+                                (C, C, C)))
+        self.assertEqual([0, 1, 0, 0, 1, 0, 0, 0, 0], labels.labels)
+        self.assertEqual(2, labels.get_num_of_regions())
+        self.assertEqual([7, 2], labels.sizes)
+        self.assertEqual([C, T], labels.shapes)
+        self.assertEqual([(0, 0, 2, 2), (0, 1, 1, 1)], labels.bounding_boxes)
+        self.assertEqual(1, labels.get_label(1, 1))
+
+        # Cells that touch only at a corner are in different regions.
+        labels = label_regions(((C, T),
+                                (T, C)))
+        self.assertEqual([0, 1, 2, 3], labels.labels)
+        self.assertEqual([1] * 4, labels.sizes)
+
+    def test_region_union_find(self):
+        union_find = PachamamaRegionUnionFind()
+        for number in (1, 2, 1):
+            union_find.add_cell(number)
+        self.assertEqual(0, union_find.union(1, 0))
+        self.assertEqual((2, 0b110, False), (union_find.sizes[0], union_find.numbers_masks[0],
+                                              union_find.has_repeated_number[0]))
+        self.assertEqual(0, union_find.union(1, 2))
+        self.assertEqual((3, True), (union_find.sizes[0], union_find.has_repeated_number[0]))
+        self.assertEqual(0, union_find.union(2, 0))
+        self.assertEqual([True, False, False], [union_find.is_root(index) for index in range(3)])
+
+    def test_label_regions_of_solution(self):
+        solution = pachamama_test_utils.get_complex_legal_solution()
+        labels = label_regions([[cell.shape for cell in row] for row in solution.puzzle])
+        self.assertEqual(9, labels.get_num_of_regions())
+        self.assertEqual([5, 5, 5, 2, 5, 5, 1, 3, 5], labels.sizes)
+        self.assertEqual((0, 0, 1, 2), labels.bounding_boxes[labels.get_label(0, 0)])
+        self.assertEqual((3, 0, 5, 2), labels.bounding_boxes[labels.get_label(3, 0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,11 @@
 import unittest
 
+from src.pachamama_puzzle import pachamama_factory
 from src.pachamama_puzzle.pachamama_cell import PachamamaCell
 from src.pachamama_puzzle.pachamama_filled_cell import PachamamaFilledCell
 from src.pachamama_puzzle.pachamama_shape import PachamamaShape
 from src.pachamama_puzzle.pachamama_solved_puzzle import PachamamaSolvedPuzzle
+from src.pachamama_puzzle.pachamama_violation import PachamamaRule, PachamamaViolation
 import tests.pachamama_puzzle.pachamama_test_utils as pachamama_test_utils
 
 
@@ -18,6 +20,22 @@ class TestPachamamaSolvedPuzzle(unittest.TestCase):
         self._test_is_legal_numbers_touching()
         self._test_is_legal_legit()
 
+    def test_get_first_violation(self):
+        self.assertIsNone(pachamama_test_utils.get_complex_legal_solution().get_first_violation())
+        self.assertEqual(PachamamaViolation(PachamamaRule.NOT_FILLED, 0, 1), PachamamaSolvedPuzzle(
+            ((PachamamaFilledCell(1, PachamamaShape.TRIANGLE), PachamamaCell(2, None)),)).get_first_violation())
+        self.assertEqual(PachamamaViolation(PachamamaRule.NUMBERS_TOUCHING, 1, 1),
+                         self._create_solved_puzzle((('1T', '2T'), ('3T', '1C'))).get_first_violation())
+        self.assertEqual(PachamamaViolation(PachamamaRule.REGIONS_TOUCHING, 1, 0),
+                         self._create_solved_puzzle((('1T', '2C'), ('3C', '4T'))).get_first_violation())
+        self.assertEqual(PachamamaViolation(PachamamaRule.REGION_TOO_LARGE, 1, 2),
+                         self._create_solved_puzzle((('1T', '2T', '3T'), ('4T', '5T', '1T'))).get_first_violation())
+        # The repeated 1 is found once the regions of both are joined.
+        self.assertEqual(PachamamaViolation(PachamamaRule.REGION_NUMBERS, 0, 3),
+                         self._create_solved_puzzle((('1T', '2T', '3T', '1T'),)).get_first_violation())
+        self.assertEqual(PachamamaViolation(PachamamaRule.REGION_NUMBERS, 0, 0),
+                         self._create_solved_puzzle((('1T', '2T', '3T', '5T'),)).get_first_violation())
+
     def test_get_regions(self):
         s = pachamama_test_utils.get_complex_legal_solution()
 
@@ -35,6 +53,12 @@ class TestPachamamaSolvedPuzzle(unittest.TestCase):
 
         self.assertEqual(expected_regions, s._get_regions())
 
+    @staticmethod
+    def _create_solved_puzzle(simple_representation) -> PachamamaSolvedPuzzle:
+        solved_puzzle = pachamama_factory.create_pachamama_puzzle(simple_representation)
+        assert isinstance(solved_puzzle, PachamamaSolvedPuzzle)
+        return solved_puzzle
+
     def _test_is_legal_wrong_cell_type(self):
         s = PachamamaSolvedPuzzle(tuple([tuple([PachamamaCell(None, None)])]))
         self.assertFalse(s.is_legal())
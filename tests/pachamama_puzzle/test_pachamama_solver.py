@@ -0,0 +1,110 @@
+import unittest
+
+from src.pachamama_puzzle import pachamama_factory
+from src.pachamama_puzzle.pachamama_solved_puzzle import PachamamaSolvedPuzzle
+from src.pachamama_puzzle.pachamama_solver import PachamamaSolver
+from tests.pachamama_puzzle import pachamama_test_utils
+
+
+class TestPachamamaSolver(unittest.TestCase):
+
+    def test_solve_complex_puzzle(self):
+        puzzle = pachamama_test_utils.get_complex_puzzle()
+        solver = PachamamaSolver(puzzle)
+        self.assertTrue(solver.is_single_solution())
+        self.assertEqual(pachamama_test_utils.get_complex_legal_solution(), solver.solve())
+        self.assertTrue(puzzle.is_sol_legal(solver.solve()))
+
+    def test_solve_large_puzzle(self):
+        puzzle = pachamama_factory.create_pachamama_puzzle(
+            (('0X', '0T', '1X', '0X', '0C', '2X', '0X', '0S', '0X', '4X'),
+             ('0X', '0T', '3S', '0C', '0X', '0X', '0X', '0C', '2T', '0X'),
+             ('0X', '0X', '0X', '0X', '5S', '0X', '2X', '0C', '1X', '0X'),
+             ('0X', '5X', '4X', '0X', '0X', '0X', '5X', '0X', '0S', '0X'),
+             ('2S', '0T', '2C', '0X', '0X', '4C', '0X', '0X', '0X', '0X'),
+             ('0X', '0S', '0X', '0X', '0X', '0S', '0X', '3X', '0X', '0X'),
+             ('1X', '3X', '4X', '0X', '0X', '5X', '0X', '0X', '4S', '0X'),
+             ('5C', '0S', '0S', '0X', '0S', '0X', '0X', '5X', '2X', '5X'),
+             ('0X', '0C', '0X', '0X', '0X', '0X', '0X', '0S', '0X', '4X'),
+             ('0X', '0X', '0X', '0X', '0X', '5X', '0X', '5X', '0C', '0X')))
+        solution = pachamama_factory.create_pachamama_puzzle(
+            (('1C', '2T', '1C', '2C', '5C', '2S', '1S', '4S', '1T', '4T'),
+             ('3C', '4T', '3S', '4C', '3C', '4T', '3S', '5C', '2T', '3T'),
+             ('2C', '1T', '2S', '1S', '5S', '1T', '2C', '4C', '1C', '5T'),
+             ('4C', '5T', '4S', '3C', '2T', '3T', '5S', '3C', '2S', '3S'),
+             ('2S', '3T', '2C', '5C', '1C', '4C', '1S', '4T', '1S', '4C'),
+             ('4S', '5S', '1S', '3S', '2T', '3S', '2S', '3T', '5S', '3C'),
+             ('1C', '3T', '4T', '5T', '1T', '5C', '4S', '1T', '4S', '1C'),
+             ('5C', '2S', '1S', '3S', '4S', '3C', '2T', '5T', '2C', '5C'),
+             ('4C', '3C', '4T', '5S', '2C', '1C', '4C', '1S', '3S', '4S'),
+             ('2C', '1S', '2T', '1T', '3T', '5T', '2S', '5S', '2C', '1C')))
+        solver = PachamamaSolver(puzzle)
+        self.assertEqual(1, solver.count_solutions(2))
+        self.assertEqual(solution, solver.solve())
+
+    def test_solve_sparse_large_puzzle(self):
+        puzzle = pachamama_factory.create_pachamama_puzzle(
+            (('0X', '0X', '0X', '0X', '0S', '0X', '0X', '4X', '0S', '1X'),
+             ('5S', '2X', '1X', '0X', '0X', '3T', '0X', '5X', '0X', '4X'),
+             ('0X', '0X', '4X', '0X', '0X', '0X', '0X', '0X', '3S', '0X'),
+             ('4C', '0X', '0X', '0X', '0X', '0X', '0X', '5X', '0X', '2X'),
+             ('0X', '3X', '0X', '0X', '0X', '0X', '0T', '0T', '0X', '0X'),
+             ('0C', '0X', '0X', '0S', '4T', '0S', '0X', '0X', '0X', '0C'),
+             ('0X', '0S', '0X', '0S', '0C', '0X', '0X', '0X', '4C', '0X'),
+             ('0C', '0X', '1X', '0X', '0T', '0X', '0X', '0X', '0X', '0S'),
+             ('5S', '0X', '0X', '5X', '0X', '0S', '0X', '5X', '3S', '2X'),
+             ('0X', '0S', '0X', '0X', '0X', '1T', '3X', '0T', '0X', '0T')))
+        solution = pachamama_factory.create_pachamama_puzzle(
+            (('1S', '3S', '4S', '2T', '1S', '5S', '2S', '4S', '3S', '1C'),
+             ('5S', '2S', '1T', '3T', '4C', '3T', '1T', '5T', '2T', '4T'),
+             ('1C', '3C', '4T', '2S', '1C', '5C', '2S', '4S', '3S', '5S'),
+             ('4C', '2C', '1S', '3S', '4S', '3C', '1S', '5T', '1T', '2T'),
+             ('1S', '3T', '5T', '2T', '1T', '2C', '4T', '3T', '4S', '3C'),
+             ('4C', '2C', '1S', '3S', '4T', '3S', '1S', '2S', '5S', '1C'),
+             ('3C', '5S', '4S', '2S', '1C', '2C', '4T', '3T', '4C', '2C'),
+             ('1C', '2T', '1T', '3T', '4T', '3C', '1S', '2T', '1S', '5S'),
+             ('5S', '3S', '4S', '5T', '2S', '5S', '4S', '5T', '3S', '2S'),
+             ('2S', '1S', '2C', '1C', '3C', '1T', '3S', '1T', '4S', '1T')))
+        solver = PachamamaSolver(puzzle)
+        self.assertEqual(1, solver.count_solutions(2, timeout=10))
+        self.assertLess(solver.num_of_guesses, 1000)
+        self.assertEqual(solution, solver.solve())
+
+    def test_solve_puzzle_with_several_solutions(self):
+        puzzle = pachamama_factory.create_pachamama_puzzle((('0X', '0X'), ('0X', '0X')))
+        solver = PachamamaSolver(puzzle)
+        solutions = solver.solve()
+        self.assertIsInstance(solutions, tuple)
+        self.assertEqual(2, len(solutions))
+        self.assertNotEqual(solutions[0], solutions[1])
+        for solution in solutions:
+            self.assertIsInstance(solution, PachamamaSolvedPuzzle)
+            self.assertTrue(puzzle.is_sol_legal(solution))
+        self.assertFalse(solver.is_single_solution())
+        self.assertEqual(5, solver.count_solutions(5))
+
+    def test_solve_puzzle_without_solutions(self):
+        # Two cells with the same number cannot be next to each other.
+        solver = PachamamaSolver(pachamama_factory.create_pachamama_puzzle((('1X', '1X'), ('0X', '0X'))))
+        self.assertIsNone(solver.solve())
+        self.assertEqual(0, solver.count_solutions(2))
+        # A cell with a 2 is in a region of at least 2 cells, but the only cell next to it has another shape.
+        solver = PachamamaSolver(pachamama_factory.create_pachamama_puzzle((('2C', '0T', '0X'),)))
+        self.assertEqual(0, solver.count_solutions(2))
+
+    def test_count_solutions(self):
+        solver = PachamamaSolver(pachamama_factory.create_pachamama_puzzle((('0X', '0X', '0X'),)))
+        self.assertEqual(1, solver.count_solutions(1))
+        self.assertEqual(3, solver.count_solutions(3))
+        with self.assertRaises(ValueError):
+            solver.count_solutions(0)
+
+    def test_count_solutions_timeout(self):
+        solver = PachamamaSolver(pachamama_factory.create_pachamama_puzzle((('0X', '0X', '0X'),) * 3))
+        with self.assertRaises(TimeoutError):
+            solver.count_solutions(2, timeout=0)
+        self.assertEqual(2, solver.count_solutions(2, timeout=60))
+
+
+if __name__ == '__main__':
+    unittest.main()
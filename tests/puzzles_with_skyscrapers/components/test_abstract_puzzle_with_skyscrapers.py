@@ -5,7 +5,8 @@ from typing import Tuple, Optional
 from unittest.mock import patch
 
 from src.components.unsolvable_error import UnsolvableError
-from src.puzzles_with_skyscrapers.components.abstract_puzzle_with_skyscrapers import AbstractPuzzleWithSkyscrapers
+from src.puzzles_with_skyscrapers.components.abstract_puzzle_with_skyscrapers import AbstractPuzzleWithSkyscrapers, \
+    SEARCH_ENGINES
 
 
 def mock_num_of_empty_cells(puzzle):
@@ -132,6 +133,79 @@ class TestAbstractPuzzleWithSkyscrapers(unittest.TestCase):
         p.puzzle_to_draw_on[3][3].set_value(0)
         self.assertEqual(16, p._count_filled_cells())
 
+    def test_get_most_constrained_cell(self):
+        p = AbstractPuzzleWithSkyscrapers(((None, 1, None, None), (2, None, None, None),
+                                           (None, None, None, 3), (None, None, 4, None)),
+                                          tuple([None] * 16))
+        p.puzzle_to_draw_on[2][1].add_illegal_value(1)
+        self.assertIs(p.puzzle_to_draw_on[2][1], p._get_most_constrained_cell())
+        p.puzzle_to_draw_on[3][3].add_illegal_value(1)
+        p.puzzle_to_draw_on[3][3].add_illegal_value(2)
+        self.assertIs(p.puzzle_to_draw_on[3][3], p._get_most_constrained_cell())
+        p2 = AbstractPuzzleWithSkyscrapers(((1, 2), (2, 1)), tuple([None] * 8))
+        self.assertIsNone(p2._get_most_constrained_cell())
+
+    def test_get_options_of_most_constrained_item(self):
+        p = AbstractPuzzleWithSkyscrapers(tuple([tuple([None] * 3)] * 3), tuple([None] * 12))
+        exact_cover = p._build_exact_cover()
+        self.assertEqual([(0, 0, 1), (0, 0, 2), (0, 0, 3)], p._get_options_of_most_constrained_item(exact_cover))
+        p.puzzle_to_draw_on[1][2].add_illegal_value(1)
+        p.puzzle_to_draw_on[2][2].add_illegal_value(1)
+        # The value 1 of the last column fits only one cell, though every cell still has 2 or 3 possible values.
+        self.assertEqual([(0, 2, 1)], p._get_options_of_most_constrained_item(exact_cover))
+        exact_cover.choose((0, 0, 1))
+        self.assertEqual([], p._get_options_of_most_constrained_item(exact_cover))
+
+    def test_set_search_engine(self):
+        for search_engine in SEARCH_ENGINES:
+            p = AbstractPuzzleWithSkyscrapers(((1, None, None), (None, None, None), (None, None, None)),
+                                              tuple([None] * 12))
+            p._mark_hint_basic_conclusions = lambda hint_index: None
+            p._mark_puzzle_specific_seen_and_unseen = lambda hint_index: None
+            p._mark_cell_illegals_for_seen_status = lambda hint_index, distance_from_hint: None
+            p._mark_hint_specific_rules = lambda hint_index: None
+            p._are_puzzle_specifics_valid = lambda: True
+            p.set_search_engine(search_engine)
+            self.assertEqual(4, p.count_solutions(10))
+        with self.assertRaises(ValueError):
+            p.set_search_engine("quantum")
+
+    def test_filled_cells_after_rollback(self):
+        p = AbstractPuzzleWithSkyscrapers(((1, None, None), (None, None, None), (None, None, 3)), tuple([None] * 12))
+        self.assertEqual(2, p._count_filled_cells())
+        checkpoint = p._trail.get_checkpoint()
+        p.puzzle_to_draw_on[0][1].set_value(2)
+        p.puzzle_to_draw_on[2][1].add_illegal_value(1)
+        p.puzzle_to_draw_on[2][1].add_illegal_value(3)
+        self.assertEqual(4, p._count_filled_cells())
+        self.assertEqual([2, 0, 2], p._filled_cells.in_rows)
+        self.assertEqual([1, 2, 1], p._filled_cells.in_cols)
+        p._rollback(checkpoint)
+        self.assertEqual(2, p._count_filled_cells())
+        self.assertEqual([1, 0, 1], p._filled_cells.in_rows)
+        self.assertEqual([1, 0, 1], p._filled_cells.in_cols)
+
+    def test_hint_lines(self):
+        p = AbstractPuzzleWithSkyscrapers(((None, 1, None), (2, None, None), (None, None, 3)), tuple([None] * 12))
+        self.assertEqual(12, len(p._hint_lines))
+        self.assertEqual((None, 2, None), tuple(cell.get_value() for cell in p._hint_lines[0]))
+        self.assertEqual((None, 1, None), tuple(cell.get_value() for cell in p._hint_lines[3]))
+        self.assertEqual((3, None, None), tuple(cell.get_value() for cell in p._hint_lines[8]))
+        self.assertEqual((None, None, 3), tuple(cell.get_value() for cell in p._hint_lines[11]))
+        self.assertIs(p.puzzle_to_draw_on[1][1], p._hint_lines[10][1])
+
+    def test_get_lines_changed_since(self):
+        p = AbstractPuzzleWithSkyscrapers(tuple([tuple([None] * 4)] * 4), tuple([None] * 16))
+        self.assertEqual(({0, 1, 2, 3}, {0, 1, 2, 3}, set(range(16))), p._get_lines_changed_since_fixpoint())
+        p._fixpoint_checkpoints.append(p._trail.get_checkpoint())
+        self.assertEqual((set(), set(), set()), p._get_lines_changed_since_fixpoint())
+        p.puzzle_to_draw_on[1][2].add_illegal_value(3)
+        self.assertEqual(({1}, {2}, {2, 5, 10, 13}), p._get_lines_changed_since_fixpoint())
+        p._fixpoint_checkpoints.append(p._trail.get_checkpoint())
+        p._rollback(0)
+        self.assertEqual([0], p._fixpoint_checkpoints)
+        self.assertTrue(p.puzzle_to_draw_on[1][2].is_value_possible(3))
+
     def test_get_cell_with_distance_from_hint(self):
         p = AbstractPuzzleWithSkyscrapers(((None, 1, None, None), (2, None, None, None),
                                            (None, None, None, 3), (None, None, 4, None)),
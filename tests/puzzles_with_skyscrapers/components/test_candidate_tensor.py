@@ -0,0 +1,73 @@
+import unittest
+
+from src.puzzles_with_skyscrapers.components.candidate_tensor import NUMPY_AVAILABLE, get_candidate_tensor, \
+    get_seen_and_unseen, get_tensor_rules, presolve_puzzles, propagate_candidate_tensor
+from src.puzzles_with_skyscrapers.skyscrapers_gaps_puzzle import SkyscrapersGapsPuzzle
+from src.puzzles_with_skyscrapers.skyscrapers_puzzle import SkyscrapersPuzzle
+
+EMPTY_GRID = tuple([tuple([None] * 3)] * 3)
+
+
+@unittest.skipIf(not NUMPY_AVAILABLE, "numpy is not installed")
+class TestCandidateTensor(unittest.TestCase):
+
+    def test_get_candidate_tensor(self):
+        puzzle = SkyscrapersPuzzle(((1, None, None), (None, None, None), (None, None, None)), (None,) * 12)
+        candidates = get_candidate_tensor([puzzle, SkyscrapersPuzzle(EMPTY_GRID, (None,) * 12)])
+        self.assertEqual((2, 3, 3, 5), candidates.shape)
+        self.assertEqual([False, True, False, False, False], candidates[0, 0, 0].tolist())
+        self.assertEqual([False, True, True, True, False], candidates[0, 1, 1].tolist())
+        self.assertEqual([False, True, True, True, False], candidates[1, 0, 0].tolist())
+
+        with self.assertRaises(ValueError):
+            get_candidate_tensor([puzzle, SkyscrapersPuzzle(tuple([tuple([None] * 4)] * 4), (None,) * 16)])
+
+    def test_get_tensor_rules(self):
+        rules = get_tensor_rules([SkyscrapersGapsPuzzle(tuple([tuple([None] * 4)] * 4), (None,) * 16)])
+        self.assertEqual([[1, 1, 1, 1, 0, 0]], rules.multiplicities.tolist())
+        self.assertEqual([[True, True, True, True, False, False]], rules.required.tolist())
+        self.assertEqual([4], rules.min_distinct_values.tolist())
+        self.assertEqual([3], rules.highest_values.tolist())
+
+    def test_propagate_candidate_tensor(self):
+        puzzles = [SkyscrapersPuzzle(((1, None), (None, None)), (None,) * 8),
+                   SkyscrapersPuzzle(((None, None), (None, None)), (None,) * 8)]
+        candidates = get_candidate_tensor(puzzles)
+        # Both cells of the first row of the second puzzle can only be 1.
+        candidates[1, 0, :, 2] = False
+        is_unsolvable = propagate_candidate_tensor(candidates, get_tensor_rules(puzzles))
+        self.assertEqual([False, True], is_unsolvable.tolist())
+        self.assertEqual([[1, 2], [2, 1]], candidates[0].argmax(axis=-1).tolist())
+        self.assertTrue((candidates[0].sum(axis=-1) == 1).all())
+
+    def test_propagate_candidate_tensor_hidden_singles(self):
+        puzzles = [SkyscrapersPuzzle(EMPTY_GRID, (None,) * 12)]
+        candidates = get_candidate_tensor(puzzles)
+        # 3 can only be in the first cell of the first row.
+        candidates[0, 0, 1:, 3] = False
+        self.assertEqual([False], propagate_candidate_tensor(candidates, get_tensor_rules(puzzles)).tolist())
+        self.assertEqual([False, False, False, True, False], candidates[0, 0, 0].tolist())
+        self.assertFalse(candidates[0, 1:, 0, 3].any())
+
+    def test_get_seen_and_unseen(self):
+        puzzles = [SkyscrapersPuzzle(((2, 1, 3), (None, None, None), (None, None, None)), (None,) * 12)]
+        seen, unseen = get_seen_and_unseen(get_candidate_tensor(puzzles))
+        # Seen from the left: the first and last cells, and from the right: only the last one.
+        self.assertEqual([True, False, True], seen[0, 3, 0].tolist())
+        self.assertEqual([False, True, False], unseen[0, 3, 0].tolist())
+        self.assertEqual([False, False, True], seen[0, 1, 0].tolist())
+        self.assertEqual([True, True, False], unseen[0, 1, 0].tolist())
+
+    def test_presolve_puzzles(self):
+        hints = (None, None, None, None, None, None, None, None, None, 3, None, None)
+        puzzles = [SkyscrapersPuzzle(((1, None, None), (None, None, None), (None, None, None)), (None,) * 12),
+                   SkyscrapersPuzzle(((1, 1, None), (None, None, None), (None, None, None)), (None,) * 12),
+                   SkyscrapersPuzzle(EMPTY_GRID, hints)]
+        self.assertEqual([True, False, True], presolve_puzzles(puzzles))
+        self.assertEqual(1 << 2 | 1 << 3, puzzles[0]._rows[0][1].get_possible_values_mask())
+        self.assertEqual(SkyscrapersPuzzle(EMPTY_GRID, hints).solve(), puzzles[2].solve())
+        self.assertEqual([], presolve_puzzles([]))
+
+
+if __name__ == '__main__':
+    unittest.main()
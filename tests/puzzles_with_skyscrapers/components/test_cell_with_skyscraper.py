@@ -1,5 +1,6 @@
 import unittest
 
+from src.components.trail import Trail
 from src.components.unsolvable_error import UnsolvableError
 from src.puzzles_with_skyscrapers.components.cell_with_skyscraper import CellWithSkyscraper
 
@@ -23,6 +24,11 @@ class TestCellWithSkyscraper(unittest.TestCase):
         self._test_get_possible_values_after_illegals()
         self._test_get_possible_values_after_illegals_and_set_value()
 
+    def test_possible_values_mask_primitives(self):
+        self._test_possible_values_mask_primitives_no_illegals()
+        self._test_possible_values_mask_primitives_after_illegals()
+        self._test_possible_values_mask_primitives_after_set_value()
+
     def test_set_value(self):
         self._test_set_value_out_of_range()
         self._test_set_value_empty_when_not_allowed()
@@ -63,6 +69,34 @@ class TestCellWithSkyscraper(unittest.TestCase):
         self._test_get_seen_from_side_highest()
         self._test_get_seen_from_side_legit()
 
+    def test_rollback(self):
+        trail = Trail()
+        c = CellWithSkyscraper(6, can_be_empty=True)
+        c.attach_to_grid(trail, 2, 3)
+        self.assertEqual((2, 3), c.position)
+        c.add_illegal_value(2)
+        checkpoint = trail.get_checkpoint()
+        c.set_seen_from_side(1, False)
+        c.set_value(0)
+        self.assertEqual(0, c._value)
+        trail.rollback(checkpoint)
+        self.assertEqual(None, c._value)
+        self.assertEqual({2}, c._illegal_values)
+        self.assertEqual((None, None, None, None), c._seen)
+        trail.rollback(0)
+        self.assertEqual(set(), c._illegal_values)
+
+    def test_count_changes_since(self):
+        trail = Trail()
+        c = CellWithSkyscraper(6)
+        c.attach_to_grid(trail, 0, 0)
+        c.add_illegal_value(2)
+        c.add_illegal_value(3)
+        (_, state), _ = trail.get_entries_since(0)
+        self.assertEqual((2, False), c.count_changes_since(state))
+        c.set_value(5)
+        self.assertEqual((5, True), c.count_changes_since(state))
+
     def _test_ctor_val_out_of_range(self):
         with self.assertRaises(ValueError):
             CellWithSkyscraper(6, 7)
@@ -188,6 +222,38 @@ class TestCellWithSkyscraper(unittest.TestCase):
         c2.set_value(2)
         self.assertEqual({2}, c2.get_possible_values())
 
+    def _test_possible_values_mask_primitives_no_illegals(self):
+        c = CellWithSkyscraper(6, can_be_empty=True)
+        self.assertEqual(0b1111111, c.get_possible_values_mask())
+        self.assertEqual(0, c.get_min_possible_value())
+        self.assertEqual(6, c.get_max_possible_value())
+        self.assertEqual(7, c.count_possible_values())
+        self.assertTrue(c.is_value_possible(0))
+        self.assertFalse(c.is_value_possible(7))
+
+    def _test_possible_values_mask_primitives_after_illegals(self):
+        c = CellWithSkyscraper(6)
+        c.add_illegal_value(1)
+        c.add_illegal_value(6)
+        c.add_illegal_value(4)
+        self.assertEqual(0b0101100, c.get_possible_values_mask())
+        self.assertEqual(2, c.get_min_possible_value())
+        self.assertEqual(5, c.get_max_possible_value())
+        self.assertEqual(3, c.count_possible_values())
+        self.assertTrue(c.is_value_possible(3))
+        self.assertFalse(c.is_value_possible(4))
+        self.assertFalse(c.is_value_possible(0))
+
+    def _test_possible_values_mask_primitives_after_set_value(self):
+        c = CellWithSkyscraper(6)
+        c.set_value(3)
+        self.assertEqual(0b0001000, c.get_possible_values_mask())
+        self.assertEqual(3, c.get_min_possible_value())
+        self.assertEqual(3, c.get_max_possible_value())
+        self.assertEqual(1, c.count_possible_values())
+        self.assertTrue(c.is_value_possible(3))
+        self.assertFalse(c.is_value_possible(2))
+
     def _test_set_value_out_of_range(self):
         c = CellWithSkyscraper(6)
         with self.assertRaises(ValueError):
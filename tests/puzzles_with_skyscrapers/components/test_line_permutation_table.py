@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+
+from src.puzzles_with_skyscrapers.components import line_permutation_table
+from src.puzzles_with_skyscrapers.components.line_permutation_table import count_visible, get_line_permutation_table
+
+
+class TestLinePermutationTable(unittest.TestCase):
+
+    def test_count_visible(self):
+        self.assertEqual(4, count_visible((1, 2, 3, 4)))
+        self.assertEqual(1, count_visible((4, 1, 2, 3)))
+        self.assertEqual(2, count_visible((0, 2, 1, 3)))
+        self.assertEqual(0, count_visible((0, 0)))
+
+    def test_get_possible_values_masks(self):
+        table = get_line_permutation_table(4, 4, 0, 4, None)
+        self.assertEqual(1, table.num_of_lines)
+        self.assertEqual((1 << 1, 1 << 2, 1 << 3, 1 << 4), table.get_possible_values_masks([0b11110] * 4))
+
+        table = get_line_permutation_table(4, 4, 0, 3, 2)
+        # The 4 cannot be first or last, so with it in the third cell the line must start with 1 or 2.
+        masks = table.get_possible_values_masks([0b11110, 0b11110, 1 << 4, 0b11110])
+        self.assertEqual((0b00110, 0b01100, 1 << 4, 0b01110), masks)
+        self.assertIsNone(table.get_possible_values_masks([1 << 4, 0b11110, 0b11110, 0b11110]))
+
+    def test_get_possible_values_masks_with_empty_cells(self):
+        table = get_line_permutation_table(3, 2, 1, 2, None)
+        self.assertEqual((0b011, 0b111, 0b101),
+                         table.get_possible_values_masks([0b111] * 3))
+
+    def test_disk_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            line_permutation_table.set_disk_cache_directory(directory)
+            try:
+                get_line_permutation_table.cache_clear()
+                table = get_line_permutation_table(3, 4, 0, 2, 2)
+                self.assertEqual(1, len(os.listdir(directory)))
+                get_line_permutation_table.cache_clear()
+                self.assertEqual(table.get_possible_values_masks([0b11110] * 3),
+                                 get_line_permutation_table(3, 4, 0, 2, 2).get_possible_values_masks([0b11110] * 3))
+            finally:
+                line_permutation_table.set_disk_cache_directory(None)
+                get_line_permutation_table.cache_clear()
+
+    def test_disk_cache_with_broken_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            line_permutation_table.set_disk_cache_directory(directory)
+            try:
+                get_line_permutation_table.cache_clear()
+                expected = get_line_permutation_table(3, 4, 0, 2, 2).get_possible_values_masks([0b11110] * 3)
+                # A file cut short is built and written again, and no temporary files are left behind.
+                [name] = os.listdir(directory)
+                with open(os.path.join(directory, name), "r+b") as f:
+                    f.truncate(10)
+                get_line_permutation_table.cache_clear()
+                self.assertEqual(expected,
+                                 get_line_permutation_table(3, 4, 0, 2, 2).get_possible_values_masks([0b11110] * 3))
+                self.assertEqual([name], os.listdir(directory))
+                get_line_permutation_table.cache_clear()
+                self.assertEqual(expected,
+                                 get_line_permutation_table(3, 4, 0, 2, 2).get_possible_values_masks([0b11110] * 3))
+            finally:
+                line_permutation_table.set_disk_cache_directory(None)
+                get_line_permutation_table.cache_clear()
+
+
+if __name__ == '__main__':
+    unittest.main()
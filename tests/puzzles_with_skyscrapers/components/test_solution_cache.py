@@ -0,0 +1,90 @@
+import os
+import pickle
+import tempfile
+import unittest
+
+from src.puzzles_with_skyscrapers.components.solution_cache import CachedSolution, SolutionCache
+from src.puzzles_with_skyscrapers.components.solve_memo import clear_solve_memo
+from src.puzzles_with_skyscrapers.components.symmetry import Symmetry, transform_hints
+from src.puzzles_with_skyscrapers.skyscrapers_puzzle import SkyscrapersPuzzle
+
+EMPTY_GRID = tuple([tuple([None] * 3)] * 3)
+# All the hints of the solution ((1, 2, 3), (2, 3, 1), (3, 1, 2)), and a subset of them with several solutions.
+FULL_HINTS = (3, 2, 1, 1, 2, 2, 1, 2, 2, 3, 2, 1)
+PARTIAL_HINTS = (3,) + tuple([None] * 11)
+
+
+class TestSolutionCache(unittest.TestCase):
+
+    def setUp(self):
+        clear_solve_memo()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "solutions.sqlite")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_get_and_put(self):
+        cache = SolutionCache(self.path)
+        self.assertIsNone(cache.get(("skyscrapers", ((None,),), (None,) * 4)))
+        cache.put(("skyscrapers", ((None,),), (None,) * 4), CachedSolution("single", [[[1]]], 0, {"num_of_guesses": 0}))
+        self.assertEqual(CachedSolution("single", [[[1]]], 0, {"num_of_guesses": 0}),
+                         cache.get(("skyscrapers", ((None,),), (None,) * 4)))
+        self.assertEqual((1, 1), (cache.num_of_hits, cache.num_of_misses))
+        cache.close()
+
+        reopened = pickle.loads(pickle.dumps(SolutionCache(self.path)))
+        self.assertEqual(1, reopened.get_num_of_entries())
+        reopened.clear()
+        self.assertEqual(0, reopened.get_num_of_entries())
+        reopened.close()
+
+        with self.assertRaises(ValueError):
+            SolutionCache(self.path, max_entries=0)
+
+    def test_evict(self):
+        cache = SolutionCache(self.path, max_entries=2)
+        for key in ("a", "b", "c"):
+            cache.put((key,), CachedSolution("none", [], 0, None))
+            if key == "b":
+                cache.get(("a",))
+        cache.evict()
+        self.assertEqual(2, cache.get_num_of_entries())
+        self.assertIsNone(cache.get(("b",)))
+        self.assertIsNotNone(cache.get(("a",)))
+        self.assertIsNotNone(cache.get(("c",)))
+        cache.close()
+
+    def test_puzzle_with_solution_cache(self):
+        cache = SolutionCache(self.path)
+        puzzle = SkyscrapersPuzzle(EMPTY_GRID, FULL_HINTS)
+        puzzle.set_solution_cache(cache)
+        solution = puzzle.solve()
+        self.assertEqual((0, 1), (cache.num_of_hits, cache.num_of_misses))
+
+        # A rotated copy of the puzzle is found in the cache, and its solution is rotated back.
+        rotated = SkyscrapersPuzzle(EMPTY_GRID, transform_hints(FULL_HINTS, Symmetry(1, False)))
+        rotated.set_solution_cache(cache)
+        self.assertEqual([[3, 2, 1], [1, 3, 2], [2, 1, 3]], rotated.solve())
+        self.assertEqual(1, cache.num_of_hits)
+        self.assertEqual(solution, SkyscrapersPuzzle(EMPTY_GRID, FULL_HINTS).solve())
+        self.assertEqual([[3, 2, 1], [1, 3, 2], [2, 1, 3]],
+                         [[cell.get_value() for cell in row] for row in rotated.puzzle_to_draw_on])
+
+        several = SkyscrapersPuzzle(EMPTY_GRID, PARTIAL_HINTS)
+        several.set_solution_cache(cache)
+        self.assertEqual(2, several.count_solutions(2))
+        # The memo of this process would answer before the cache.
+        clear_solve_memo()
+        again = SkyscrapersPuzzle(EMPTY_GRID, PARTIAL_HINTS)
+        again.set_solution_cache(cache)
+        self.assertEqual(2, again.count_solutions(2))
+        self.assertEqual(2, cache.num_of_hits)
+        # Counting beyond the solutions the cache keeps searches, without asking the cache again.
+        self.assertEqual(2, again.count_solutions(10))
+        self.assertEqual((2, 2), (cache.num_of_hits, cache.num_of_misses))
+        cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+
+from src.puzzles_with_skyscrapers.components.solve_memo import DEFAULT_CAPACITY, MemoizedSolutions, SolveMemo, \
+    clear_solve_memo, get_solve_memo
+from src.puzzles_with_skyscrapers.skyscrapers_puzzle import SkyscrapersPuzzle
+
+EMPTY_GRID = tuple([tuple([None] * 3)] * 3)
+# All the hints of the solution ((1, 2, 3), (2, 3, 1), (3, 1, 2)).
+FULL_HINTS = (3, 2, 1, 1, 2, 2, 1, 2, 2, 3, 2, 1)
+
+
+class TestSolveMemo(unittest.TestCase):
+
+    def setUp(self):
+        clear_solve_memo()
+
+    def tearDown(self):
+        get_solve_memo().set_capacity(DEFAULT_CAPACITY)
+
+    def test_get_and_put(self):
+        memo = SolveMemo(capacity=2)
+        entries = {key: MemoizedSolutions((), i) for i, key in enumerate("abc")}
+        memo.put("a", entries["a"])
+        memo.put("b", entries["b"])
+        self.assertEqual(entries["a"], memo.get("a"))
+        memo.put("c", entries["c"])
+        self.assertIsNone(memo.get("b"))
+        self.assertEqual(entries["a"], memo.get("a"))
+        self.assertEqual(entries["c"], memo.get("c"))
+        self.assertEqual((3, 1), (memo.num_of_hits, memo.num_of_misses))
+        self.assertAlmostEqual(0.75, memo.get_hit_rate())
+
+        memo.set_capacity(1)
+        self.assertEqual(1, len(memo))
+        self.assertEqual(entries["c"], memo.get("c"))
+        memo.clear()
+        self.assertEqual((0, 0, 0), (len(memo), memo.num_of_hits, memo.num_of_misses))
+
+        memo.set_capacity(0)
+        memo.put("a", entries["a"])
+        self.assertEqual(0, len(memo))
+        with self.assertRaises(ValueError):
+            memo.set_capacity(-1)
+
+    def test_puzzles_share_solutions(self):
+        memo = get_solve_memo()
+        solution = SkyscrapersPuzzle(EMPTY_GRID, FULL_HINTS).solve()
+        self.assertEqual((0, 1), (memo.num_of_hits, memo.num_of_misses))
+        # Changing a solution given to a caller does not change the memoized one.
+        solution[0][0] = 3
+        other = SkyscrapersPuzzle(EMPTY_GRID, FULL_HINTS)
+        self.assertTrue(other.is_single_solution())
+        self.assertEqual([[1, 2, 3], [2, 3, 1], [3, 1, 2]], other.solve())
+        self.assertEqual(1, memo.num_of_hits)
+
+        # Puzzles collecting statistics search anyway.
+        with_stats = SkyscrapersPuzzle(EMPTY_GRID, FULL_HINTS)
+        with_stats.enable_stats()
+        with_stats.solve()
+        self.assertEqual(1, memo.num_of_hits)
+
+        memo.set_capacity(0)
+        SkyscrapersPuzzle(EMPTY_GRID, FULL_HINTS).solve()
+        self.assertEqual(1, memo.num_of_hits)
+
+
+if __name__ == '__main__':
+    unittest.main()
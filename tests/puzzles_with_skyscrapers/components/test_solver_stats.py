@@ -0,0 +1,46 @@
+import unittest
+
+from src.puzzles_with_skyscrapers.components.solver_stats import RULE_METHODS
+from src.puzzles_with_skyscrapers.skyscrapers_gaps_puzzle import SkyscrapersGapsPuzzle
+from src.puzzles_with_skyscrapers.skyscrapers_puzzle import SkyscrapersPuzzle
+
+
+class TestSolverStats(unittest.TestCase):
+
+    def test_enable_stats(self):
+        p = SkyscrapersPuzzle(tuple([tuple([None] * 4)] * 4), (2,) + tuple([None] * 15))
+        self.assertIsNone(p.stats)
+        self.assertFalse(any(name in vars(p) for name in RULE_METHODS.values()))
+        stats = p.enable_stats()
+        self.assertIs(stats, p.enable_stats())
+        solution = p.solve()
+
+        expected = SkyscrapersPuzzle(p.puzzle, p.hints)
+        self.assertEqual(expected.solve(), solution)
+        self.assertEqual(expected.num_of_guesses, stats.num_of_guesses)
+        self.assertGreater(stats.num_of_guesses, 0)
+        self.assertGreater(stats.num_of_backtracks, 0)
+        self.assertGreater(stats.num_of_trail_entries, 0)
+        for rule_stats in stats.rules.values():
+            self.assertGreater(rule_stats.num_of_calls, 0)
+            self.assertGreaterEqual(rule_stats.seconds, 0)
+        self.assertGreater(stats.rules["mark_illegal_clashing_values"].num_of_eliminations, 0)
+        self.assertGreater(stats.rules["fill_only_possible_locations"].num_of_filled_cells, 0)
+        self.assertEqual(set(RULE_METHODS), set(stats.to_dict()["rules"]))
+        # Both seen and unseen rules run once for every changed hint, and each call is counted once.
+        self.assertEqual(stats.rules["mark_general_seen_and_unseen"].num_of_calls,
+                         stats.rules["mark_puzzle_specific_seen_and_unseen"].num_of_calls)
+        self.assertEqual(stats.rules["mark_basic_conclusions"].num_of_calls,
+                         stats.rules["mark_general_seen_and_unseen"].num_of_calls)
+
+    def test_stats_without_search(self):
+        p = SkyscrapersGapsPuzzle(((None, 1, 2), (None, None, 0), (None, None, None)), tuple([None] * 12))
+        stats = p.enable_stats()
+        self.assertEqual([[0, 1, 2], [1, 2, 0], [2, 0, 1]], p.solve())
+        self.assertEqual(0, stats.num_of_guesses)
+        # Every cell that was empty is filled by exactly one rule.
+        self.assertEqual(6, sum(rule_stats.num_of_filled_cells for rule_stats in stats.rules.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+
+from src.puzzles_with_skyscrapers.components.symmetry import IDENTITY, SYMMETRIES, Symmetry, get_canonical_form, \
+    get_inverse, transform_cell, transform_grid, transform_hints
+from src.puzzles_with_skyscrapers.skyscrapers_puzzle import SkyscrapersPuzzle
+
+GRID = ((1, 2, None), (None, None, None), (None, None, 3))
+# The top hints, then the right, bottom and left hints.
+HINTS = (1, 2, 3, None, None, None, None, None, None, 3, None, None)
+
+
+class TestSymmetry(unittest.TestCase):
+
+    def test_transform_cell(self):
+        self.assertEqual((0, 2), transform_cell(Symmetry(1, False), 3, 0, 0))
+        self.assertEqual((2, 2), transform_cell(Symmetry(2, False), 3, 0, 0))
+        self.assertEqual((0, 2), transform_cell(Symmetry(0, True), 3, 0, 0))
+        self.assertEqual((2, 2), transform_cell(Symmetry(1, True), 3, 0, 0))
+
+    def test_transform_grid(self):
+        self.assertEqual(((None, None, 1), (None, None, 2), (3, None, None)), transform_grid(GRID, Symmetry(1, False)))
+        self.assertEqual(((None, 2, 1), (None, None, None), (3, None, None)), transform_grid(GRID, Symmetry(0, True)))
+        for symmetry in SYMMETRIES:
+            self.assertEqual(GRID, transform_grid(transform_grid(GRID, symmetry), get_inverse(symmetry)))
+        self.assertEqual(8, len(set(transform_grid(GRID, symmetry) for symmetry in SYMMETRIES)))
+
+    def test_transform_hints(self):
+        # Rotating clockwise turns the left hints into the top hints, and the top hints into the right hints.
+        self.assertEqual((None, None, 3, 1, 2, 3, None, None, None, None, None, None),
+                         transform_hints(HINTS, Symmetry(1, False)))
+        # Reflecting left to right reverses the top and bottom hints and swaps the left and right hints.
+        self.assertEqual((3, 2, 1, 3, None, None, None, None, None, None, None, None),
+                         transform_hints(HINTS, Symmetry(0, True)))
+        for symmetry in SYMMETRIES:
+            self.assertEqual(HINTS, transform_hints(transform_hints(HINTS, symmetry), get_inverse(symmetry)))
+
+    def test_transformed_puzzle_is_solved_to_transformed_solution(self):
+        hints = (3, 2, 1, 1, 2, 2, 1, 2, 2, 3, 2, 1)
+        solution = SkyscrapersPuzzle(tuple([tuple([None] * 3)] * 3), hints).solve()
+        for symmetry in SYMMETRIES:
+            puzzle = SkyscrapersPuzzle(tuple([tuple([None] * 3)] * 3), transform_hints(hints, symmetry))
+            self.assertEqual([list(row) for row in transform_grid(solution, symmetry)], puzzle.solve())
+
+    def test_get_canonical_form(self):
+        canonical_form = get_canonical_form("skyscrapers", GRID, HINTS)
+        for symmetry in SYMMETRIES:
+            other = get_canonical_form("skyscrapers", transform_grid(GRID, symmetry), transform_hints(HINTS, symmetry))
+            self.assertEqual(canonical_form.get_key(), other.get_key())
+            self.assertEqual(transform_grid(GRID, symmetry),
+                             transform_grid(other.puzzle, get_inverse(other.symmetry)))
+        self.assertNotEqual(canonical_form.get_key(), get_canonical_form("gaps", GRID, HINTS).get_key())
+        self.assertEqual(IDENTITY, get_canonical_form("skyscrapers", ((1,),), (None,) * 4).symmetry)
+
+
+if __name__ == '__main__':
+    unittest.main()
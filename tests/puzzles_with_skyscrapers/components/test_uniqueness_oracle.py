@@ -0,0 +1,86 @@
+import unittest
+
+from src.puzzles_with_skyscrapers.components.uniqueness_oracle import MAX_NUM_OF_ORACLES, UniquenessOracle, \
+    get_uniqueness_oracle, clear_uniqueness_oracles
+from src.puzzles_with_skyscrapers.components.solve_memo import clear_solve_memo
+from src.puzzles_with_skyscrapers.skyscrapers_puzzle import SkyscrapersPuzzle
+
+# All the hints of the solution ((1, 2, 3), (2, 3, 1), (3, 1, 2)).
+FULL_HINTS = (3, 2, 1, 1, 2, 2, 1, 2, 2, 3, 2, 1)
+EMPTY_GRID = tuple([tuple([None] * 3)] * 3)
+
+
+class TestUniquenessOracle(unittest.TestCase):
+
+    def test_is_single_solution(self):
+        oracle = UniquenessOracle(SkyscrapersPuzzle, EMPTY_GRID, FULL_HINTS)
+        first_col_only = (3,) + tuple([None] * 11)
+        self.assertFalse(oracle.is_single_solution(first_col_only))
+        self.assertEqual(1, oracle.num_of_solves)
+        self.assertFalse(oracle.is_single_solution(tuple([None] * 12)))
+        self.assertEqual(1, oracle.num_of_solves)
+
+        first_col_and_row = (3, None, None, None, None, None, None, None, None, 3, None, None)
+        self.assertTrue(oracle.is_single_solution(first_col_and_row))
+        self.assertEqual(2, oracle.num_of_solves)
+        self.assertTrue(oracle.is_single_solution((3, 2, None, None, None, None, None, None, None, 3, None, None)))
+        self.assertEqual(2, oracle.num_of_solves)
+        self.assertAlmostEqual(0.5, oracle.get_hit_rate())
+
+        with self.assertRaises(ValueError):
+            oracle.is_single_solution((1,) + tuple([None] * 11))
+
+    def test_no_inference_without_a_solution(self):
+        oracle = UniquenessOracle(SkyscrapersPuzzle, EMPTY_GRID, (3, 3) + tuple([None] * 10))
+        self.assertFalse(oracle.is_single_solution((3,) + tuple([None] * 11)))
+        self.assertFalse(oracle.is_single_solution((None, 3) + tuple([None] * 10)))
+        self.assertEqual(2, oracle.num_of_solves)
+
+    def test_timeout(self):
+        # Counting the solutions with a timeout of 0 times out as soon as the search has to guess, so the oracle cannot
+        # tell whether the hints have a solution at all, and must not infer answers for subsets of them.
+        clear_solve_memo()
+        oracle = UniquenessOracle(SkyscrapersPuzzle, tuple([tuple([None] * 4)] * 4), (2,) + tuple([None] * 15),
+                                  timeout=0)
+        self.assertFalse(oracle.is_single_solution(oracle.hints))
+        self.assertFalse(oracle.is_single_solution(tuple([None] * 16)))
+        self.assertEqual(1, oracle.num_of_solves)
+
+    def test_get_all_minimal_masks(self):
+        oracle = UniquenessOracle(SkyscrapersPuzzle, EMPTY_GRID, FULL_HINTS)
+        minimal_masks = oracle.get_all_minimal_masks()
+        self.assertEqual(39, len(minimal_masks))
+        self.assertGreater(oracle.get_hit_rate(), 0.9)
+        for mask in minimal_masks:
+            self.assertEqual(1, SkyscrapersPuzzle(EMPTY_GRID, oracle.get_hints(mask)).count_solutions(2))
+            for i in range(len(FULL_HINTS)):
+                if mask >> i & 1:
+                    self.assertEqual(2, SkyscrapersPuzzle(EMPTY_GRID, oracle.get_hints(mask & ~(1 << i)))
+                                     .count_solutions(2))
+
+    def test_get_uniqueness_oracle(self):
+        clear_uniqueness_oracles()
+        oracle = get_uniqueness_oracle(SkyscrapersPuzzle, EMPTY_GRID, FULL_HINTS)
+        self.assertIs(oracle, get_uniqueness_oracle(SkyscrapersPuzzle, EMPTY_GRID, FULL_HINTS))
+        self.assertIsNot(oracle, get_uniqueness_oracle(SkyscrapersPuzzle, EMPTY_GRID, FULL_HINTS[:-1] + (None,)))
+        clear_uniqueness_oracles()
+        self.assertIsNot(oracle, get_uniqueness_oracle(SkyscrapersPuzzle, EMPTY_GRID, FULL_HINTS))
+        clear_uniqueness_oracles()
+
+    def test_get_uniqueness_oracle_is_bounded(self):
+        clear_uniqueness_oracles()
+        grids = [tuple(tuple(value if (row, col) == (i // 3, i % 3) else None for col in range(3)) for row in range(3))
+                 for i in range(9) for value in (1, 2, 3)][:MAX_NUM_OF_ORACLES + 1]
+        first_oracle = get_uniqueness_oracle(SkyscrapersPuzzle, grids[0], FULL_HINTS)
+        second_oracle = get_uniqueness_oracle(SkyscrapersPuzzle, grids[1], FULL_HINTS)
+        for grid in grids[2:]:
+            # Using the first oracle keeps it, so the second one is the least recently used.
+            self.assertIs(first_oracle, get_uniqueness_oracle(SkyscrapersPuzzle, grids[0], FULL_HINTS))
+            get_uniqueness_oracle(SkyscrapersPuzzle, grid, FULL_HINTS)
+        self.assertIs(first_oracle, get_uniqueness_oracle(SkyscrapersPuzzle, grids[0], FULL_HINTS))
+        self.assertIsNot(second_oracle, get_uniqueness_oracle(SkyscrapersPuzzle, grids[1], FULL_HINTS))
+        clear_uniqueness_oracles()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from src.puzzles_with_skyscrapers.batch_solver import InvalidPuzzleSpec, PuzzleSpec, main, solve_batch, \
+    solve_puzzle_spec, solve_batch_with_results, result_to_json
+from src.puzzles_with_skyscrapers.components.candidate_tensor import NUMPY_AVAILABLE
+from src.puzzles_with_skyscrapers.components.solution_cache import SolutionCache
+from src.puzzles_with_skyscrapers.components.solve_memo import clear_solve_memo
+
+
+def _get_specs():
+    empty_grid = tuple([tuple([None] * 4)] * 4)
+    return [
+        PuzzleSpec("skyscrapers", empty_grid, (4, None, None, None) + tuple([None] * 12)),
+        PuzzleSpec("skyscrapers", ((1, 2), (2, 1)), tuple([None] * 8)),
+        PuzzleSpec("skyscrapers", empty_grid, tuple([1] * 16)),
+        PuzzleSpec("gaps", empty_grid, (3, None, 1, None, None, 2, None, None,
+                                        None, None, None, None, None, 3, None, None)),
+        PuzzleSpec("extra_building", empty_grid, tuple([None] * 16)),
+        PuzzleSpec("haido", ((1, 2, 3, 4), (2, 3, 4, 1), (3, 4, 1, 2), (4, 1, 2, None)), tuple([None] * 16)),
+    ]
+
+
+class TestBatchSolver(unittest.TestCase):
+
+    def setUp(self):
+        # Worker processes start with a copy of the memo of this process.
+        clear_solve_memo()
+
+    def test_solve_batch_ordered(self):
+        specs = _get_specs()
+        expected = [(i, solve_puzzle_spec(spec)) for i, spec in enumerate(specs)]
+        self.assertEqual(expected, list(solve_batch(iter(specs), workers=2, chunk_size=1)))
+        self.assertEqual(expected, list(solve_batch(specs, workers=1)))
+
+    def test_solve_batch_unordered(self):
+        specs = _get_specs()
+        expected = [(i, solve_puzzle_spec(spec)) for i, spec in enumerate(specs)]
+        self.assertEqual(expected, sorted(solve_batch(specs, workers=2, chunk_size=4, ordered=False),
+                                          key=lambda result: result[0]))
+
+    def test_solve_batch_illegal_arguments(self):
+        with self.assertRaises(ValueError):
+            list(solve_batch(_get_specs(), chunk_size=0))
+        with self.assertRaises(ValueError):
+            list(solve_batch(_get_specs(), workers=0))
+
+    def test_solve_batch_invalid_puzzles(self):
+        specs = [PuzzleSpec("sudoku", ((1,),), (None,) * 4), _get_specs()[1],
+                 PuzzleSpec("skyscrapers", ((1, 2), (2, 1)), (None,) * 7), InvalidPuzzleSpec("Invalid puzzle record.")]
+        results = list(solve_batch(specs, workers=1))
+        self.assertEqual([0, 1, 2, 3], [index for index, _ in results])
+        self.assertIsInstance(results[0][1], InvalidPuzzleSpec)
+        self.assertIn("sudoku", results[0][1].error)
+        self.assertEqual(solve_puzzle_spec(specs[1]), results[1][1])
+        self.assertIsInstance(results[2][1], InvalidPuzzleSpec)
+        self.assertEqual(specs[3], results[3][1])
+        with self.assertRaises(ValueError):
+            solve_puzzle_spec(specs[0])
+
+        for presolve in (False, True) if NUMPY_AVAILABLE else (False,):
+            for deduplicate in (False, True):
+                results = list(solve_batch_with_results(specs, workers=1, presolve=presolve, deduplicate=deduplicate))
+                self.assertEqual(["error", "single", "error", "error"], [result.status for result in results])
+                self.assertEqual([None, "Invalid puzzle record."], [result.error for result in results[1::2]])
+                self.assertIn("hints", results[2].error)
+
+    def test_solve_batch_with_results(self):
+        specs = _get_specs()
+        results = list(solve_batch_with_results(specs, workers=2, chunk_size=2))
+        self.assertEqual(list(range(len(specs))), [result.index for result in results])
+        self.assertEqual(["multiple", "single", "none", "none", "multiple", "single"],
+                         [result.status for result in results])
+        self.assertEqual([[[1, 2], [2, 1]]], results[1].solutions)
+        self.assertTrue(all(result.seconds >= 0 for result in results))
+
+        exact_cover_results = list(solve_batch_with_results(specs, workers=1, search_engine="exact_cover"))
+        # Puzzles with several solutions may show different pairs of them.
+        self.assertEqual([result.status for result in results], [result.status for result in exact_cover_results])
+        self.assertEqual([result.solutions for result in results if result.status == "single"],
+                         [result.solutions for result in exact_cover_results if result.status == "single"])
+
+        if NUMPY_AVAILABLE:
+            presolved_results = list(solve_batch_with_results(specs, workers=2, chunk_size=3, presolve=True))
+            self.assertEqual([result.status for result in results], [result.status for result in presolved_results])
+            self.assertEqual([result.solutions for result in results if result.status == "single"],
+                             [result.solutions for result in presolved_results if result.status == "single"])
+
+        clear_solve_memo()
+        timed_out = list(solve_batch_with_results(specs[:1], workers=1, timeout=0))
+        self.assertEqual("timeout", timed_out[0].status)
+        self.assertEqual([], timed_out[0].solutions)
+
+    def test_solve_batch_with_results_deduplicate(self):
+        specs = _get_specs()
+        # The first puzzle rotated clockwise, and the second one reflected.
+        specs += [PuzzleSpec("skyscrapers", specs[0].puzzle, (None, None, None, None, 4) + tuple([None] * 11)),
+                  PuzzleSpec("skyscrapers", ((2, 1), (1, 2)), tuple([None] * 8))]
+        results = list(solve_batch_with_results(specs, workers=1, deduplicate=True))
+        self.assertEqual(["multiple", "single", "none", "none", "multiple", "single", "multiple", "single"],
+                         [result.status for result in results])
+        self.assertEqual([[[2, 1], [1, 2]]], results[7].solutions)
+        self.assertEqual([4, 3, 2, 1], results[6].solutions[0][0])
+        self.assertEqual(results[0].num_of_guesses, results[6].num_of_guesses)
+
+    def test_solve_batch_with_results_solution_cache(self):
+        specs = _get_specs()
+        with tempfile.TemporaryDirectory() as directory:
+            solution_cache = SolutionCache(os.path.join(directory, "solutions.sqlite"))
+            results = list(solve_batch_with_results(specs, workers=2, chunk_size=2, solution_cache=solution_cache))
+            self.assertEqual(len(specs), solution_cache.get_num_of_entries())
+            clear_solve_memo()
+            cached_results = list(solve_batch_with_results(specs, workers=1, solution_cache=solution_cache))
+            self.assertEqual(len(specs), solution_cache.num_of_hits)
+            self.assertEqual([result[:3] for result in results], [result[:3] for result in cached_results])
+            self.assertEqual([(i, solve_puzzle_spec(spec)) for i, spec in enumerate(specs)],
+                             list(solve_batch(specs, workers=1, solution_cache=solution_cache)))
+            solution_cache.close()
+
+    def test_result_to_json(self):
+        result = list(solve_batch_with_results(_get_specs()[1:2], workers=1))[0]
+        self.assertEqual({"index": 0, "status": "single", "solutions": [[[1, 2], [2, 1]]]},
+                         json.loads(result_to_json(result)))
+        self.assertEqual({"index", "seconds", "num_of_guesses"},
+                         set(json.loads(result_to_json(result, ["timing", "stats"]))))
+
+    def test_main(self):
+        stdin = io.StringIO("".join(json.dumps(spec._asdict()) + "\n" for spec in _get_specs()[:3]))
+        stdout = io.StringIO()
+        main(["--workers", "1"], stdin, stdout)
+        results = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual([0, 1, 2], [result["index"] for result in results])
+        self.assertEqual(["multiple", "single", "none"], [result["status"] for result in results])
+        self.assertEqual(2, len(results[0]["solutions"]))
+        self.assertEqual([[[1, 2], [2, 1]]], results[1]["solutions"])
+        self.assertEqual([], results[2]["solutions"])
+
+        stdout = io.StringIO()
+        main(["--workers", "1", "--fields", "uniqueness,stats"], io.StringIO(stdin.getvalue()), stdout)
+        self.assertEqual({"index", "status", "num_of_guesses"}, set(json.loads(stdout.getvalue().splitlines()[0])))
+
+    def test_main_invalid_records(self):
+        valid_line = json.dumps(_get_specs()[1]._asdict())
+        invalid_lines = ['{"variant": ', '{"variant": "skyscrapers", "puzzle": [[1, 2], [2, 1]]}',
+                         json.dumps({"variant": "sudoku", "puzzle": [[1]], "hints": [None] * 4}),
+                         json.dumps({"variant": "skyscrapers", "puzzle": [[1, 2], [2, 1]], "hints": [3] * 8}),
+                         json.dumps({"variant": "skyscrapers", "puzzle": 5, "hints": []})]
+        stdin = io.StringIO("".join(line + "\n" for line in [valid_line] + invalid_lines + [valid_line]))
+        stdout = io.StringIO()
+        main(["--workers", "1", "--fields", "timing"], stdin, stdout)
+        results = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual(list(range(7)), [result["index"] for result in results])
+        self.assertEqual({"index", "seconds"}, set(results[0]))
+        self.assertEqual(results[0].keys(), results[6].keys())
+        for result in results[1:6]:
+            self.assertEqual("error", result["status"])
+            self.assertTrue(result["error"])
+
+
+if __name__ == '__main__':
+    unittest.main()
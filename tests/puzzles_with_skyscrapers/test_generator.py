@@ -0,0 +1,60 @@
+import io
+import json
+import random
+import unittest
+
+from src.puzzles_with_skyscrapers.batch_solver import PUZZLE_VARIANTS
+from src.puzzles_with_skyscrapers.generator import generate_puzzle, generate_puzzles, main
+
+
+class TestGenerator(unittest.TestCase):
+
+    def test_generate_puzzle(self):
+        for variant, puzzle_class in PUZZLE_VARIANTS.items():
+            generated = generate_puzzle(variant, 4, random.Random(variant))
+            puzzle = puzzle_class(generated.puzzle, generated.hints)
+            self.assertEqual([list(row) for row in generated.solution], puzzle.solve())
+            for i in range(len(generated.hints)):
+                if generated.hints[i] is not None:
+                    less_hints = tuple(None if j == i else generated.hints[j] for j in range(len(generated.hints)))
+                    self.assertEqual(2, puzzle_class(generated.puzzle, less_hints).count_solutions(2))
+
+    def test_generate_puzzle_strip_givens(self):
+        generated = generate_puzzle("skyscrapers", 4, random.Random(1), strip_givens=True)
+        self.assertEqual(1, PUZZLE_VARIANTS["skyscrapers"](generated.puzzle, generated.hints).count_solutions(2))
+        self.assertLess(sum(value is not None for row in generated.puzzle for value in row), 16)
+
+    def test_generate_puzzle_check_timeout(self):
+        # Every check that has to guess times out, so only puzzles that the rules solve alone are kept.
+        generated = generate_puzzle("skyscrapers", 5, random.Random(1), check_timeout=0)
+        puzzle = PUZZLE_VARIANTS["skyscrapers"](generated.puzzle, generated.hints)
+        self.assertEqual([list(row) for row in generated.solution], puzzle.solve())
+        self.assertEqual(0, puzzle.num_of_guesses)
+
+    def test_generate_puzzle_difficulty(self):
+        generated = generate_puzzle("skyscrapers", 4, random.Random(1), difficulty="easy")
+        self.assertEqual(0, generated.num_of_guesses)
+        self.assertIsNone(generate_puzzle("skyscrapers", 2, random.Random(1), difficulty="hard", max_attempts=3))
+        with self.assertRaises(ValueError):
+            generate_puzzle("skyscrapers", 4, random.Random(1), difficulty="impossible")
+        with self.assertRaises(ValueError):
+            generate_puzzle("sudoku", 4, random.Random(1))
+
+    def test_generate_puzzles(self):
+        generated = list(generate_puzzles("haido", 4, 3, seed=7, workers=1))
+        self.assertEqual([0, 1, 2], [g.index for g in generated])
+        self.assertEqual(generated, sorted(generate_puzzles("haido", 4, 3, seed=7, workers=2), key=lambda g: g.index))
+        with self.assertRaises(ValueError):
+            list(generate_puzzles("skyscrapers", 2, 1, seed=7, workers=1, difficulty="hard", max_attempts=3))
+
+    def test_main(self):
+        stdout = io.StringIO()
+        main(["--variant", "gaps", "--size", "4", "--count", "2", "--seed", "3", "--workers", "1"], stdout)
+        records = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual(2, len(records))
+        self.assertEqual({"gaps"}, set(record["variant"] for record in records))
+        self.assertEqual(16, len(records[0]["hints"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
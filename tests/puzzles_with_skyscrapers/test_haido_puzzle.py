@@ -1,3 +1,4 @@
+import random
 import unittest
 
 from src.puzzles_with_skyscrapers.haido_puzzle import HaidoPuzzle
@@ -19,6 +20,16 @@ class TestHaidoPuzzle(unittest.TestCase):
         self._test_flow_several_solutions_no_values()
         self._test_flow_several_solutions_values_and_hints()
 
+    def test_get_hints_of_solution(self):
+        solution = ((1, 2, 3, 4), (2, 3, 4, 1), (3, 4, 1, 2), (4, 1, 2, 3))
+        p = HaidoPuzzle(solution, tuple([None] * 16))
+        for seed in range(10):
+            hints = p.get_hints_of_solution(random.Random(seed))
+            self.assertTrue(HaidoPuzzle(tuple([tuple([None] * 4)] * 4), hints)._are_puzzle_specifics_valid())
+            self.assertEqual([list(row) for row in solution], HaidoPuzzle(solution, hints).solve())
+            self.assertIn(hints[0], {1, 2, 3, 4})
+            self.assertEqual(4, hints[4])
+
     def test_are_puzzle_specifics_valid(self):
         p1 = HaidoPuzzle(tuple([tuple([None] * 4)] * 4),
                          tuple([None if i not in {0, 8} else 3 for i in range(16)]))
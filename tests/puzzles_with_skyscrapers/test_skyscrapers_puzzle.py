@@ -1,8 +1,11 @@
+import random
 import unittest
 from typing import List
 
 from src.components.unsolvable_error import UnsolvableError
+from src.puzzles_with_skyscrapers.components.abstract_puzzle_with_skyscrapers import SEARCH_ENGINES
 from src.puzzles_with_skyscrapers.components.cell_with_skyscraper import CellWithSkyscraper
+from src.puzzles_with_skyscrapers.components.solve_memo import clear_solve_memo
 from src.puzzles_with_skyscrapers.skyscrapers_puzzle import SkyscrapersPuzzle
 
 
@@ -23,6 +26,34 @@ class TestSkyscrapersPuzzle(unittest.TestCase):
         self._test_flow_no_solution_more_complex()
         self._test_flow_several_solutions_more_complex()
 
+    def test_count_solutions(self):
+        p1 = SkyscrapersPuzzle(((1, 2, 3, 4, None, None),
+                                (2, 3, 4, 1, None, None),
+                                (3, 4, 5, 6, 1, 2),
+                                (4, 1, 6, 5, 2, 3),
+                                (5, 6, 1, 2, 3, 4),
+                                (6, 5, 2, 3, 4, 1)),
+                               tuple([None] * 24))
+        self.assertEqual(1, p1.count_solutions(1))
+        self.assertEqual(2, p1.count_solutions())
+        self.assertEqual(2, p1.count_solutions(10))
+        self.assertFalse(p1.is_single_solution())
+
+        p2 = SkyscrapersPuzzle(tuple([tuple([None] * 6)] * 6),
+                               tuple([6, 5, 4, 3, 2, None] + [None] * 18))
+        self.assertEqual(1, p2.count_solutions(10))
+        self.assertTrue(p2.is_single_solution())
+
+        p3 = SkyscrapersPuzzle(tuple([tuple([None] * 6)] * 6),
+                               tuple([6, 6, None, None, None, None] + [None] * 18))
+        self.assertEqual(0, p3.count_solutions())
+
+        p4 = SkyscrapersPuzzle(tuple([tuple([None] * 4)] * 4), tuple([None] * 16))
+        self.assertEqual(5, p4.count_solutions(5))
+        self.assertEqual(576, p4.count_solutions(1000))
+        with self.assertRaises(ValueError):
+            p4.count_solutions(0)
+
     def test_are_puzzle_specifics_valid(self):
 
         p1 = SkyscrapersPuzzle(tuple([tuple([None] * 4)] * 4),
@@ -66,6 +97,49 @@ class TestSkyscrapersPuzzle(unittest.TestCase):
         self._test_mark_cell_illegals_for_unseen_no_data()
         self._test_mark_cell_illegals_for_unseen()
 
+    def test_count_solutions_timeout(self):
+        clear_solve_memo()
+        p = SkyscrapersPuzzle(tuple([tuple([None] * 4)] * 4), tuple([None] * 16))
+        with self.assertRaises(TimeoutError):
+            p.count_solutions(2, timeout=0)
+        self.assertEqual([[None] * 4] * 4, p._get_puzzle_with_filled_values())
+        self.assertEqual(2, p.count_solutions(2, timeout=60))
+
+    def test_count_solutions_large_puzzle(self):
+        # Too large for the line permutation tables, so the cells engine relies on probing the values before the
+        # search. Without it, the search takes tens of thousands of guesses.
+        hints = (None, None, 2, 4, None, None, 4, 2, 2, None, 4, 2, None, 3, None, 2,
+                 None, None, 4, None, 3, 4, 4, None, None, None, 3, 4, 3, 4, None, 2)
+        for search_engine in SEARCH_ENGINES:
+            clear_solve_memo()
+            p = SkyscrapersPuzzle(tuple([tuple([None] * 8)] * 8), hints)
+            p.set_search_engine(search_engine)
+            self.assertEqual(2, p.count_solutions(2, timeout=60))
+            self.assertLess(p.num_of_guesses, 100)
+
+    def test_get_random_solution(self):
+        p = SkyscrapersPuzzle(tuple([tuple([None] * 4)] * 4), (4,) + tuple([None] * 15))
+        solution = p.get_random_solution(random.Random(1))
+        self.assertEqual([1, 2, 3, 4], [row[0] for row in solution])
+        self.assertTrue(SkyscrapersPuzzle(tuple(tuple(row) for row in solution), p.hints).solve())
+        self.assertIsNone(SkyscrapersPuzzle(tuple([tuple([None] * 4)] * 4), tuple([1] * 16))
+                          .get_random_solution(random.Random(1)))
+
+    def test_get_hints_of_solution(self):
+        p = SkyscrapersPuzzle(((1, 2, 3), (2, 3, 1), (3, 1, 2)), tuple([None] * 12))
+        self.assertEqual((3, 2, 1, 1, 2, 2, 1, 2, 2, 3, 2, 1), p.get_hints_of_solution())
+        with self.assertRaises(ValueError):
+            SkyscrapersPuzzle(((1, 2, 3), (2, 3, 1), (3, 1, None)), tuple([None] * 12)).get_hints_of_solution()
+
+    def test_get_all_minimal_hints_puzzles(self):
+        p = SkyscrapersPuzzle(tuple([tuple([None] * 3)] * 3), (3, 2, 1, 1, 2, 2, 1, 2, 2, 3, 2, 1))
+        minimal_puzzles = p.get_all_minimal_hints_puzzles()
+        self.assertEqual(39, len(minimal_puzzles))
+        self.assertIn((3, None, None, None, None, None, None, None, None, 3, None, None),
+                      [minimal.hints for minimal in minimal_puzzles])
+        for minimal in minimal_puzzles:
+            self.assertEqual([[1, 2, 3], [2, 3, 1], [3, 1, 2]], minimal.solve())
+
     def test_get_minimal_hints_puzzle(self):
         p1 = SkyscrapersPuzzle(tuple([tuple([None] * 5)] * 5),
                                (None, 4, None, None, None,
@@ -78,6 +152,9 @@ class TestSkyscrapersPuzzle(unittest.TestCase):
                           None, None, 4, 3, None,
                           3, None, 2, 3, None),
                          sol1.hints)
+        self.assertEqual(sol1.hints, SkyscrapersPuzzle(p1.puzzle, p1.hints).get_minimal_hints_puzzle(workers=2).hints)
+        with self.assertRaises(ValueError):
+            p1.get_minimal_hints_puzzle(workers=0)
 
         p2 = SkyscrapersPuzzle(tuple([tuple([None] * 5)] * 5),
                                (None, 4, None, None, None,